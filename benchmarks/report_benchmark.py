@@ -0,0 +1,219 @@
+# benchmarks/report_benchmark.py
+"""
+Benchmark the vectorized report aggregates against the original list-of-dicts loops
+
+Run from the repository root:
+    python benchmarks/report_benchmark.py            # 10k, 100k and 1M rows
+    python benchmarks/report_benchmark.py 50000      # custom sizes
+
+No database is needed; synthetic articles are generated in memory.
+"""
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from electrek_scraper.utils.article_frame import ArticleFrame
+from electrek_scraper.utils.company_classifier import COMPANY_KEYWORDS, get_company_classifier
+
+TESLA_KEYWORDS = COMPANY_KEYWORDS['Tesla/Elon']
+
+TITLE_WORDS = ['Tesla', 'Elon Musk', 'Ford', 'GM', 'BYD', 'Rivian', 'Lucid', 'Nio', 'VW', 'BMW',
+               'Mercedes-Benz', 'solar', 'battery', 'e-bike', 'charging', 'recall', 'record', 'delay']
+AUTHORS = [f"Author {i}" for i in range(40)] + [None]
+
+def make_rows(count, seed=42):
+    """Synthetic article rows shaped like the Supabase response"""
+    rng = random.Random(seed)
+    start = datetime(2018, 1, 1)
+    rows = []
+    for article_id in range(1, count + 1):
+        published = start + timedelta(minutes=rng.randrange(0, 60 * 24 * 365 * 7))
+        rows.append({
+            'id': article_id,
+            'title': ' '.join(rng.sample(TITLE_WORDS, 3)) + f" {article_id}",
+            'author': rng.choice(AUTHORS),
+            'comment_count': rng.randrange(0, 1500),
+            'sentiment_score': None if rng.random() < 0.1 else round(rng.uniform(-1, 1), 2),
+            'published_at': published.isoformat() + '+00:00'
+        })
+    return rows
+
+# --- Original list-of-dicts implementations (as in Article before the columnar store) ---
+
+def legacy_monthly_stats(rows):
+    monthly_data = defaultdict(lambda: {"count": 0, "total_comments": 0})
+    for article in rows:
+        date = datetime.fromisoformat(article["published_at"].replace('Z', '+00:00'))
+        month_key = date.strftime("%Y-%m")
+        monthly_data[month_key]["month"] = date.strftime("%b %Y")
+        monthly_data[month_key]["count"] += 1
+        monthly_data[month_key]["total_comments"] += article["comment_count"]
+    return [
+        {"month": data["month"], "avg_comments": round(data["total_comments"] / data["count"]), "article_count": data["count"]}
+        for _, data in sorted(monthly_data.items())
+    ]
+
+def legacy_author_tesla_bias(rows):
+    author_stats = defaultdict(lambda: {
+        'total_articles': 0, 'tesla_articles': 0, 'tesla_sentiment_sum': 0, 'tesla_comments_sum': 0,
+        'non_tesla_sentiment_sum': 0, 'non_tesla_comments_sum': 0, 'non_tesla_articles': 0
+    })
+    for article in rows:
+        if article.get('sentiment_score') is None or article.get('author') is None:
+            continue
+        title_lower = article.get('title', '').lower()
+        sentiment = article.get('sentiment_score', 0)
+        comments = article.get('comment_count', 0)
+        stats = author_stats[article['author']]
+        stats['total_articles'] += 1
+        if any(keyword in title_lower for keyword in TESLA_KEYWORDS):
+            stats['tesla_articles'] += 1
+            stats['tesla_sentiment_sum'] += sentiment
+            stats['tesla_comments_sum'] += comments
+        else:
+            stats['non_tesla_articles'] += 1
+            stats['non_tesla_sentiment_sum'] += sentiment
+            stats['non_tesla_comments_sum'] += comments
+    analysis = []
+    for author, stats in author_stats.items():
+        if stats['total_articles'] >= 5:
+            analysis.append({
+                'author': author,
+                'total_articles': stats['total_articles'],
+                'tesla_articles': stats['tesla_articles'],
+                'tesla_percentage': round((stats['tesla_articles'] / stats['total_articles']) * 100, 1),
+                'avg_tesla_sentiment': round(stats['tesla_sentiment_sum'] / max(stats['tesla_articles'], 1), 3),
+                'avg_tesla_comments': round(stats['tesla_comments_sum'] / max(stats['tesla_articles'], 1), 1),
+                'avg_non_tesla_sentiment': round(stats['non_tesla_sentiment_sum'] / max(stats['non_tesla_articles'], 1), 3),
+                'avg_non_tesla_comments': round(stats['non_tesla_comments_sum'] / max(stats['non_tesla_articles'], 1), 1)
+            })
+    analysis.sort(key=lambda x: x['tesla_articles'], reverse=True)
+    return analysis
+
+def legacy_company_comparison(rows):
+    company_stats = {company: {'articles': [], 'total_comments': 0, 'negative_articles': 0, 'positive_articles': 0}
+                     for company in COMPANY_KEYWORDS}
+    for article in rows:
+        if article.get('sentiment_score') is None:
+            continue
+        title_lower = article.get('title', '').lower()
+        comment_count = article.get('comment_count', 0)
+        sentiment = article.get('sentiment_score', 0)
+        for company, keywords in COMPANY_KEYWORDS.items():
+            if any(keyword in title_lower for keyword in keywords):
+                stats = company_stats[company]
+                stats['articles'].append({'title': article.get('title'), 'comments': comment_count, 'sentiment': sentiment})
+                stats['total_comments'] += comment_count
+                if sentiment < -0.1:
+                    stats['negative_articles'] += 1
+                elif sentiment > 0.1:
+                    stats['positive_articles'] += 1
+    comparison = []
+    for company, stats in company_stats.items():
+        if stats['articles']:
+            article_count = len(stats['articles'])
+            comparison.append({
+                'company': company,
+                'article_count': article_count,
+                'total_comments': stats['total_comments'],
+                'avg_comments': round(stats['total_comments'] / article_count, 1),
+                'avg_sentiment': round(sum(a['sentiment'] for a in stats['articles']) / article_count, 3),
+                'negative_articles': stats['negative_articles'],
+                'positive_articles': stats['positive_articles'],
+                'negative_percentage': round((stats['negative_articles'] / article_count) * 100, 1)
+            })
+    comparison.sort(key=lambda x: x['avg_comments'], reverse=True)
+    return comparison
+
+def legacy_business_impact_metrics(rows):
+    data = [article for article in rows if article.get('sentiment_score') is not None]
+    tesla, non_tesla, tesla_negative, tesla_positive, non_tesla_negative = [], [], [], [], []
+    for article in data:
+        title_lower = article.get('title', '').lower()
+        sentiment = article.get('sentiment_score', 0)
+        if any(keyword in title_lower for keyword in TESLA_KEYWORDS):
+            tesla.append(article)
+            if sentiment < -0.1:
+                tesla_negative.append(article)
+            elif sentiment > 0.1:
+                tesla_positive.append(article)
+        else:
+            non_tesla.append(article)
+            if sentiment < -0.1:
+                non_tesla_negative.append(article)
+    tesla_avg = sum(a.get('comment_count', 0) for a in tesla) / max(len(tesla), 1)
+    non_tesla_avg = sum(a.get('comment_count', 0) for a in non_tesla) / max(len(non_tesla), 1)
+    tesla_negative_avg = sum(a.get('comment_count', 0) for a in tesla_negative) / max(len(tesla_negative), 1)
+    non_tesla_negative_avg = sum(a.get('comment_count', 0) for a in non_tesla_negative) / max(len(non_tesla_negative), 1)
+    return {
+        'tesla_engagement_multiplier': round(tesla_avg / max(non_tesla_avg, 1), 2),
+        'negative_tesla_multiplier': round(tesla_negative_avg / max(non_tesla_negative_avg, 1), 2),
+        'tesla_article_count': len(tesla),
+        'non_tesla_article_count': len(non_tesla)
+    }
+
+LEGACY = {
+    'monthly': legacy_monthly_stats,
+    'author_bias': legacy_author_tesla_bias,
+    'company': legacy_company_comparison,
+    'business': legacy_business_impact_metrics
+}
+
+def vectorized(frame):
+    return {
+        'monthly': frame.monthly_stats,
+        'author_bias': frame.author_tesla_bias,
+        'company': frame.company_comparison,
+        'business': frame.business_impact_metrics
+    }
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def legacy_company_masks(rows):
+    """Per-company substring scan, one title at a time"""
+    masks = []
+    for row in rows:
+        title_lower = row.get('title', '').lower()
+        mask = 0
+        for bit, keywords in enumerate(COMPANY_KEYWORDS.values()):
+            if any(keyword in title_lower for keyword in keywords):
+                mask |= 1 << bit
+        masks.append(mask)
+    return masks
+
+def run(size):
+    rows = make_rows(size)
+    classifier = get_company_classifier()
+
+    _, substring_seconds = timed(legacy_company_masks, rows)
+    _, regex_seconds = timed(lambda: [classifier.classify(row['title']) for row in rows])
+    frame, build_seconds = timed(ArticleFrame.from_rows, rows)  # fills the per-article cache
+    _, warm_build_seconds = timed(ArticleFrame.from_rows, rows)
+
+    print(f"\n{size:,} rows")
+    print(f"  company masks: substring scan {substring_seconds * 1000:.0f} ms, "
+          f"single regex {regex_seconds * 1000:.0f} ms")
+    print(f"  frame build: {build_seconds * 1000:.0f} ms cold, "
+          f"{warm_build_seconds * 1000:.0f} ms with cached company masks")
+    print(f"  {'aggregate':<12} {'dicts ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for name, legacy in LEGACY.items():
+        expected, legacy_seconds = timed(legacy, rows)
+        actual, numpy_seconds = timed(vectorized(frame)[name])
+        if name == 'business':
+            actual = {key: actual[key] for key in expected}
+        status = '' if actual == expected else '  MISMATCH'
+        print(f"  {name:<12} {legacy_seconds * 1000:>10.1f} {numpy_seconds * 1000:>10.1f} "
+              f"{legacy_seconds / max(numpy_seconds, 1e-9):>7.1f}x{status}")
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
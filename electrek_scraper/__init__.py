@@ -1,11 +1,23 @@
 # electrek_scraper/__init__.py
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from .config import Config
 from datetime import datetime
 import re
 
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON (jsonify, |tojson) that also writes cached columnar report lists"""
+
+    @staticmethod
+    def default(o):
+        from .utils.cache_codec import ColumnarRecords
+        if isinstance(o, ColumnarRecords):
+            return list(o)
+        return DefaultJSONProvider.default(o)
+
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.json = JSONProvider(app)
     app.config.from_object(config_class)
     
     # Register blueprints
@@ -14,6 +26,10 @@ def create_app(config_class=Config):
     app.register_blueprint(public_bp)
     app.register_blueprint(admin_bp)
     
+    # Build-time prerendering of the public articles (flask --app app prerender)
+    from .utils.prerender import prerender_command
+    app.cli.add_command(prerender_command)
+    
     # Add custom template filters
     @app.template_filter('nl2br')
     def nl2br(value):
@@ -1,14 +1,44 @@
 """
 Admin-only routes for scraping, analytics, and management
 """
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
+from flask import Blueprint, render_template, stream_template, request, jsonify, flash, redirect, url_for, current_app, Response
 from datetime import datetime, timedelta
+import csv
+import io
 from .models import Article
-from .utils.scraper_service import ElectrekScraper
+from .utils.scrape_pipeline import run_scrape
+from .utils.deadline import Deadline
+from .utils.job_queue import JobQueue
+from .config import Config
 from .auth import admin_required, get_user_info
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Columns shown in the admin article listing
+LISTING_COLUMNS = "id, title, author, published_at, comment_count, sentiment_score"
+
+def _with_sentiment_labels(pages):
+    """Yield articles from pages of rows with their sentiment category and color added"""
+    from .utils.sentiment_service import SentimentService
+    sentiment_service = SentimentService()
+    
+    try:
+        for page in pages:
+            for article in page:
+                if article.get('sentiment_score') is not None:
+                    score = article.get('sentiment_score')
+                    article['sentiment_category'] = sentiment_service.get_sentiment_category(score)
+                    article['sentiment_color'] = sentiment_service.get_sentiment_color(score)
+                else:
+                    article['sentiment_category'] = 'Not analyzed'
+                    article['sentiment_color'] = '#6c757d'  # Default gray
+                yield article
+    except Exception as e:
+        # The page is already partly sent, so end the listing where the error happened
+        print(f"Error streaming articles: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+
 @bp.route('/')
 @admin_required
 def index():
@@ -33,32 +63,35 @@ def index():
     # Get the last time we scraped
     last_scraped = request.args.get('last_scraped', None)
     
-    # Get all articles with the selected sorting (using None for limit to get all)
-    articles = Article.get_all(limit=None, order_by=order_by, ascending=ascending)
+    # Set when the last scrape ran out of time and can be continued
+    resume_token = request.args.get('resume_token', None)
+    
+    # Background job to show progress for
+    job_id = request.args.get('job_id', None, type=int)
     
-    # Add sentiment categories if needed
+    # One keyset page of articles, so the page costs the same however large the table is
+    cursor = request.args.get('cursor', None)
+    per_page = min(max(request.args.get('per_page', Config.ADMIN_PAGE_SIZE, type=int), 1), 500)
     try:
-        from .utils.sentiment_service import SentimentService
-        sentiment_service = SentimentService()
-        
-        for article in articles:
-            if article.get('sentiment_score') is not None:
-                score = article.get('sentiment_score')
-                article['sentiment_category'] = sentiment_service.get_sentiment_category(score)
-                article['sentiment_color'] = sentiment_service.get_sentiment_color(score)
-            else:
-                article['sentiment_category'] = 'Not analyzed'
-                article['sentiment_color'] = '#6c757d'  # Default gray
+        page, next_cursor = Article.get_page(order_by=order_by, ascending=ascending, cursor=cursor,
+                                             limit=per_page, columns=LISTING_COLUMNS)
     except Exception as e:
-        print(f"Error adding sentiment categories: {str(e)}")
+        print(f"Error getting articles: {str(e)}")
+        page, next_cursor = [], None
+    articles = _with_sentiment_labels([page]) if page else []
     
     # Get user info for display
     user_info = get_user_info()
     
-    return render_template('admin/index.html', 
+    return stream_template('admin/index.html', 
                           articles=articles,
                           last_scraped=last_scraped,
+                          resume_token=resume_token,
+                          job_id=job_id,
                           sort=sort,
+                          cursor=cursor,
+                          next_cursor=next_cursor,
+                          per_page=per_page,
                           user_info=user_info)
 
 @bp.route('/scrape', methods=['POST'])
@@ -77,95 +110,51 @@ def scrape():
         page_count = int(request.form.get('page_count', 1))
         page_count = min(max(1, page_count), 80)  # Increased max to 80 pages
         
-        print(f"Article limit set to: {article_limit}, Pages: {page_count}")
+        # Incremental mode stops paginating once it reaches already stored articles
+        incremental = request.form.get('incremental') == 'on'
+        
+        # Set when continuing a job that previously ran out of time
+        resume_token = request.form.get('resume_token') or None
+        
+        print(f"Article limit set to: {article_limit}, Pages: {page_count}, Incremental: {incremental}")
         
         # Add the warning message right here
         if page_count > 10 or article_limit > 250:
             print("⚠️ WARNING: Large scraping job requested. This may take a while and put significant load on the target site.")
             flash('Large scraping job started. This may take a while to complete.', 'warning')
         
-        scraper = ElectrekScraper()
-        
-        # Get recent article URLs from multiple pages
-        print(f"Fetching up to {article_limit} articles across {page_count} pages...")
-        article_urls = scraper.get_article_urls(limit=article_limit, pages=page_count)
-        
-        if not article_urls:
-            print("No articles found on the homepage.")
-            flash('No articles found on the homepage.', 'warning')
-            return redirect(url_for('admin.index'))
-        
-        print(f"Found {len(article_urls)} article URLs")
-        
-        # Track results
-        results = {
-            "total": len(article_urls),
-            "success": [],
-            "skipped": [],
-            "failed": []
+        job_params = {
+            'article_limit': article_limit,
+            'page_count': page_count,
+            'incremental': incremental,
+            'resume_token': resume_token
         }
         
-        # Process each URL
-        for i, url in enumerate(article_urls):
-            print(f"\\nProcessing article {i+1}/{len(article_urls)}: {url}")
-            
-            # Skip if article already exists
-            try:
-                if Article.url_exists(url):
-                    print(f"  - Skipping (already exists in database)")
-                    results["skipped"].append(url)
-                    continue
-            except Exception as e:
-                print(f"  - Warning: Error checking if article exists: {str(e)}")
-            
-            try:
-                # Parse the article
-                print(f"  - Parsing article metadata...")
-                article_data = scraper.parse_article(url)
-                
-                # Store in database
-                print(f"  - Storing article in database...")
-                creation_result = Article.create(article_data)
-                print(f"  - Database insert result: {creation_result}")
-                
-                results["success"].append(url)
-                print(f"  - SUCCESS: Article stored")
-            except Exception as e:
-                print(f"  - FAILED: Error processing article: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                results["failed"].append({"url": url, "error": str(e)})
-                
-                # If this was a duplicate URL error, categorize it as skipped instead of failed
-                error_str = str(e).lower()
-                if "duplicate" in error_str or "unique constraint" in error_str or "already exists" in error_str:
-                    print(f"  - Reclassifying as skipped (duplicate URL)")
-                    # Move from failed to skipped
-                    results["failed"].pop()
-                    results["skipped"].append(url)
+        # Hand the job to the background worker and let the page poll its progress
+        if Config.BACKGROUND_JOBS:
+            job_id = JobQueue().enqueue('scrape', job_params)
+            print(f"Queued scrape job {job_id}")
+            flash(f'Scrape job #{job_id} queued.', 'info')
+            return redirect(url_for('admin.index', job_id=job_id))
         
-        # Create success message with stats
-        success_count = len(results["success"])
-        skipped_count = len(results["skipped"])
-        failed_count = len(results["failed"])
+        # Stop taking new work before the platform kills the request
+        results = run_scrape(deadline=Deadline(Config.JOB_TIME_BUDGET), **job_params)
         
-        print("\\n" + "=" * 50)
-        print(f"SCRAPE SUMMARY: {success_count} added, {skipped_count} skipped, {failed_count} failed")
-        print("=" * 50)
+        if results["total"] == 0:
+            if results["incremental"]:
+                print("No new articles since the last scrape.")
+                flash('No new articles since the last scrape.', 'info')
+            else:
+                print("No articles found on the homepage.")
+                flash('No articles found on the homepage.', 'warning')
+            return redirect(url_for('admin.index'))
         
-        if success_count > 0:
-            flash(f'Successfully scraped {success_count} articles. Skipped {skipped_count}. Failed {failed_count}.', 'success')
-        elif skipped_count > 0 and failed_count == 0:
-            flash(f'All {skipped_count} articles already existed in the database.', 'info')
-        elif failed_count > 0 and success_count == 0:
-            flash(f'Failed to scrape any articles. {failed_count} errors occurred.', 'danger')
-        else:
-            flash('No new articles were processed.', 'info')
+        flash_scrape_summary(results)
             
         # Pass the current time for display
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        return redirect(url_for('admin.index', last_scraped=current_time))
+        return redirect(url_for('admin.index', last_scraped=current_time, resume_token=results["resume_token"]))
         
     except Exception as e:
         print(f"CRITICAL ERROR IN SCRAPE OPERATION: {str(e)}")
@@ -174,6 +163,62 @@ def scrape():
         flash(f'An error occurred: {str(e)}', 'danger')
         return redirect(url_for('admin.index'))
 
+def flash_scrape_summary(results):
+    """Log and flash the outcome of a scrape job"""
+    success_count = len(results["success"])
+    skipped_count = len(results["skipped"])
+    failed_count = len(results["failed"])
+    
+    print("\n" + "=" * 50)
+    print(f"SCRAPE SUMMARY: {success_count} added, {skipped_count} skipped, {failed_count} failed")
+    print("=" * 50)
+    
+    if success_count > 0:
+        flash(f'Successfully scraped {success_count} articles in {results["elapsed_seconds"]:.0f}s '
+              f'({results["articles_per_second"]} articles/sec). Skipped {skipped_count}. Failed {failed_count}.', 'success')
+    elif skipped_count > 0 and failed_count == 0:
+        flash(f'All {skipped_count} articles already existed in the database.', 'info')
+    elif failed_count > 0 and success_count == 0:
+        flash(f'Failed to scrape any articles. {failed_count} errors occurred.', 'danger')
+    else:
+        flash('No new articles were processed.', 'info')
+    
+    if results["resume_token"]:
+        print(f"Time budget reached with {len(results['pending'])} articles pending. Resume token: {results['resume_token']}")
+        flash('The time budget ran out before the scrape finished. Everything processed so far was saved; '
+              'use "Resume Scrape" to continue.', 'warning')
+
+@bp.route('/jobs/<int:job_id>')
+@admin_required
+def job_status(job_id):
+    """Progress, throughput and ETA of a background job as JSON"""
+    job = JobQueue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@bp.route('/export/articles.csv')
+@admin_required
+def export_articles():
+    """Download every article as CSV, streamed a page at a time"""
+    columns = ['id', 'title', 'url', 'author', 'published_at', 'comment_count', 'sentiment_score']
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for page in Article.iter_pages(columns=", ".join(columns), order_by="id", ascending=True):
+            writer.writerows(page)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue()
+    
+    filename = f"electrek_articles_{datetime.now().strftime('%Y%m%d')}.csv"
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @bp.route('/api/articles')
 @admin_required
 def api_articles():
@@ -182,6 +227,51 @@ def api_articles():
     articles = Article.get_all(limit=limit)
     return jsonify(articles)
 
+@bp.route('/api/connection-stats')
+@admin_required
+def api_connection_stats():
+    """API endpoint exposing HTTP connection reuse per proxy identity"""
+    from .utils.proxy_manager import get_session_pool
+    return jsonify(get_session_pool().get_stats())
+
+@bp.route('/api/proxy-stats')
+@admin_required
+def api_proxy_stats():
+    """API endpoint exposing live per-proxy health for the dashboard"""
+    from .utils.proxy_manager import get_proxy_scheduler
+    return jsonify(get_proxy_scheduler().get_stats())
+
+@bp.route('/api/report-cache-stats')
+@admin_required
+def api_report_cache_stats():
+    """API endpoint exposing report cache hits per tier, staleness and load latency"""
+    from .utils.cache_service import get_report_cache
+    return jsonify(get_report_cache().get_stats())
+
+@bp.route('/api/charts/<series>')
+@admin_required
+def api_chart_data(series):
+    """Chart series for the reports dashboard and blog post, fetched after the page renders"""
+    from .utils.chart_data import SERIES, chart_response, report_chart_source
+    if series not in SERIES:
+        return jsonify({'error': f"Unknown chart series: {series}"}), 404
+    
+    # No months parameter = all time; max_points downsamples the sentiment scatter
+    months = request.args.get('months', type=int)
+    max_points = request.args.get('max_points', type=int)
+    
+    report = Article.get_cached_report(months, top_limit=25)
+    return chart_response(report_chart_source(report), series, max_points,
+                          cache_control='private, no-cache')
+
+@bp.route('/api/sentiment-cache-stats')
+@admin_required
+def api_sentiment_cache_stats():
+    """API endpoint exposing sentiment cache hit rate and size"""
+    from .utils.sentiment_service import get_sentiment_cache
+    cache = get_sentiment_cache()
+    return jsonify(cache.get_stats() if cache else {'enabled': False})
+
 @bp.route('/reports')
 @admin_required
 def reports():
@@ -189,20 +279,20 @@ def reports():
     # Get the date range parameter, default to 6 months
     months = request.args.get('months', 6, type=int)
     
-    # Get all sentiment data for filtering in javascript - date filtering happens in the backend
-    all_sentiment_data = Article.get_sentiment_data(months)
+    # Every report section, from the report cache or one fetch of the articles table
+    report = Article.get_cached_report(months, top_limit=25)
     
-    # Get statistics for the selected time period
-    filtered_stats = Article.get_statistics(months)
+    # Statistics for the selected time period
+    filtered_stats = report['filtered_stats']
     
-    # Get monthly data for the trends chart
-    monthly_data = Article.get_monthly_stats(months)
+    # Monthly data for the trends chart
+    monthly_data = report['monthly_data']
     
-    # Get additional data for enhanced business analysis
-    top_articles = Article.get_top_articles_analysis(25, months)
-    author_analysis = Article.get_author_tesla_bias(months)
-    company_comparison = Article.get_company_comparison(months)
-    business_metrics = Article.get_business_impact_metrics(months)
+    # Additional data for enhanced business analysis
+    top_articles = report['top_articles']
+    author_analysis = report['author_analysis']
+    company_comparison = report['company_comparison']
+    business_metrics = report['business_metrics']
     
     # Format the data for the chart
     chart_labels = []
@@ -221,35 +311,11 @@ def reports():
         avg_comments_data.append(item['avg_comments'])
         article_count_data.append(item['article_count'])
     
-    # Get sentiment service to categorize sentiments
-    from .utils.sentiment_service import SentimentService
-    sentiment_service = SentimentService()
-    
-    # Process sentiment data for the chart
-    scatter_data = []
-    for article in all_sentiment_data:
-        if article.get('sentiment_score') is not None and article.get('comment_count') is not None:
-            # Add the article to the scatter data
-            sentiment_category = sentiment_service.get_sentiment_category(article.get('sentiment_score'))
-            scatter_data.append({
-                'id': article.get('id'),
-                'title': article.get('title', 'Untitled'),
-                'sentiment_score': article.get('sentiment_score'),
-                'comment_count': article.get('comment_count'),
-                'published_at': article.get('published_at'),
-                'sentiment_category': sentiment_category
-            })
-    
-    # Calculate correlation if there's enough data
-    correlation = None
-    if len(scatter_data) >= 5:
-        try:
-            import numpy as np
-            sentiment_scores = [article['sentiment_score'] for article in scatter_data]
-            comment_counts = [article['comment_count'] for article in scatter_data]
-            correlation = np.corrcoef(sentiment_scores, comment_counts)[0, 1]
-        except Exception as e:
-            print(f"Error calculating correlation: {str(e)}")
+    # The charts fetch the scatter series from /admin/api/charts; only its correlation
+    # and size are rendered into the page
+    from .utils.chart_data import report_chart_source, sentiment_correlation
+    scatter_data = report_chart_source(report)['sentiment_data']
+    correlation = sentiment_correlation(scatter_data)
     
     # Add count of analyzed articles to logs
     print(f"Sentiment analysis using {len(scatter_data)} articles for {months} month period")
@@ -260,7 +326,7 @@ def reports():
                           avg_comments_data=avg_comments_data,
                           article_count_data=article_count_data,
                           months=months,
-                          sentiment_data=scatter_data,
+                          sentiment_count=len(scatter_data),
                           correlation=correlation,
                           top_articles=top_articles,
                           author_analysis=author_analysis,
@@ -270,30 +336,29 @@ def reports():
 @bp.route('/analyze_sentiments', methods=['POST'])
 @admin_required
 def analyze_sentiments():
-    """Trigger sentiment analysis for all articles with enhanced debugging"""
-    from .utils.analyze_sentiments import analyze_all_articles
+    """Score every article that doesn't have a sentiment score yet"""
+    from .utils.sentiment_runner import analyze_backlog
+    
+    # Hand the job to the background worker and let the page poll its progress
+    if Config.BACKGROUND_JOBS:
+        job_id = JobQueue().enqueue('sentiment_backlog', {})
+        flash(f'Sentiment analysis job #{job_id} queued.', 'info')
+        return redirect(url_for('admin.index', job_id=job_id))
     
     try:
-        # Start the analysis
-        success = analyze_all_articles()
+        # Work through the backlog in parallel; a run cut short by the time budget
+        # leaves a checkpoint and the next click carries on from there
+        results = analyze_backlog(deadline=Deadline(Config.JOB_TIME_BUDGET))
         
-        if success:
-            # Double-check if updates actually happened
-            from .config import Config
-            from supabase import create_client
-            supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
-            
-            # Count articles with sentiment scores
-            count_response = supabase.table("articles") \
-                .select("count") \
-                .not_.is_("sentiment_score", "null") \
-                .execute()
-                
-            count = count_response.count if hasattr(count_response, 'count') else 0
-            
-            flash(f'Sentiment analysis completed. {count} articles now have sentiment scores.', 'success')
+        if results['complete']:
+            flash(f"Sentiment analysis completed. Scored {results['scored']} articles; no unscored articles left.", 'success')
         else:
-            flash('Sentiment analysis encountered errors. Check logs for details.', 'warning')
+            remaining = results['remaining']
+            flash(f"Scored {results['scored']} articles before the time limit"
+                  f"{f'; about {remaining} left' if remaining else ''}. Run again to continue.", 'info')
+        
+        if results['failed']:
+            flash(f"{results['failed']} articles could not be scored. Check logs for details.", 'warning')
             
     except Exception as e:
         import traceback
@@ -310,45 +375,19 @@ def business_of_hate_blog():
     months = None  # None = all time data
     
     # Get all the data needed for the blog post
-    filtered_stats = Article.get_statistics(months)
-    all_sentiment_data = Article.get_sentiment_data(months)
-    top_articles = Article.get_top_articles_analysis(25, months)
-    author_analysis = Article.get_author_tesla_bias(months)
-    company_comparison = Article.get_company_comparison(months)
-    business_metrics = Article.get_business_impact_metrics(months)
-    
-    # Get sentiment service for categorization
-    from .utils.sentiment_service import SentimentService
-    sentiment_service = SentimentService()
-    
-    # Process sentiment data for correlation analysis
-    scatter_data = []
-    for article in all_sentiment_data:
-        if article.get('sentiment_score') is not None and article.get('comment_count') is not None:
-            sentiment_category = sentiment_service.get_sentiment_category(article.get('sentiment_score'))
-            scatter_data.append({
-                'id': article.get('id'),
-                'title': article.get('title', 'Untitled'),
-                'sentiment_score': article.get('sentiment_score'),
-                'comment_count': article.get('comment_count'),
-                'published_at': article.get('published_at'),
-                'sentiment_category': sentiment_category
-            })
+    report = Article.get_cached_report(months, top_limit=25)
+    filtered_stats = report['filtered_stats']
+    top_articles = report['top_articles']
+    author_analysis = report['author_analysis']
+    company_comparison = report['company_comparison']
+    business_metrics = report['business_metrics']
     
-    # Calculate correlation
-    correlation = None
-    if len(scatter_data) >= 5:
-        try:
-            import numpy as np
-            sentiment_scores = [article['sentiment_score'] for article in scatter_data]
-            comment_counts = [article['comment_count'] for article in scatter_data]
-            correlation = np.corrcoef(sentiment_scores, comment_counts)[0, 1]
-        except Exception as e:
-            print(f"Error calculating correlation: {str(e)}")
+    # Correlation for the text; the charts fetch their series from /admin/api/charts
+    from .utils.chart_data import report_chart_source, sentiment_correlation
+    correlation = sentiment_correlation(report_chart_source(report)['sentiment_data'])
     
     return render_template('admin/blog_business_of_hate.html',
                           stats=filtered_stats,
-                          sentiment_data=scatter_data,
                           correlation=correlation,
                           top_articles=top_articles,
                           author_analysis=author_analysis,
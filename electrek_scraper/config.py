@@ -9,4 +9,68 @@ class Config:
     SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
     
     # Optional: Number of articles to fetch by default
-    DEFAULT_ARTICLE_LIMIT = 20
\ No newline at end of file
+    DEFAULT_ARTICLE_LIMIT = 20
+    
+    # Articles per page in the admin listing
+    ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', 100))
+    
+    # Paginated Supabase reads: pages fetched concurrently per query
+    SUPABASE_READ_WORKERS = int(os.environ.get('SUPABASE_READ_WORKERS', 4))
+    
+    # Scraping: concurrent article fetches and per-host request rate
+    SCRAPE_MAX_WORKERS = int(os.environ.get('SCRAPE_MAX_WORKERS', 8))
+    SCRAPE_REQUESTS_PER_SECOND = float(os.environ.get('SCRAPE_REQUESTS_PER_SECOND', 4.0))
+    SCRAPE_WRITE_BATCH_SIZE = int(os.environ.get('SCRAPE_WRITE_BATCH_SIZE', 50))
+    
+    # Sentiment: headlines scored per OpenAI request, parallel requests when draining
+    # the backlog, and the starting request rate (adapts to OpenAI's 429 responses)
+    SENTIMENT_BATCH_SIZE = int(os.environ.get('SENTIMENT_BATCH_SIZE', 20))
+    SENTIMENT_MAX_WORKERS = int(os.environ.get('SENTIMENT_MAX_WORKERS', 4))
+    SENTIMENT_REQUESTS_PER_SECOND = float(os.environ.get('SENTIMENT_REQUESTS_PER_SECOND', 2.0))
+    
+    # Scores are cached by headline text and prompt version so re-runs don't pay again
+    SENTIMENT_CACHE_PATH = os.environ.get('SENTIMENT_CACHE_PATH', 'instance/sentiment_cache.sqlite3')
+    
+    # Reports: read monthly, author and company totals from the trigger-maintained
+    # aggregate tables (sql/report_aggregates.sql) instead of scanning every article
+    REPORT_AGGREGATES = os.environ.get('REPORT_AGGREGATES') == 'true'
+    
+    # Reports: compute totals, monthly buckets, top articles and author/company sums
+    # with the SQL functions in sql/report_functions.sql (backfill the company masks with
+    # `python -m electrek_scraper.utils.report_aggregates` first). REPORT_SQLITE_PATH runs the
+    # same queries against a local SQLite copy of the articles table for testing
+    REPORT_RPC = os.environ.get('REPORT_RPC') == 'true'
+    REPORT_SQLITE_PATH = os.environ.get('REPORT_SQLITE_PATH')
+    
+    # Report cache: fresh for REPORT_CACHE_TTL seconds, then (or after new articles or
+    # scores are written) served stale for up to REPORT_CACHE_MAX_STALE seconds while it
+    # refreshes in the background. REPORT_CACHE_SHARED adds the Supabase report_cache
+    # table (sql/report_cache.sql) as a tier shared by every instance
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', 'static/cache')
+    REPORT_CACHE_TTL = float(os.environ.get('REPORT_CACHE_TTL', 3600))
+    REPORT_CACHE_MAX_STALE = float(os.environ.get('REPORT_CACHE_MAX_STALE', 86400))
+    REPORT_CACHE_SHARED = os.environ.get('REPORT_CACHE_SHARED') == 'true'
+    REPORT_CACHE_SHARED_POLL = float(os.environ.get('REPORT_CACHE_SHARED_POLL', 30))
+    
+    # Disk format for cached reports: 'binary' (columnar, memory-mapped numeric columns)
+    # or 'json'. REPORT_CACHE_COMPRESS zlib-compresses binary entries instead of mapping them
+    REPORT_CACHE_FORMAT = os.environ.get('REPORT_CACHE_FORMAT', 'binary')
+    REPORT_CACHE_COMPRESS = os.environ.get('REPORT_CACHE_COMPRESS') == 'true'
+    
+    # Seconds one worker may spend rebuilding a report before another takes over its lease
+    REPORT_CACHE_LEASE = float(os.environ.get('REPORT_CACHE_LEASE', 120))
+    
+    # Public article pages built by `flask --app app prerender`; set PRERENDER=false to
+    # always render them live
+    PRERENDER = os.environ.get('PRERENDER', 'true') != 'false'
+    PRERENDER_DIR = os.environ.get('PRERENDER_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prerendered'))
+    
+    # Time budget for a single scrape or sentiment job (seconds), and how long before
+    # the deadline to stop taking new work so in-flight requests can finish and commit
+    JOB_TIME_BUDGET = float(os.environ.get('JOB_TIME_BUDGET', 240))
+    JOB_DEADLINE_MARGIN = float(os.environ.get('JOB_DEADLINE_MARGIN', 20))
+    
+    # Background jobs: when enabled, /scrape and /analyze_sentiments queue work for
+    # the worker process (python -m electrek_scraper.worker) instead of running inline
+    BACKGROUND_JOBS = os.environ.get('BACKGROUND_JOBS') == 'true'
+    JOB_DB_PATH = os.environ.get('JOB_DB_PATH', 'instance/jobs.sqlite3')
\ No newline at end of file
@@ -1,4 +1,5 @@
 # electrek_scraper/models.py
+import time
 from datetime import datetime
 from supabase import create_client
 from .config import Config
@@ -6,6 +7,27 @@ from .config import Config
 # Initialize Supabase client
 supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
 
+# Set once the update_sentiment_scores RPC (sql/update_sentiment_scores.sql) turns out to be missing
+_sentiment_rpc_missing = False
+
+# Error codes for a function that isn't installed: PostgREST's schema cache miss and
+# Postgres' undefined_function. Anything else (timeouts, 5xx) is worth retrying later.
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+# Same for a table (PostgREST schema cache miss, Postgres undefined_table)
+MISSING_TABLE_CODES = ('PGRST205', '42P01')
+
+# Attempts at the bulk sentiment RPC before a chunk falls back to grouped updates
+SENTIMENT_RPC_ATTEMPTS = 2
+
+def is_missing_from_schema(error, codes=MISSING_FUNCTION_CODES):
+    """Whether a Supabase error says the SQL object isn't installed (rather than a transient failure)"""
+    return getattr(error, 'code', None) in codes
+
+def _invalidate_reports():
+    """Mark cached reports stale after articles or scores change"""
+    from .utils.cache_service import invalidate_report_cache
+    invalidate_report_cache()
+
 class Article:
     """Model to interact with the articles table in Supabase"""
     
@@ -13,43 +35,13 @@ class Article:
     def get_all(limit=None, order_by="published_at", ascending=False):
         """Get all articles with optional sorting and pagination"""
         try:
-            # If limit is None or very large, use pagination to get all articles
+            # If limit is None or very large, fetch the pages concurrently
             if limit is None or limit > 1000:
-                all_data = []
-                page_size = 1000
-                current_page = 0
-                
-                while True:
-                    # Build query with proper ordering
-                    query = supabase.table("articles") \
-                        .select("*") \
-                        .order(order_by, desc=(not ascending)) \
-                        .range(current_page * page_size, (current_page + 1) * page_size - 1)
-                    
-                    # Execute query
-                    response = query.execute()
-                    
-                    # Get the data from this page
-                    page_data = response.data
-                    
-                    # If no more data, break the loop
-                    if not page_data:
-                        break
-                        
-                    # Add this page's data to our results
-                    all_data.extend(page_data)
-                    
-                    # If we got fewer results than the page size, we're done
-                    if len(page_data) < page_size:
-                        break
-                        
-                    # If we've reached the specified limit, we're done
-                    if limit is not None and len(all_data) >= limit:
-                        all_data = all_data[:limit]  # Trim to exact limit
-                        break
-                        
-                    # Move to next page
-                    current_page += 1
+                from .utils.paginated_reader import PaginatedReader
+                all_data = PaginatedReader(
+                    supabase, "articles",
+                    order=((order_by, not ascending), ("id", False))
+                ).read_all(limit)
                 
                 print(f"Retrieved {len(all_data)} articles using pagination")
                 return all_data
@@ -88,7 +80,8 @@ class Article:
                 .update(update_data) \
                 .eq("id", article_id) \
                 .execute()
-                
+            
+            _invalidate_reports()
             return response.data
             
         except Exception as e:
@@ -99,60 +92,101 @@ class Article:
 
     @staticmethod
     def get_sentiment_data(months=None):
-        """Get sentiment data for correlation analysis using pagination"""
-        try:
-            all_data = []
-            page_size = 1000
-            current_page = 0
-            
-            # Build base query
-            base_query = supabase.table("articles") \
-                .select("id, title, sentiment_score, comment_count, published_at") \
-                .not_.is_("sentiment_score", "null")
-            
-            # Apply date filter if months is specified
-            if months is not None:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
-                base_query = base_query.gte("published_at", start_date)
-                period_msg = f"for the last {months} months"
-            else:
-                period_msg = "for all time"
-            
-            while True:
-                # Add pagination
-                query = base_query.range(current_page * page_size, (current_page + 1) * page_size - 1)
-                
-                # Execute query
-                response = query.execute()
-                
-                # Get the data from this page
-                page_data = response.data
-                
-                # If no more data, break the loop
-                if not page_data:
-                    break
-                    
-                # Add this page's data to our results
-                all_data.extend(page_data)
-                
-                # If we got fewer results than the page size, we're done
-                if len(page_data) < page_size:
+        """Get sentiment data for correlation analysis"""
+        from .utils.report_engine import ReportEngine
+        return ReportEngine(months).sentiment_data()
+    
+    @staticmethod
+    def update_sentiment_scores(scores, chunk_size=500):
+        """
+        Write many sentiment scores with one round trip per chunk
+        
+        Parameters:
+        - scores: {article_id: sentiment_score}
+        - chunk_size: Scores sent per request
+        
+        Returns {'updated': count, 'failed': [article ids], 'chunks': [per-chunk timing]}.
+        Uses the update_sentiment_scores RPC when it is installed; otherwise, or when the
+        RPC keeps failing for a chunk, the chunk is written with one UPDATE ... IN per
+        distinct score value.
+        """
+        global _sentiment_rpc_missing
+        items = [(int(article_id), float(score)) for article_id, score in scores.items()]
+        summary = {'updated': 0, 'failed': [], 'chunks': []}
+        
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            chunk_start = time.perf_counter()
+            method = 'rpc'
+            
+            response = None
+            for attempt in range(0 if _sentiment_rpc_missing else SENTIMENT_RPC_ATTEMPTS):
+                try:
+                    response = supabase.rpc('update_sentiment_scores', {
+                        'scores': [{'id': article_id, 'score': score} for article_id, score in chunk]
+                    }).execute()
                     break
-                    
-                # Move to next page
-                current_page += 1
-            
-            print(f"Retrieved {len(all_data)} articles with sentiment scores {period_msg}")
+                except Exception as e:
+                    # Only a missing function disables the RPC; other errors are retried
+                    if is_missing_from_schema(e):
+                        print(f"Bulk sentiment RPC not installed, falling back to grouped updates: {str(e)}")
+                        _sentiment_rpc_missing = True
+                        break
+                    print(f"Bulk sentiment RPC failed (attempt {attempt + 1}/{SENTIMENT_RPC_ATTEMPTS}): {str(e)}")
             
-            return all_data
+            if response is not None:
+                updated = response.data if isinstance(response.data, int) else len(chunk)
+            else:
+                # Scores repeat a lot (GPT answers in tenths), so grouping keeps requests low
+                method = 'grouped'
+                by_score = {}
+                for article_id, score in chunk:
+                    by_score.setdefault(score, []).append(article_id)
                 
-        except Exception as e:
-            print(f"Error getting sentiment data: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return []
-
+                updated = 0
+                for score, article_ids in by_score.items():
+                    try:
+                        response = supabase.table("articles") \
+                            .update({'sentiment_score': score}) \
+                            .in_("id", article_ids) \
+                            .execute()
+                        updated += len(response.data)
+                    except Exception as e:
+                        print(f"Error updating sentiment scores for {len(article_ids)} articles: {str(e)}")
+                        summary['failed'].extend(article_ids)
+            
+            elapsed = time.perf_counter() - chunk_start
+            summary['updated'] += updated
+            summary['chunks'].append({'size': len(chunk), 'method': method, 'seconds': round(elapsed, 3)})
+            print(f"Wrote {updated}/{len(chunk)} sentiment scores via {method} in {elapsed * 1000:.0f}ms")
+        
+        if summary['updated']:
+            _invalidate_reports()
+        return summary
+    
+    @staticmethod
+    def get_unscored(after_id=0, limit=200):
+        """Get the next page of articles without a sentiment score, in ID order after `after_id`"""
+        response = supabase.table("articles") \
+            .select("id, title") \
+            .is_("sentiment_score", "null") \
+            .gt("id", after_id) \
+            .order("id") \
+            .limit(limit) \
+            .execute()
+        return response.data
+    
+    @staticmethod
+    def count_unscored(after_id=0):
+        """Count articles without a sentiment score after `after_id`"""
+        response = supabase.table("articles") \
+            .select("id", count="exact") \
+            .is_("sentiment_score", "null") \
+            .gt("id", after_id) \
+            .limit(1) \
+            .execute()
+        return response.count or 0
+    
     @staticmethod
     def update_sentiment_score_direct(article_id, sentiment_score):
         """Update the sentiment score using a direct SQL query"""
@@ -166,6 +200,7 @@ class Article:
             response = supabase.rpc('execute_sql', {'sql_query': sql}).execute()
             
             print(f"Direct SQL update response: {response}")
+            _invalidate_reports()
             return True
         except Exception as e:
             print(f"Error in direct SQL update: {str(e)}")
@@ -183,8 +218,8 @@ class Article:
         return response.data
     
     @staticmethod
-    def create(article_data):
-        """Insert a new article with simplified fields"""
+    def _simplify(article_data):
+        """Reduce scraped article data to the stored columns"""
         simplified_data = {
             'title': article_data.get('title', ''),
             'url': article_data.get('url', ''),
@@ -197,17 +232,89 @@ class Article:
         if 'published_at' in simplified_data and isinstance(simplified_data['published_at'], datetime):
             simplified_data['published_at'] = simplified_data['published_at'].isoformat()
         
+        # The report aggregate trigger (sql/report_aggregates.sql) and the report SQL
+        # functions (sql/report_functions.sql) both read the company mask
+        if Config.REPORT_AGGREGATES or Config.REPORT_RPC:
+            from .utils.company_classifier import get_company_classifier
+            simplified_data['company_mask'] = get_company_classifier().classify(simplified_data['title'])
+        
+        return simplified_data
+    
+    @staticmethod
+    def create(article_data):
+        """Insert a new article with simplified fields"""
+        simplified_data = Article._simplify(article_data)
+        
         print(f"Inserting simplified data: {simplified_data}")
         
         try:
             response = supabase.table("articles") \
                 .insert(simplified_data) \
                 .execute()
+            _invalidate_reports()
             return response.data
         except Exception as e:
             print(f"Database insert error: {str(e)}")
             raise
     
+    @staticmethod
+    def create_many(articles_data, chunk_size=100):
+        """
+        Insert articles in chunked upserts, ignoring URLs that are already stored
+        
+        Returns one outcome per input row, in order:
+        {'url': ..., 'status': 'created' | 'skipped' | 'failed', 'error': ...}
+        """
+        outcomes = []
+        rows = [Article._simplify(article_data) for article_data in articles_data]
+        
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            
+            try:
+                # Rows whose URL already exists are ignored and not returned
+                response = supabase.table("articles") \
+                    .upsert(chunk, on_conflict="url", ignore_duplicates=True) \
+                    .execute()
+                created_urls = {row['url'] for row in response.data}
+                
+                for row in chunk:
+                    status = 'created' if row['url'] in created_urls else 'skipped'
+                    outcomes.append({'url': row['url'], 'status': status, 'error': None})
+                    
+            except Exception as e:
+                # Retry row by row so one bad row doesn't fail the whole chunk
+                print(f"Bulk upsert of {len(chunk)} articles failed, retrying individually: {str(e)}")
+                for row in chunk:
+                    try:
+                        response = supabase.table("articles") \
+                            .upsert(row, on_conflict="url", ignore_duplicates=True) \
+                            .execute()
+                        status = 'created' if response.data else 'skipped'
+                        outcomes.append({'url': row['url'], 'status': status, 'error': None})
+                    except Exception as row_error:
+                        outcomes.append({'url': row['url'], 'status': 'failed', 'error': str(row_error)})
+        
+        created_count = sum(1 for outcome in outcomes if outcome['status'] == 'created')
+        print(f"Bulk insert: {created_count} of {len(rows)} articles created")
+        if created_count:
+            _invalidate_reports()
+        return outcomes
+    
+    @staticmethod
+    def get_high_water_mark():
+        """Get the newest stored article (url and published_at) for incremental scrapes"""
+        try:
+            response = supabase.table("articles") \
+                .select("url, published_at") \
+                .order("published_at", desc=True) \
+                .limit(1) \
+                .execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting high-water mark: {str(e)}")
+            return None
+    
     @staticmethod
     def url_exists(url):
         """Check if article with URL already exists"""
@@ -219,559 +326,306 @@ class Article:
         return len(response.data) > 0
 
     @staticmethod
-    def get_statistics(months=None):
-        """Get various statistics about the articles with date filtering support"""
+    def existing_urls(urls, chunk_size=200):
+        """Return the subset of URLs already stored, using a few chunked IN queries"""
+        candidates = list(dict.fromkeys(url for url in urls if url))
+        existing = set()
         
-        # Initialize default values
-        total_articles = 0
-        total_comments = 0
-        avg_comments = 0
-        max_comments = 0
-        most_commented_article = None
+        for start in range(0, len(candidates), chunk_size):
+            chunk = candidates[start:start + chunk_size]
+            response = supabase.table("articles") \
+                .select("url") \
+                .in_("url", chunk) \
+                .execute()
+            existing.update(row["url"] for row in response.data)
         
-        try:
-            # Define start date if months is specified
-            start_date = None
-            if months is not None:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
-                period_msg = f"for the last {months} months"
-            else:
-                period_msg = "for all time"
-            
-            # Get total articles count
-            if start_date:
-                # With date filter
-                articles_response = supabase.table("articles") \
-                    .select("count") \
-                    .gte("published_at", start_date) \
-                    .execute()
+        return existing
+
+    @staticmethod
+    def iter_pages(columns="*", order_by="published_at", ascending=False, page_size=1000, filters=None, limit=None):
+        """
+        Yield articles one page (a list of dicts) at a time, fetching each page only when needed
+        
+        Parameters:
+        - columns: Column projection, e.g. "id, title, comment_count"
+        - order_by / ascending: Sort order; ID ascending walks the table by keyset,
+          anything else uses offset pages with ID as a tie-breaker
+        - page_size: Rows per request
+        - filters: Optional function applying filters to the select builder
+        - limit: Stop after this many rows
+        """
+        from .utils.paginated_reader import PaginatedReader
+        reader = PaginatedReader(
+            supabase, "articles",
+            columns=columns,
+            filters=filters,
+            order=((order_by, not ascending), ("id", False)),
+            page_size=page_size
+        )
+        
+        if order_by == "id" and ascending and limit is None:
+            yield from reader.iter_keyset()
+        else:
+            yield from reader.iter_pages(limit)
+
+    @staticmethod
+    def get_page(order_by="published_at", ascending=False, cursor=None, limit=100, columns="*"):
+        """
+        Get one page of articles by keyset, in (order_by, id) order with NULLs last
+        
+        Parameters:
+        - cursor: Token from the previous page (None = first page)
+        - limit: Articles per page
+        - columns: Column projection; must include id and the order_by column
+        
+        Returns (articles, next_cursor); next_cursor is None on the last page. Each page
+        costs one indexed range query, however deep it is.
+        """
+        from .utils.deadline import encode_resume_token, decode_resume_token
+        
+        def ordered(query, size):
+            return query \
+                .order(order_by, desc=(not ascending), nullsfirst=False) \
+                .order("id") \
+                .limit(size) \
+                .execute().data
+        
+        def null_zone(after_id, size):
+            # Rows whose sort value is NULL come last, in ID order
+            return ordered(supabase.table("articles").select(columns).is_(order_by, "null").gt("id", after_id), size)
+        
+        # One extra row tells us whether there is a next page
+        position = decode_resume_token(cursor) if cursor else None
+        if not position or position.get('sort') != [order_by, ascending] or 'id' not in position:
+            rows = ordered(supabase.table("articles").select(columns), limit + 1)
+        elif position.get('value') is None:
+            rows = null_zone(int(position['id']), limit + 1)
+        else:
+            value, last_id = position['value'], int(position['id'])
+            
+            # The range bound on order_by lets Postgres start the index scan at the cursor;
+            # quoting keeps timestamps and decimals intact in PostgREST's filter syntax
+            query = supabase.table("articles").select(columns)
+            if ascending:
+                query = query.gte(order_by, value).or_(f'{order_by}.gt."{value}",id.gt.{last_id}')
             else:
-                # Without date filter
-                articles_response = supabase.table("articles") \
-                    .select("count") \
-                    .execute()
-            
-            if hasattr(articles_response, 'count') and articles_response.count is not None:
-                total_articles = articles_response.count
-            elif articles_response.data and len(articles_response.data) > 0:
-                if isinstance(articles_response.data[0], dict) and 'count' in articles_response.data[0]:
-                    total_articles = articles_response.data[0]['count']
-            
-            if not total_articles:  # Still no count, get all IDs
-                if start_date:
-                    id_response = supabase.table("articles") \
-                        .select("id") \
-                        .gte("published_at", start_date) \
-                        .execute()
-                else:
-                    id_response = supabase.table("articles") \
-                        .select("id") \
-                        .execute()
-                    
-                if id_response.data:
-                    total_articles = len(id_response.data)
-                    
-            # Get ALL articles with comment counts - use pagination to get all
-            all_articles_with_comments = []
-            page_size = 1000
-            current_page = 0
-            
-            while True:
-                # Build page query with date filter if needed
-                if start_date:
-                    comment_response = supabase.table("articles") \
-                        .select("id, title, comment_count, published_at") \
-                        .gte("published_at", start_date) \
-                        .range(current_page * page_size, (current_page + 1) * page_size - 1) \
-                        .execute()
-                else:
-                    comment_response = supabase.table("articles") \
-                        .select("id, title, comment_count, published_at") \
-                        .range(current_page * page_size, (current_page + 1) * page_size - 1) \
-                        .execute()
-                    
-                page_data = comment_response.data
-                
-                if not page_data:
-                    break
-                    
-                all_articles_with_comments.extend(page_data)
-                
-                if len(page_data) < page_size:
-                    break
-                    
-                current_page += 1
-            
-            print(f"Retrieved {len(all_articles_with_comments)} articles with comments {period_msg}")
-            
-            # Debug - check highest comment values
-            sorted_by_comments = sorted(all_articles_with_comments, 
-                                    key=lambda x: x.get('comment_count', 0) if x.get('comment_count') is not None else 0,
-                                    reverse=True)
-            
-            if len(sorted_by_comments) > 0:
-                print(f"Highest comment article: {sorted_by_comments[0].get('title', 'No title')} - {sorted_by_comments[0].get('comment_count')} comments")
-            
-            # For total comments, use a direct sum of all non-null values
-            comment_counts = []
-            for article in all_articles_with_comments:
-                count = article.get('comment_count')
-                if count is not None:
-                    try:
-                        count_value = int(count)
-                        comment_counts.append(count_value)
-                        # Track max comments
-                        if count_value > max_comments:
-                            max_comments = count_value
-                    except (ValueError, TypeError):
-                        pass
-            
-            # Calculate total and average
-            if comment_counts:
-                total_comments = sum(comment_counts)
-                avg_comments = round(total_comments / len(comment_counts))
-            
-            # Get article with the highest comment count
-            if max_comments > 0:
-                most_commented_article = next((a for a in all_articles_with_comments if a.get('comment_count') == max_comments), None)
-            
-            print(f"Stats calculation {period_msg}: {total_articles} articles, {total_comments} total comments, {avg_comments} avg, {max_comments} max")
-            
-        except Exception as e:
-            print(f"Error calculating statistics: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+                query = query.lte(order_by, value).or_(f'{order_by}.lt."{value}",id.gt.{last_id}')
+            rows = ordered(query, limit + 1)
+            if len(rows) <= limit:
+                rows += null_zone(0, limit + 1 - len(rows))
         
-        return {
-            "total_articles": total_articles,
-            "total_comments": total_comments,
-            "avg_comments": avg_comments,
-            "max_comments": max_comments,
-            "most_commented_article": most_commented_article
-        }
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_resume_token({
+                'sort': [order_by, ascending],
+                'value': rows[-1][order_by],
+                'id': rows[-1]['id']
+            })
+        return rows, next_cursor
 
     @staticmethod
-    def get_monthly_stats(months=6):
-        """Get monthly comment trends and article counts without using a custom RPC function"""
+    def iter_all(columns="*", order_by="published_at", ascending=False, page_size=1000, filters=None, limit=None):
+        """Yield articles one at a time; same parameters as iter_pages"""
+        for page in Article.iter_pages(columns, order_by, ascending, page_size, filters, limit):
+            yield from page
+
+    # Columns every report section reads
+    REPORT_COLUMNS = "id, title, author, comment_count, sentiment_score, published_at"
+
+    @staticmethod
+    def _report_window(months=None, until=None):
+        """Select-builder filter for a reporting window, and a description for logging"""
+        bounds = []
         
-        # Get all articles within the time period
-        from datetime import datetime, timedelta
+        # Apply date filter if months is specified
+        if months is not None:
+            from datetime import timedelta
+            start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
+            bounds.append(("gte", start_date))
+            period_msg = f"for the last {months} months"
+        else:
+            period_msg = "for all time"
         
-        # Calculate the start date
-        start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
+        if until is not None:
+            bounds.append(("lt", until.isoformat()))
+            period_msg += f" before {until.date()}"
         
-        # Fetch all articles in the time period
-        response = supabase.table("articles") \
-            .select("published_at, comment_count") \
-            .gte("published_at", start_date) \
-            .order("published_at") \
-            .execute()
+        def apply_window(query):
+            for operator, value in bounds:
+                query = getattr(query, operator)("published_at", value)
+            return query
+        
+        return apply_window, period_msg
+
+    @staticmethod
+    def get_report_rows(months=None, until=None):
+        """
+        Fetch the columns every report section needs, once, for the given window
         
-        articles = response.data
+        Parameters:
+        - months: Window in months (None = all time)
+        - until: Optional exclusive upper bound on published_at (datetime)
+        """
+        from .utils.paginated_reader import PaginatedReader
+        apply_window, period_msg = Article._report_window(months, until)
         
-        if not articles:
-            # Generate dummy data if no articles found
-            import random
-            
-            data = []
-            today = datetime.now()
-            
-            for i in range(months):
-                month_date = today - timedelta(days=30 * (months - i - 1))
-                month_str = month_date.strftime("%b %Y")
-                
-                data.append({
-                    "month": month_str,
-                    "avg_comments": random.randint(60, 120),
-                    "article_count": random.randint(15, 35)
-                })
-                
-            return data
+        # Ordered by ID so pages don't overlap or skip rows
+        all_rows = PaginatedReader(
+            supabase, "articles",
+            columns=Article.REPORT_COLUMNS,
+            filters=apply_window
+        ).read_all()
+        
+        print(f"Retrieved {len(all_rows)} articles for reports {period_msg}")
+        return all_rows
+
+    @staticmethod
+    def iter_report_rows(months=None):
+        """Stream the report columns for the given window, one row at a time in ID order"""
+        apply_window, _ = Article._report_window(months)
+        return Article.iter_all(Article.REPORT_COLUMNS, order_by="id", ascending=True, filters=apply_window)
+
+    @staticmethod
+    def get_aggregate_rows(table, since_month=None, page_size=1000):
+        """
+        Fetch rows of a report aggregate table (sql/report_aggregates.sql)
+        
+        Parameters:
+        - table: report_monthly_stats, report_author_stats or report_company_stats
+        - since_month: Optional first month to include (date)
+        """
+        from .utils.paginated_reader import PaginatedReader
+        key_column = {'report_monthly_stats': 'month', 'report_author_stats': 'author'}.get(table, 'company_bit')
+        filters = None
+        if since_month is not None:
+            filters = lambda query: query.gte("month", since_month.isoformat())
         
-        # Process the data to group by month
-        from collections import defaultdict
+        return PaginatedReader(
+            supabase, table,
+            filters=filters,
+            order=(("month", False), (key_column, False)),
+            page_size=page_size,
+            count_column="month"
+        ).read_all()
+
+    @staticmethod
+    def backfill_company_masks(recompute=False, page_size=1000):
+        """
+        Store the company mask of existing articles, for the report aggregate trigger
         
-        # Group by month
-        monthly_data = defaultdict(lambda: {"count": 0, "total_comments": 0})
+        Parameters:
+        - recompute: Reclassify every article, not just those without a mask
+          (needed after COMPANY_KEYWORDS changes)
         
-        for article in articles:
-            # Extract the month
-            date = datetime.fromisoformat(article["published_at"].replace('Z', '+00:00'))
-            month_key = date.strftime("%Y-%m")  # Format as YYYY-MM for sorting
-            month_display = date.strftime("%b %Y")  # Format as MMM YYYY for display
-            
-            # Accumulate data
-            monthly_data[month_key]["month"] = month_display
-            monthly_data[month_key]["count"] += 1
-            monthly_data[month_key]["total_comments"] += article["comment_count"]
-        
-        # Calculate averages and format result
-        result = []
-        for month_key in sorted(monthly_data.keys()):
-            data = monthly_data[month_key]
-            result.append({
-                "month": data["month"],
-                "avg_comments": round(data["total_comments"] / data["count"]),
-                "article_count": data["count"]
-            })
+        Returns the number of articles updated.
+        """
+        from .utils.company_classifier import get_company_classifier
+        from .utils.paginated_reader import PaginatedReader
+        classifier = get_company_classifier()
+        updated = 0
         
-        return result
+        reader = PaginatedReader(
+            supabase, "articles",
+            columns="id, title, company_mask",
+            filters=None if recompute else lambda query: query.is_("company_mask", "null"),
+            page_size=page_size
+        )
+        
+        for page in reader.iter_keyset():
+            after_id = page[-1]['id']
+            
+            # Few distinct masks per page, so one UPDATE ... IN per mask
+            by_mask = {}
+            for row in page:
+                mask = classifier.classify(row['title'])
+                if mask != row.get('company_mask'):
+                    by_mask.setdefault(mask, []).append(row['id'])
+            
+            for mask, article_ids in by_mask.items():
+                supabase.table("articles") \
+                    .update({'company_mask': mask}) \
+                    .in_("id", article_ids) \
+                    .execute()
+                updated += len(article_ids)
+            print(f"Company masks: {updated} articles updated (through ID {after_id})")
+        
+        return updated
+
+    @staticmethod
+    def refresh_report_aggregates():
+        """Rebuild the report aggregate tables from the articles table"""
+        supabase.rpc('refresh_report_aggregates', {}).execute()
+
+    @staticmethod
+    def call_report_function(function, params):
+        """Call one of the report SQL functions (sql/report_functions.sql) and return its rows"""
+        response = supabase.rpc(function, params).execute()
+        return response.data or []
+
+    @staticmethod
+    def get_report(months=None, top_limit=25):
+        """
+        Get every reports dashboard section from a single fetch of the articles table
+        
+        Returns a dict with filtered_stats, all_sentiment_data, monthly_data, top_articles,
+        author_analysis, company_comparison and business_metrics, each identical to what
+        the matching get_* method returns.
+        """
+        from .utils.report_engine import ReportEngine
+        return ReportEngine(months).report(top_limit)
+
+    @staticmethod
+    def get_cached_report(months=None, top_limit=25, ttl=None):
+        """
+        get_report() through the tiered report cache
+        
+        Stale reports (past `ttl` seconds, or older than the latest article/score write)
+        are returned at once and recomputed in the background.
+        """
+        from .utils.cache_service import get_report_cache
+        return get_report_cache().get_or_compute(
+            f"report_top{top_limit}",
+            lambda: Article.get_report(months, top_limit),
+            months=months,
+            ttl=ttl
+        )
+
+    @staticmethod
+    def get_statistics(months=None):
+        """Get various statistics about the articles with date filtering support"""
+        from .utils.report_queries import report_section
+        return report_section('statistics', months)
+
+    @staticmethod
+    def get_monthly_stats(months=6):
+        """Get monthly comment trends and article counts"""
+        from .utils.report_queries import report_section
+        return report_section('monthly_stats', months)
 
     @staticmethod
     def get_top_articles_analysis(limit=20, months=None):
         """Get top engaging articles with Tesla classification for business impact analysis"""
-        try:
-            # Build base query for articles with sentiment scores
-            base_query = supabase.table("articles") \
-                .select("id, title, author, comment_count, sentiment_score, published_at") \
-                .not_.is_("sentiment_score", "null") \
-                .order("comment_count", desc=True) \
-                .limit(limit)
-            
-            # Apply date filter if specified
-            if months is not None:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
-                base_query = base_query.gte("published_at", start_date)
-            
-            response = base_query.execute()
-            articles = response.data
-            
-            # Add Tesla classification and sentiment category
-            from .utils.sentiment_service import SentimentService
-            sentiment_service = SentimentService()
-            
-            for article in articles:
-                title_lower = article.get('title', '').lower()
-                # Check for Tesla/Elon mentions
-                article['is_tesla'] = any(keyword in title_lower for keyword in ['tesla', 'elon', 'musk'])
-                # Check for other EV companies
-                article['is_byd'] = 'byd' in title_lower
-                article['is_ford'] = 'ford' in title_lower
-                article['is_rivian'] = 'rivian' in title_lower
-                
-                # Add sentiment category and color
-                if article.get('sentiment_score') is not None:
-                    score = article.get('sentiment_score')
-                    article['sentiment_category'] = sentiment_service.get_sentiment_category(score)
-                    article['sentiment_color'] = sentiment_service.get_sentiment_color(score)
-            
-            print(f"Retrieved top {len(articles)} engaging articles for business analysis")
-            return articles
-            
-        except Exception as e:
-            print(f"Error getting top articles analysis: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return []
+        from .utils.report_queries import report_section
+        return report_section('top_articles', months, limit)
 
     @staticmethod
     def get_author_tesla_bias(months=None):
         """Analyze author-level Tesla coverage patterns and sentiment bias"""
-        try:
-            # Get all articles with sentiment scores and authors
-            base_query = supabase.table("articles") \
-                .select("author, title, sentiment_score, comment_count, published_at") \
-                .not_.is_("sentiment_score", "null") \
-                .not_.is_("author", "null")
-            
-            # Apply date filter if specified
-            if months is not None:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
-                base_query = base_query.gte("published_at", start_date)
-            
-            # Get all data using pagination
-            all_articles = []
-            page_size = 1000
-            current_page = 0
-            
-            while True:
-                query = base_query.range(current_page * page_size, (current_page + 1) * page_size - 1)
-                response = query.execute()
-                page_data = response.data
-                
-                if not page_data:
-                    break
-                    
-                all_articles.extend(page_data)
-                
-                if len(page_data) < page_size:
-                    break
-                    
-                current_page += 1
-            
-            # Process by author
-            from collections import defaultdict
-            author_stats = defaultdict(lambda: {
-                'total_articles': 0,
-                'tesla_articles': 0,
-                'tesla_sentiment_sum': 0,
-                'tesla_comments_sum': 0,
-                'non_tesla_sentiment_sum': 0,
-                'non_tesla_comments_sum': 0,
-                'non_tesla_articles': 0
-            })
-            
-            for article in all_articles:
-                author = article.get('author', 'Unknown')
-                title_lower = article.get('title', '').lower()
-                sentiment = article.get('sentiment_score', 0)
-                comments = article.get('comment_count', 0)
-                
-                is_tesla = any(keyword in title_lower for keyword in ['tesla', 'elon', 'musk'])
-                
-                stats = author_stats[author]
-                stats['total_articles'] += 1
-                
-                if is_tesla:
-                    stats['tesla_articles'] += 1
-                    stats['tesla_sentiment_sum'] += sentiment
-                    stats['tesla_comments_sum'] += comments
-                else:
-                    stats['non_tesla_articles'] += 1
-                    stats['non_tesla_sentiment_sum'] += sentiment
-                    stats['non_tesla_comments_sum'] += comments
-            
-            # Calculate final metrics
-            author_analysis = []
-            for author, stats in author_stats.items():
-                if stats['total_articles'] >= 5:  # Only authors with 5+ articles
-                    analysis = {
-                        'author': author,
-                        'total_articles': stats['total_articles'],
-                        'tesla_articles': stats['tesla_articles'],
-                        'tesla_percentage': round((stats['tesla_articles'] / stats['total_articles']) * 100, 1),
-                        'avg_tesla_sentiment': round(stats['tesla_sentiment_sum'] / max(stats['tesla_articles'], 1), 3),
-                        'avg_tesla_comments': round(stats['tesla_comments_sum'] / max(stats['tesla_articles'], 1), 1),
-                        'avg_non_tesla_sentiment': round(stats['non_tesla_sentiment_sum'] / max(stats['non_tesla_articles'], 1), 3),
-                        'avg_non_tesla_comments': round(stats['non_tesla_comments_sum'] / max(stats['non_tesla_articles'], 1), 1)
-                    }
-                    author_analysis.append(analysis)
-            
-            # Sort by Tesla article count
-            author_analysis.sort(key=lambda x: x['tesla_articles'], reverse=True)
-            
-            print(f"Analyzed {len(author_analysis)} authors with 5+ articles")
-            return author_analysis
-            
-        except Exception as e:
-            print(f"Error getting author Tesla bias analysis: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return []
+        from .utils.report_queries import report_section
+        return report_section('author_tesla_bias', months)
 
     @staticmethod
     def get_company_comparison(months=None):
         """Compare engagement metrics across different EV companies mentioned in articles"""
-        try:
-            # Get all articles with sentiment scores
-            base_query = supabase.table("articles") \
-                .select("title, comment_count, sentiment_score, published_at") \
-                .not_.is_("sentiment_score", "null")
-            
-            # Apply date filter if specified
-            if months is not None:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=30 * months)).isoformat()
-                base_query = base_query.gte("published_at", start_date)
-            
-            # Get all data using pagination
-            all_articles = []
-            page_size = 1000
-            current_page = 0
-            
-            while True:
-                query = base_query.range(current_page * page_size, (current_page + 1) * page_size - 1)
-                response = query.execute()
-                page_data = response.data
-                
-                if not page_data:
-                    break
-                    
-                all_articles.extend(page_data)
-                
-                if len(page_data) < page_size:
-                    break
-                    
-                current_page += 1
-            
-            # Define company keywords and stats
-            companies = {
-                'Tesla/Elon': ['tesla', 'elon', 'musk'],
-                'BYD': ['byd'],
-                'Ford': ['ford'],
-                'GM': ['gm', 'general motors'],
-                'Rivian': ['rivian'],
-                'Lucid': ['lucid'],
-                'Nio': ['nio'],
-                'Volkswagen': ['volkswagen', 'vw'],
-                'BMW': ['bmw'],
-                'Mercedes': ['mercedes', 'mercedes-benz']
-            }
-            
-            company_stats = {}
-            for company in companies:
-                company_stats[company] = {
-                    'articles': [],
-                    'total_comments': 0,
-                    'avg_comments': 0,
-                    'avg_sentiment': 0,
-                    'negative_articles': 0,
-                    'positive_articles': 0
-                }
-            
-            # Classify articles by company mentions
-            for article in all_articles:
-                title_lower = article.get('title', '').lower()
-                comment_count = article.get('comment_count', 0)
-                sentiment = article.get('sentiment_score', 0)
-                
-                for company, keywords in companies.items():
-                    if any(keyword in title_lower for keyword in keywords):
-                        stats = company_stats[company]
-                        stats['articles'].append({
-                            'title': article.get('title'),
-                            'comments': comment_count,
-                            'sentiment': sentiment
-                        })
-                        stats['total_comments'] += comment_count
-                        
-                        if sentiment < -0.1:
-                            stats['negative_articles'] += 1
-                        elif sentiment > 0.1:
-                            stats['positive_articles'] += 1
-            
-            # Calculate averages and metrics
-            comparison_data = []
-            for company, stats in company_stats.items():
-                if len(stats['articles']) > 0:
-                    article_count = len(stats['articles'])
-                    avg_comments = round(stats['total_comments'] / article_count, 1)
-                    avg_sentiment = round(sum(a['sentiment'] for a in stats['articles']) / article_count, 3)
-                    
-                    comparison_data.append({
-                        'company': company,
-                        'article_count': article_count,
-                        'total_comments': stats['total_comments'],
-                        'avg_comments': avg_comments,
-                        'avg_sentiment': avg_sentiment,
-                        'negative_articles': stats['negative_articles'],
-                        'positive_articles': stats['positive_articles'],
-                        'negative_percentage': round((stats['negative_articles'] / article_count) * 100, 1)
-                    })
-            
-            # Sort by average comments (engagement)
-            comparison_data.sort(key=lambda x: x['avg_comments'], reverse=True)
-            
-            print(f"Compared engagement across {len(comparison_data)} EV companies")
-            return comparison_data
-            
-        except Exception as e:
-            print(f"Error getting company comparison: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return []
+        from .utils.report_queries import report_section
+        return report_section('company_comparison', months)
 
     @staticmethod
     def get_business_impact_metrics(months=None):
         """Calculate key business impact metrics that quantify the value of Tesla hate content"""
-        try:
-            # Get sentiment data with Tesla classification
-            all_sentiment_data = Article.get_sentiment_data(months)
-            
-            if not all_sentiment_data:
-                return {}
-            
-            # Classify articles
-            tesla_articles = []
-            non_tesla_articles = []
-            tesla_negative = []
-            tesla_positive = []
-            non_tesla_negative = []
-            non_tesla_positive = []
-            
-            for article in all_sentiment_data:
-                title_lower = article.get('title', '').lower()
-                sentiment = article.get('sentiment_score', 0)
-                comments = article.get('comment_count', 0)
-                
-                is_tesla = any(keyword in title_lower for keyword in ['tesla', 'elon', 'musk'])
-                
-                if is_tesla:
-                    tesla_articles.append(article)
-                    if sentiment < -0.1:
-                        tesla_negative.append(article)
-                    elif sentiment > 0.1:
-                        tesla_positive.append(article)
-                else:
-                    non_tesla_articles.append(article)
-                    if sentiment < -0.1:
-                        non_tesla_negative.append(article)
-                    elif sentiment > 0.1:
-                        non_tesla_positive.append(article)
-            
-            # Calculate key metrics
-            tesla_avg_comments = sum(a.get('comment_count', 0) for a in tesla_articles) / max(len(tesla_articles), 1)
-            non_tesla_avg_comments = sum(a.get('comment_count', 0) for a in non_tesla_articles) / max(len(non_tesla_articles), 1)
-            
-            tesla_negative_avg = sum(a.get('comment_count', 0) for a in tesla_negative) / max(len(tesla_negative), 1)
-            tesla_positive_avg = sum(a.get('comment_count', 0) for a in tesla_positive) / max(len(tesla_positive), 1)
-            non_tesla_negative_avg = sum(a.get('comment_count', 0) for a in non_tesla_negative) / max(len(non_tesla_negative), 1)
-            
-            # Calculate multipliers
-            tesla_multiplier = round(tesla_avg_comments / max(non_tesla_avg_comments, 1), 2)
-            negative_tesla_multiplier = round(tesla_negative_avg / max(non_tesla_negative_avg, 1), 2)
-            tesla_sentiment_bias = round((len(tesla_negative) / max(len(tesla_articles), 1)) * 100, 1)
-            non_tesla_sentiment_bias = round((len(non_tesla_negative) / max(len(non_tesla_articles), 1)) * 100, 1)
-            
-            # Engagement intensity (negative vs positive Tesla)
-            tesla_negative_boost = 0
-            if tesla_positive_avg > 0:
-                tesla_negative_boost = round(((tesla_negative_avg - tesla_positive_avg) / tesla_positive_avg) * 100, 1)
-            
-            # Total Tesla traffic contribution
-            total_tesla_comments = sum(a.get('comment_count', 0) for a in tesla_articles)
-            total_all_comments = sum(a.get('comment_count', 0) for a in all_sentiment_data)
-            tesla_traffic_percentage = round((total_tesla_comments / max(total_all_comments, 1)) * 100, 1)
-            
-            metrics = {
-                # Core multipliers
-                'tesla_engagement_multiplier': tesla_multiplier,
-                'negative_tesla_multiplier': negative_tesla_multiplier,
-                
-                # Sentiment bias
-                'tesla_negative_percentage': tesla_sentiment_bias,
-                'non_tesla_negative_percentage': non_tesla_sentiment_bias,
-                'sentiment_bias_difference': round(tesla_sentiment_bias - non_tesla_sentiment_bias, 1),
-                
-                # Engagement metrics
-                'tesla_avg_comments': round(tesla_avg_comments, 1),
-                'non_tesla_avg_comments': round(non_tesla_avg_comments, 1),
-                'tesla_negative_avg_comments': round(tesla_negative_avg, 1),
-                'tesla_positive_avg_comments': round(tesla_positive_avg, 1),
-                'tesla_negative_boost_percentage': tesla_negative_boost,
-                
-                # Traffic contribution
-                'tesla_traffic_percentage': tesla_traffic_percentage,
-                'tesla_article_count': len(tesla_articles),
-                'non_tesla_article_count': len(non_tesla_articles),
-                'tesla_percentage_of_coverage': round((len(tesla_articles) / len(all_sentiment_data)) * 100, 1),
-                
-                # Estimated business impact (assuming comments = engagement = revenue)
-                'estimated_revenue_multiplier': tesla_multiplier,
-                'estimated_tesla_revenue_share': tesla_traffic_percentage
-            }
-            
-            print(f"Calculated business impact metrics from {len(all_sentiment_data)} articles")
-            return metrics
-            
-        except Exception as e:
-            print(f"Error calculating business impact metrics: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return {}
+        from .utils.report_engine import ReportEngine
+        return ReportEngine(months).business_impact_metrics()
 
     @staticmethod
     def get_article_metadata(article_slug):
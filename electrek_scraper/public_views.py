@@ -67,75 +67,36 @@ def index():
     return response
 
 
-@bp.route('/articles/fred-lambert-sellout')
-def fred_lambert_sellout():
-    """Tesla Hate Machine Sharp article - public access"""
-    from .utils.cache_service import ChartDataCache
+def _public_report():
+    """All-time report behind the public articles"""
+    # The report cache keeps this for a month, refreshing it in the background
+    # once new articles or scores are written
+    return Article.get_cached_report(None, top_limit=25, ttl=30 * 86400)
+
+def fred_lambert_sellout_context(chart_data=None):
+    """
+    Template context for the fred-lambert-sellout article
     
+    Parameters:
+    - chart_data: Report to render (default: the cached all-time report)
+    """
     # Use ALL available data for maximum impact
     months = None  # None = all time data
-    cache = ChartDataCache(ttl_days=30)  # Cache for 1 month
-    
-    # Try to get all chart data from cache
-    chart_data = cache.get('tesla_article_complete', months)
     
     if chart_data is None:
-        # Generate fresh data and cache it
-        filtered_stats = Article.get_statistics(months)
-        all_sentiment_data = Article.get_sentiment_data(months)
-        top_articles = Article.get_top_articles_analysis(25, months)
-        author_analysis = Article.get_author_tesla_bias(months)
-        company_comparison = Article.get_company_comparison(months)
-        business_metrics = Article.get_business_impact_metrics(months)
-        
-        # Bundle all data for caching
-        chart_data = {
-            'filtered_stats': filtered_stats,
-            'all_sentiment_data': all_sentiment_data,
-            'top_articles': top_articles,
-            'author_analysis': author_analysis,
-            'company_comparison': company_comparison,
-            'business_metrics': business_metrics
-        }
-        
-        # Cache the complete dataset
-        cache.set('tesla_article_complete', chart_data, months)
+        chart_data = _public_report()
     
     # Extract data from cache
     filtered_stats = chart_data['filtered_stats']
-    all_sentiment_data = chart_data['all_sentiment_data']
     top_articles = chart_data['top_articles']
     author_analysis = chart_data['author_analysis']
     company_comparison = chart_data['company_comparison']
     business_metrics = chart_data['business_metrics']
     
-    # Get sentiment service for categorization
-    from .utils.sentiment_service import SentimentService
-    sentiment_service = SentimentService()
-    
-    # Process sentiment data for correlation analysis
-    scatter_data = []
-    for article in all_sentiment_data:
-        if article.get('sentiment_score') is not None and article.get('comment_count') is not None:
-            sentiment_category = sentiment_service.get_sentiment_category(article.get('sentiment_score'))
-            scatter_data.append({
-                'id': article.get('id'),
-                'title': article.get('title', 'Untitled'),
-                'sentiment_score': article.get('sentiment_score'),
-                'comment_count': article.get('comment_count'),
-                'published_at': article.get('published_at'),
-                'sentiment_category': sentiment_category
-            })
-    
-    # Calculate correlation
-    correlation = None
-    if len(scatter_data) >= 5:
-        try:
-            sentiment_scores = [article['sentiment_score'] for article in scatter_data]
-            comment_counts = [article['comment_count'] for article in scatter_data]
-            correlation = np.corrcoef(sentiment_scores, comment_counts)[0, 1]
-        except Exception as e:
-            print(f"Error calculating correlation: {str(e)}")
+    # Scatter series and its correlation; the page fetches the series from /api/charts
+    from .utils.chart_data import report_chart_source, sentiment_correlation
+    scatter_data = report_chart_source(chart_data)['sentiment_data']
+    correlation = sentiment_correlation(scatter_data)
     
     # Get reading time and engagement data from database
     article_slug = 'fred-lambert-sellout'
@@ -165,23 +126,61 @@ def fred_lambert_sellout():
     sparkle_count = engagement.get('sparkle', 0)
     show_sparkles = sparkle_count > 50
     
-    response = make_response(render_template('articles/fred_lambert_sellout.html',
-                                           stats=filtered_stats,
-                                           sentiment_data=scatter_data,
-                                           correlation=correlation,
-                                           top_articles=top_articles,
-                                           author_analysis=author_analysis,
-                                           company_comparison=company_comparison,
-                                           business_metrics=business_metrics,
-                                           reading_time=reading_time,
-                                           sparkle_count=sparkle_count,
-                                           show_sparkles=show_sparkles,
-                                           article_slug=article_slug,
-                                           months=months))
+    return dict(stats=filtered_stats,
+                sentiment_data=scatter_data,
+                correlation=correlation,
+                top_articles=top_articles,
+                author_analysis=author_analysis,
+                company_comparison=company_comparison,
+                business_metrics=business_metrics,
+                reading_time=reading_time,
+                sparkle_count=sparkle_count,
+                show_sparkles=show_sparkles,
+                article_slug=article_slug,
+                months=months)
+
+# Public articles built by `flask prerender`: slug -> (endpoint, template, context function)
+PRERENDERED_ARTICLES = {
+    'fred-lambert-sellout': ('public.fred_lambert_sellout', 'articles/fred_lambert_sellout.html',
+                             fred_lambert_sellout_context)
+}
+
+@bp.route('/articles/fred-lambert-sellout')
+def fred_lambert_sellout():
+    """Tesla Hate Machine Sharp article - public access"""
+    from .utils.prerender import get_prerendered_page
     
-    # Cache for 30 days on Vercel's CDN
+    # Serve the page built by `flask prerender` when there is one
+    page = get_prerendered_page('fred-lambert-sellout')
+    if page is not None:
+        response = make_response(page['html'])
+        response.set_etag(page['etag'])
+        response.last_modified = page['generated_at']
+    else:
+        response = make_response(render_template('articles/fred_lambert_sellout.html',
+                                                 **fred_lambert_sellout_context()))
+        response.add_etag()
+    
+    # Cache for 30 days on Vercel's CDN, revalidating with If-None-Match / If-Modified-Since
     response.headers['Cache-Control'] = 'public, max-age=2592000'
-    return response
+    return response.make_conditional(request)
+
+@bp.route('/api/charts/<article_slug>/<series>')
+def chart_data(article_slug, series):
+    """Chart series for a public article, fetched after the page renders"""
+    from .utils.chart_data import SERIES, chart_response, report_chart_source
+    from .utils.prerender import get_prerendered_chart_data
+    if article_slug not in PRERENDERED_ARTICLES or series not in SERIES:
+        return {'success': False, 'error': 'Chart not found'}, 404
+    
+    # max_points downsamples the sentiment scatter
+    max_points = request.args.get('max_points', type=int)
+    
+    # The data file written by `flask prerender`, else the cached report
+    source = get_prerendered_chart_data(article_slug)
+    if source is None:
+        source = report_chart_source(_public_report())
+    return chart_response(source, series, max_points, cache_control='public, max-age=2592000')
 
 @bp.route('/login')
 def login():
@@ -5,6 +5,12 @@ Utility modules for the Electrek Scraper application.
 This package contains various utility services for:
 - Web scraping (scraper_service.py)
 - Proxy management for making requests (proxy_manager.py) 
+- Concurrent paginated reads from Supabase (paginated_reader.py)
+- Per-host request rate limiting (rate_limiter.py)
+- Concurrent article fetching and storage (scrape_pipeline.py)
+- Parallel sentiment scoring of the unscored backlog (sentiment_runner.py)
+- Pre-aggregated report totals maintained on ingest (report_aggregates.py)
+- Server-side report aggregation functions (report_queries.py)
 """
 
-__all__ = ['scraper_service', 'proxy_manager']
\ No newline at end of file
+__all__ = ['scraper_service', 'proxy_manager', 'paginated_reader', 'rate_limiter', 'scrape_pipeline', 'sentiment_runner', 'report_aggregates', 'report_queries']
\ No newline at end of file
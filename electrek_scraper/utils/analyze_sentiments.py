@@ -1,66 +1,88 @@
 # electrek_scraper/utils/analyze_sentiments.py
 from ..models import Article
 from .sentiment_service import SentimentService
-import time
-import random
+from ..config import Config
 
-def analyze_all_articles(batch_size=25):
-    """Analyze articles without sentiment scores in limited batches"""
+def analyze_all_articles(batch_size=25, deadline=None, progress_callback=None):
+    """Analyze articles without sentiment scores in limited batches, stopping early near the deadline"""
     print(f"Starting sentiment analysis in batches of {batch_size}...")
     
     # Initialize sentiment service
     sentiment_service = SentimentService()
     
     # Get articles from Supabase
-    from ..config import Config
     from supabase import create_client
     supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
     
-    # Query articles without sentiment scores
+    # Query articles without sentiment scores (untitled ones can't be scored, so they
+    # would otherwise take up the batch on every run)
     response = supabase.table("articles") \
         .select("id, title") \
         .is_("sentiment_score", "null") \
+        .neq("title", "") \
         .limit(batch_size) \
         .execute()
         
     articles = response.data
     print(f"Processing {len(articles)} out of potentially more articles without sentiment scores")
     
-    # Process each article
+    # Score headlines several at a time; one request covers a whole chunk
     success_count = 0
     error_count = 0
+    chunk_size = Config.SENTIMENT_BATCH_SIZE
     
-    for i, article in enumerate(articles):
-        try:
-            article_id = article["id"]
-            title = article["title"]
-            
+    for start in range(0, len(articles), chunk_size):
+        # Scores are written chunk by chunk, so stopping here keeps everything done so far
+        if deadline and deadline.expired(Config.JOB_DEADLINE_MARGIN):
+            print(f"Time budget reached, stopping with {len(articles) - start} articles left for the next run")
+            break
+        
+        listed = articles[start:start + chunk_size]
+        chunk = []
+        for article in listed:
             # Skip if no title
-            if not title:
-                print(f"Article {article_id} has no title, skipping")
+            if not (article["title"] or "").strip():
+                print(f"Article {article['id']} has no title, skipping")
                 continue
-                
-            # Calculate sentiment score
-            print(f"[{i+1}/{len(articles)}] Analyzing: '{title}'")
-            sentiment_score = sentiment_service.calculate_sentiment(title)
-            
-            # Update in database
-            Article.update_sentiment_score(article_id, sentiment_score)
-            
-            # Get category for display
-            category = sentiment_service.get_sentiment_category(sentiment_score)
-            
-            # Log result
-            print(f"  Score: {sentiment_score:.2f} ({category})")
-            success_count += 1
-            
-            # Add a random delay between requests (0.5-1.5 seconds)
-            # This helps avoid rate limits and adds variability between requests
-            time.sleep(random.uniform(0.5, 1.5))
-            
+            chunk.append(article)
+        
+        if not chunk:
+            if progress_callback:
+                progress_callback(start + len(listed), len(articles))
+            continue
+        
+        print(f"[{start + 1}-{start + len(listed)}/{len(articles)}] Analyzing {len(chunk)} headlines")
+        try:
+            scores = sentiment_service.calculate_sentiments(chunk, batch_size=chunk_size, deadline=deadline)
         except Exception as e:
-            print(f"Error processing article {article.get('id')}: {str(e)}")
-            error_count += 1
+            print(f"Error scoring articles {start + 1}-{start + len(listed)}: {str(e)}")
+            error_count += len(chunk)
+            scores = {}
+        else:
+            # Left out by the service (failed requests); they stay NULL for the next run
+            if len(scores) < len(chunk):
+                print(f"{len(chunk) - len(scores)} articles could not be scored, leaving them for the next run")
+                error_count += len(chunk) - len(scores)
+        
+        # Update in database with one bulk write for the whole chunk
+        if scores:
+            try:
+                written = Article.update_sentiment_scores(scores)
+                success_count += written['updated']
+                error_count += len(written['failed'])
+                
+                for article in chunk:
+                    if article["id"] in scores:
+                        # Get category for display
+                        sentiment_score = scores[article["id"]]
+                        category = sentiment_service.get_sentiment_category(sentiment_score)
+                        print(f"  {sentiment_score:+.2f} ({category}) '{article['title']}'")
+            except Exception as e:
+                print(f"Error storing {len(scores)} sentiment scores: {str(e)}")
+                error_count += len(scores)
+        
+        if progress_callback:
+            progress_callback(start + len(listed), len(articles))
     
     print(f"Sentiment analysis batch complete! Processed {success_count} articles successfully with {error_count} errors.")
     print(f"Run this process again to process more batches.")
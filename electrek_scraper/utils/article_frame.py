@@ -0,0 +1,229 @@
+# electrek_scraper/utils/article_frame.py
+"""
+Columnar (NumPy) view of the articles table for vectorized report aggregates
+"""
+import numpy as np
+from datetime import datetime
+from .company_classifier import COMPANIES, TESLA_BIT, get_company_classifier
+
+def author_sort_key(entry):
+    """Order of the author section in every report backend: most Tesla articles first, ties by name"""
+    return (-entry['tesla_articles'], entry['author'])
+
+class ArticleFrame:
+    """Articles stored column by column: one array per field, with text columns encoded as integer codes"""
+
+    def __init__(self, ids, comment_count, sentiment_score, published_at, month_code,
+                 author_code, authors, company_mask):
+        """
+        Parameters:
+        - ids: int64 article IDs
+        - comment_count: int64 comment counts (NULL stored as 0)
+        - sentiment_score: float64 scores (NULL stored as NaN)
+        - published_at: datetime64[s] publish times (NaT when missing)
+        - month_code: int32 year * 12 + month - 1 of the publish date (-1 when missing)
+        - author_code: int32 index into `authors` (-1 when the author is NULL)
+        - authors: Author names in code order
+        - company_mask: uint16 bitmask of companies mentioned in the title (see COMPANIES)
+        """
+        self.ids = ids
+        self.comment_count = comment_count
+        self.sentiment_score = sentiment_score
+        self.published_at = published_at
+        self.month_code = month_code
+        self.author_code = author_code
+        self.authors = authors
+        self.company_mask = company_mask
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build the columns from article dicts as returned by Supabase"""
+        n = len(rows)
+        author_codes = {}
+        classifier = get_company_classifier()
+        published = [row.get('published_at') or '' for row in rows]
+
+        return cls(
+            ids=np.fromiter((row['id'] for row in rows), dtype=np.int64, count=n),
+            comment_count=np.fromiter((row.get('comment_count') or 0 for row in rows), dtype=np.int64, count=n),
+            sentiment_score=np.fromiter(
+                (np.nan if row.get('sentiment_score') is None else row['sentiment_score'] for row in rows),
+                dtype=np.float64, count=n
+            ),
+            # Seconds precision, ignoring the UTC offset the way month grouping always has
+            published_at=np.array([value[:19] or 'NaT' for value in published], dtype='datetime64[s]'),
+            month_code=np.fromiter(
+                (int(value[:4]) * 12 + int(value[5:7]) - 1 if value else -1 for value in published),
+                dtype=np.int32, count=n
+            ),
+            author_code=np.fromiter(
+                (-1 if row.get('author') is None else author_codes.setdefault(row['author'], len(author_codes))
+                 for row in rows),
+                dtype=np.int32, count=n
+            ),
+            authors=list(author_codes),
+            company_mask=np.fromiter(
+                (classifier.classify_article(row['id'], row.get('title')) for row in rows),
+                dtype=np.uint16, count=n
+            )
+        )
+
+    def scored(self):
+        """Mask of articles that have a sentiment score"""
+        return ~np.isnan(self.sentiment_score)
+
+    def mentions(self, bit):
+        """Mask of articles whose title mentions the company with the given bit"""
+        return (self.company_mask & bit) != 0
+
+    def monthly_stats(self):
+        """Average comments and article count per calendar month, oldest first"""
+        has_date = self.month_code >= 0
+        months, inverse = np.unique(self.month_code[has_date], return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(months))
+        comments = np.bincount(inverse, weights=self.comment_count[has_date], minlength=len(months))
+
+        return [
+            {
+                "month": datetime(int(code) // 12, int(code) % 12 + 1, 1).strftime("%b %Y"),
+                "avg_comments": round(int(total) / int(count)),
+                "article_count": int(count)
+            }
+            for code, count, total in zip(months, counts, comments)
+        ]
+
+    def author_tesla_bias(self, min_articles=5):
+        """Per-author Tesla coverage share and sentiment, for authors with enough scored articles"""
+        rows = self.scored() & (self.author_code >= 0)
+        codes = self.author_code[rows]
+        sentiment = self.sentiment_score[rows]
+        comments = self.comment_count[rows]
+        tesla = self.mentions(TESLA_BIT)[rows]
+
+        size = len(self.authors)
+        total = np.bincount(codes, minlength=size)
+        tesla_articles = np.bincount(codes[tesla], minlength=size)
+        non_tesla_articles = total - tesla_articles
+        tesla_sentiment = np.bincount(codes[tesla], weights=sentiment[tesla], minlength=size)
+        tesla_comments = np.bincount(codes[tesla], weights=comments[tesla], minlength=size)
+        non_tesla_sentiment = np.bincount(codes[~tesla], weights=sentiment[~tesla], minlength=size)
+        non_tesla_comments = np.bincount(codes[~tesla], weights=comments[~tesla], minlength=size)
+
+        author_analysis = []
+        for code in np.unique(codes):
+            if total[code] < min_articles:
+                continue
+            author_analysis.append({
+                'author': self.authors[code],
+                'total_articles': int(total[code]),
+                'tesla_articles': int(tesla_articles[code]),
+                'tesla_percentage': round((int(tesla_articles[code]) / int(total[code])) * 100, 1),
+                'avg_tesla_sentiment': round(float(tesla_sentiment[code]) / max(int(tesla_articles[code]), 1), 3),
+                'avg_tesla_comments': round(float(tesla_comments[code]) / max(int(tesla_articles[code]), 1), 1),
+                'avg_non_tesla_sentiment': round(float(non_tesla_sentiment[code]) / max(int(non_tesla_articles[code]), 1), 3),
+                'avg_non_tesla_comments': round(float(non_tesla_comments[code]) / max(int(non_tesla_articles[code]), 1), 1)
+            })
+
+        # Sort by Tesla article count, ties by name (the same order as the aggregate tables)
+        author_analysis.sort(key=author_sort_key)
+        return author_analysis
+
+    def company_comparison(self):
+        """Engagement and sentiment per EV company mentioned in titles, most commented first"""
+        scored = self.scored()
+        masks = self.company_mask[scored]
+        sentiment = self.sentiment_score[scored]
+        comments = self.comment_count[scored]
+        negative = sentiment < -0.1
+        positive = sentiment > 0.1
+
+        comparison_data = []
+        for bit_index, company in enumerate(COMPANIES):
+            rows = (masks & (1 << bit_index)) != 0
+            article_count = int(np.count_nonzero(rows))
+            if article_count == 0:
+                continue
+            total_comments = int(comments[rows].sum())
+            negative_articles = int(np.count_nonzero(negative & rows))
+            comparison_data.append({
+                'company': company,
+                'article_count': article_count,
+                'total_comments': total_comments,
+                'avg_comments': round(total_comments / article_count, 1),
+                'avg_sentiment': round(float(sentiment[rows].sum()) / article_count, 3),
+                'negative_articles': negative_articles,
+                'positive_articles': int(np.count_nonzero(positive & rows)),
+                'negative_percentage': round((negative_articles / article_count) * 100, 1)
+            })
+
+        # Sort by average comments (engagement)
+        comparison_data.sort(key=lambda x: x['avg_comments'], reverse=True)
+        return comparison_data
+
+    def business_impact_metrics(self):
+        """Engagement multipliers for Tesla vs non-Tesla and negative vs positive coverage"""
+        scored = self.scored()
+        total = int(np.count_nonzero(scored))
+        if total == 0:
+            return {}
+
+        sentiment = self.sentiment_score[scored]
+        comments = self.comment_count[scored]
+        tesla = self.mentions(TESLA_BIT)[scored]
+        negative = sentiment < -0.1
+        positive = sentiment > 0.1
+
+        def count_and_average(rows):
+            count = int(np.count_nonzero(rows))
+            return count, int(comments[rows].sum()) / max(count, 1)
+
+        tesla_count, tesla_avg_comments = count_and_average(tesla)
+        non_tesla_count, non_tesla_avg_comments = count_and_average(~tesla)
+        tesla_negative_count, tesla_negative_avg = count_and_average(tesla & negative)
+        _, tesla_positive_avg = count_and_average(tesla & positive)
+        non_tesla_negative_count, non_tesla_negative_avg = count_and_average(~tesla & negative)
+
+        # Calculate multipliers
+        tesla_multiplier = round(tesla_avg_comments / max(non_tesla_avg_comments, 1), 2)
+        negative_tesla_multiplier = round(tesla_negative_avg / max(non_tesla_negative_avg, 1), 2)
+        tesla_sentiment_bias = round((tesla_negative_count / max(tesla_count, 1)) * 100, 1)
+        non_tesla_sentiment_bias = round((non_tesla_negative_count / max(non_tesla_count, 1)) * 100, 1)
+
+        # Engagement intensity (negative vs positive Tesla)
+        tesla_negative_boost = 0
+        if tesla_positive_avg > 0:
+            tesla_negative_boost = round(((tesla_negative_avg - tesla_positive_avg) / tesla_positive_avg) * 100, 1)
+
+        # Total Tesla traffic contribution
+        tesla_traffic_percentage = round((int(comments[tesla].sum()) / max(int(comments.sum()), 1)) * 100, 1)
+
+        return {
+            # Core multipliers
+            'tesla_engagement_multiplier': tesla_multiplier,
+            'negative_tesla_multiplier': negative_tesla_multiplier,
+
+            # Sentiment bias
+            'tesla_negative_percentage': tesla_sentiment_bias,
+            'non_tesla_negative_percentage': non_tesla_sentiment_bias,
+            'sentiment_bias_difference': round(tesla_sentiment_bias - non_tesla_sentiment_bias, 1),
+
+            # Engagement metrics
+            'tesla_avg_comments': round(tesla_avg_comments, 1),
+            'non_tesla_avg_comments': round(non_tesla_avg_comments, 1),
+            'tesla_negative_avg_comments': round(tesla_negative_avg, 1),
+            'tesla_positive_avg_comments': round(tesla_positive_avg, 1),
+            'tesla_negative_boost_percentage': tesla_negative_boost,
+
+            # Traffic contribution
+            'tesla_traffic_percentage': tesla_traffic_percentage,
+            'tesla_article_count': tesla_count,
+            'non_tesla_article_count': non_tesla_count,
+            'tesla_percentage_of_coverage': round((tesla_count / total) * 100, 1),
+
+            # Estimated business impact (assuming comments = engagement = revenue)
+            'estimated_revenue_multiplier': tesla_multiplier,
+            'estimated_tesla_revenue_share': tesla_traffic_percentage
+        }
@@ -0,0 +1,261 @@
+# electrek_scraper/utils/cache_codec.py
+"""
+Compact binary encoding for cached report payloads
+
+A payload is a small JSON header followed by raw column buffers. Lists of dicts that
+share the same keys (the sentiment scatter series, article lists) are stored column by
+column: numbers as NumPy arrays, strings as one UTF-8 blob plus offsets. Uncompressed
+files are memory-mapped on read, so loading a report neither parses nor builds a dict
+per article; rows are built only when they are accessed. Datetimes keep their type
+instead of turning into strings.
+"""
+import json
+import struct
+import zlib
+from collections.abc import Sequence
+from datetime import date, datetime
+import numpy as np
+
+MAGIC = b'ECB1'
+ALIGNMENT = 64
+
+# Lists shorter than this stay in the header as plain JSON
+MIN_COLUMNAR_ROWS = 32
+
+_PREAMBLE = struct.Struct('<4sBQ')  # magic, flags, header length
+_COMPRESSED = 1
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+class _Column:
+    """One field of a ColumnarRecords; values are decoded on access"""
+
+    def __init__(self, spec, buffers):
+        self.kind = spec['kind']
+        if self.kind == 'json':
+            self.values = _decode(spec['values'], buffers)
+            return
+        self.data = buffers[spec['data']]
+        self.offsets = buffers[spec['offsets']] if 'offsets' in spec else None
+        self.mask = buffers[spec['mask']] if 'mask' in spec else None
+
+    def __getitem__(self, index):
+        if self.kind == 'json':
+            return self.values[index]
+        if self.mask is not None and self.mask[index]:
+            return None
+        if self.kind == 'int':
+            return int(self.data[index])
+        if self.kind == 'float':
+            return float(self.data[index])
+        text = self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+        return datetime.fromisoformat(text) if self.kind == 'datetime' else text
+
+    def array(self, length):
+        if self.kind not in ('int', 'float'):
+            return [self[index] for index in range(length)]
+        if self.mask is None or not self.mask.any():
+            return self.data
+        values = self.data.astype(np.float64)
+        values[self.mask] = np.nan
+        return values
+
+class ColumnarRecords(Sequence):
+    """Read-only list of dicts backed by column arrays; each row is built when it is accessed"""
+
+    def __init__(self, length, fields, columns):
+        self.length = length
+        self.fields = fields
+        self.columns = dict(zip(fields, columns))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("record index out of range")
+        return {field: column[index] for field, column in self.columns.items()}
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and not isinstance(other, str) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"<ColumnarRecords {self.length} rows: {', '.join(self.fields)}>"
+
+    def column(self, field):
+        """Every row's value for `field`: a NumPy array for numeric fields (None as NaN), else a list"""
+        return self.columns[field].array(self.length)
+
+def to_json(data):
+    """
+    JSON-safe copy of `data` for the JSON tiers (JSON files, the shared jsonb column)
+
+    Datetimes are tagged like in the binary header and ColumnarRecords become lists of
+    dicts, so from_json() gives back the same types every other tier returns.
+    """
+    return _Encoder(compress=False, columnar=False).value(data)
+
+def from_json(value):
+    """Decode a value written from to_json()"""
+    return _decode(value, [])
+
+class _Encoder:
+    def __init__(self, compress, columnar=True):
+        self.compress = compress
+        self.columnar = columnar
+        self.specs = []
+        self.buffers = []
+
+    def buffer(self, array):
+        raw = np.ascontiguousarray(array).tobytes()
+        if self.compress:
+            raw = zlib.compress(raw, 6)
+        self.specs.append({'dtype': array.dtype.str, 'size': len(raw)})
+        self.buffers.append(raw)
+        return len(self.buffers) - 1
+
+    def value(self, value):
+        if isinstance(value, datetime):
+            return {'$t': 'datetime', 'v': value.isoformat()}
+        if isinstance(value, date):
+            return {'$t': 'date', 'v': value.isoformat()}
+        if isinstance(value, dict):
+            encoded = {str(key): self.value(item) for key, item in value.items()}
+            # Escape dicts that would otherwise read back as a tagged value
+            return {'$t': 'map', 'v': encoded} if '$t' in value else encoded
+        if isinstance(value, (list, tuple, ColumnarRecords)):
+            if self.columnar and len(value) >= MIN_COLUMNAR_ROWS:
+                records = self.records(value)
+                if records is not None:
+                    return records
+            return [self.value(item) for item in value]
+        if isinstance(value, np.integer):
+            return int(value)
+        if isinstance(value, np.floating):
+            return float(value)
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    def records(self, rows):
+        if not isinstance(rows[0], dict):
+            return None
+        fields = list(rows[0])
+        field_set = set(fields)
+        if not all(isinstance(row, dict) and row.keys() == field_set for row in rows):
+            return None
+        columns = [self.column([row[field] for row in rows]) for field in fields]
+        return {'$t': 'records', 'n': len(rows), 'fields': fields, 'columns': columns}
+
+    def column(self, values):
+        present = [value for value in values if value is not None]
+        kinds = {type(value) for value in present}
+        spec = None
+        if present and kinds == {int}:
+            try:
+                spec = {'kind': 'int', 'data': self.buffer(np.array([value or 0 for value in values], dtype=np.int64))}
+            except OverflowError:
+                pass
+        elif present and kinds <= {int, float}:
+            data = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            spec = {'kind': 'float', 'data': self.buffer(data)}
+        elif present and (kinds == {str} or kinds == {datetime}):
+            kind = 'str' if kinds == {str} else 'datetime'
+            encoded = [b'' if value is None else (value if kind == 'str' else value.isoformat()).encode('utf-8')
+                       for value in values]
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(item) for item in encoded])
+            blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            spec = {'kind': kind, 'data': self.buffer(blob), 'offsets': self.buffer(offsets)}
+
+        if spec is None:
+            return {'kind': 'json', 'values': [self.value(value) for value in values]}
+        if len(present) < len(values):
+            spec['mask'] = self.buffer(np.array([value is None for value in values], dtype=np.bool_))
+        return spec
+
+def dumps(data, compress=False):
+    """Encode `data` (JSON-like values, datetimes, lists of dicts) as bytes"""
+    encoder = _Encoder(compress)
+    tree = encoder.value(data)
+
+    offset = 0
+    for spec, raw in zip(encoder.specs, encoder.buffers):
+        offset = _align(offset)
+        spec['offset'] = offset
+        offset += len(raw)
+
+    header = json.dumps({'tree': tree, 'buffers': encoder.specs}, separators=(',', ':')).encode()
+    if compress:
+        header = zlib.compress(header, 6)
+
+    out = bytearray(_PREAMBLE.pack(MAGIC, _COMPRESSED if compress else 0, len(header)))
+    out += header
+    start = _align(len(out))
+    for spec, raw in zip(encoder.specs, encoder.buffers):
+        out += b'\0' * (start + spec['offset'] - len(out))
+        out += raw
+    return bytes(out)
+
+def load(path, mmap=True):
+    """
+    Decode a file written from dumps()
+
+    Uncompressed buffers are views into a read-only memory map of the file when
+    `mmap` is set; compressed ones are inflated into memory.
+    """
+    with open(path, 'rb') as f:
+        magic, flags, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary cache file")
+        header = f.read(header_length)
+        compressed = flags & _COMPRESSED
+        body = None if mmap and not compressed else f.read()
+
+    if compressed:
+        header = zlib.decompress(header)
+    header = json.loads(header)
+    start = _align(_PREAMBLE.size + header_length)
+
+    specs = header['buffers']
+    if body is None and specs:
+        # Plain ndarray views of the map: slicing a np.memmap subclass costs several times more
+        mapped = np.memmap(path, dtype=np.uint8, mode='r').view(np.ndarray)
+        buffers = [
+            mapped[start + spec['offset']:start + spec['offset'] + spec['size']].view(spec['dtype'])
+            for spec in specs
+        ]
+    else:
+        base = start - _PREAMBLE.size - header_length
+        buffers = []
+        for spec in specs:
+            raw = body[base + spec['offset']:base + spec['offset'] + spec['size']] if body else b''
+            if compressed:
+                raw = zlib.decompress(raw)
+            buffers.append(np.frombuffer(raw, dtype=spec['dtype']))
+    return _decode(header['tree'], buffers)
+
+def _decode(value, buffers):
+    if isinstance(value, list):
+        return [_decode(item, buffers) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    tag = value.get('$t')
+    if tag is None:
+        return {key: _decode(item, buffers) for key, item in value.items()}
+    if tag == 'map':
+        return {key: _decode(item, buffers) for key, item in value['v'].items()}
+    if tag == 'datetime':
+        return datetime.fromisoformat(value['v'])
+    if tag == 'date':
+        return date.fromisoformat(value['v'])
+    if tag == 'records':
+        return ColumnarRecords(value['n'], value['fields'],
+                               [_Column(spec, buffers) for spec in value['columns']])
+    raise ValueError(f"Unknown cache value tag: {tag}")
@@ -1,58 +1,494 @@
 """
-Simple file-based caching service for chart data
+Tiered caching service for report and chart data
+
+Lookups go through an in-process LRU of parsed objects, then JSON files on disk, then
+an optional shared backend (a Supabase table, so every serverless instance sees the
+same entries). Entries past their TTL, or written before the last invalidation, are
+stale: they are still served while a background thread recomputes them.
+
+Disk entries are written as JSON or, with format='binary', in the columnar format from
+cache_codec (memory-mapped numeric columns, optional compression). Files are replaced
+atomically, and a per-key lease makes sure only one worker rebuilds a missing or
+expired entry while the others wait for it or keep serving the stale copy.
 """
 import json
 import hashlib
 import os
-from datetime import datetime, timedelta
+import tempfile
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+from ..config import Config
+from . import cache_codec
+
+INVALIDATION_KEY = '__invalidated_at__'
+LEASE_PREFIX = '__lease__:'
+
+class SupabaseCacheBackend:
+    """Shared cache entries in the report_cache table (sql/report_cache.sql)"""
+
+    table = "report_cache"
+
+    def get(self, key):
+        """{'data': ..., 'created_at': ...} or None"""
+        from ..models import supabase
+        rows = supabase.table(self.table) \
+            .select("value, created_at") \
+            .eq("key", key) \
+            .limit(1) \
+            .execute().data
+        if not rows:
+            return None
+        return {'data': cache_codec.from_json(rows[0]['value']), 'created_at': rows[0]['created_at']}
+
+    def set(self, key, entry):
+        from ..models import supabase
+        supabase.table(self.table) \
+            .upsert({'key': key, 'value': cache_codec.to_json(entry['data']), 'created_at': entry['created_at']}) \
+            .execute()
+
+    def acquire(self, key, lease_seconds):
+        """Insert the lease row for `key`; False while another instance holds an unexpired one"""
+        from postgrest.exceptions import APIError
+        from ..models import supabase
+        now = time.time()
+        supabase.table(self.table) \
+            .delete() \
+            .eq("key", LEASE_PREFIX + key) \
+            .lt("created_at", now - lease_seconds) \
+            .execute()
+        try:
+            supabase.table(self.table) \
+                .insert({'key': LEASE_PREFIX + key, 'value': None, 'created_at': now}) \
+                .execute()
+            return True
+        except APIError as e:
+            if e.code == '23505':  # unique_violation: someone else holds it
+                return False
+            raise
+
+    def release(self, key):
+        from ..models import supabase
+        supabase.table(self.table).delete().eq("key", LEASE_PREFIX + key).execute()
 
 class ChartDataCache:
-    """Simple file-based cache for chart data with 1-month TTL"""
-    
-    def __init__(self, cache_dir='static/cache', ttl_days=30):
+    """Report data cache with memory, disk and shared tiers and stale-while-revalidate"""
+
+    def __init__(self, cache_dir='static/cache', ttl_days=30, max_stale_seconds=None,
+                 memory_size=32, shared=None, format='json', compress=False, lease_seconds=120):
+        """
+        Parameters:
+        - cache_dir: Directory for the JSON files
+        - ttl_days: Age after which an entry is refreshed (per-call ttl overrides it)
+        - max_stale_seconds: Age beyond which a stale entry is recomputed before returning
+        - memory_size: Parsed entries kept in the in-process LRU
+        - shared: Optional backend with get(key) / set(key, entry), e.g. SupabaseCacheBackend
+        - format: 'json' or 'binary' for new disk entries (both are read)
+        - compress: zlib-compress binary entries (smaller files, but no memory-mapped reads)
+        - lease_seconds: How long a rebuild lease holds before other workers may take it over
+        """
         self.cache_dir = cache_dir
-        self.ttl_days = ttl_days
-        os.makedirs(cache_dir, exist_ok=True)
-    
+        self.ttl_seconds = ttl_days * 86400
+        self.max_stale_seconds = max_stale_seconds if max_stale_seconds is not None else Config.REPORT_CACHE_MAX_STALE
+        self.memory_size = memory_size
+        self.shared = shared
+        self.format = format
+        self.compress = compress
+        self.lease_seconds = lease_seconds
+        self.lease_poll = 0.25
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = set()
+        self._invalidated_at = 0.0
+        self._shared_invalidated_at = 0.0
+        self._shared_checked_at = 0.0
+        self.stats = {
+            'memory_hits': 0, 'disk_hits': 0, 'shared_hits': 0, 'misses': 0,
+            'stale_served': 0, 'refreshes': 0, 'refresh_errors': 0, 'invalidations': 0,
+            'lease_waits': 0, 'refreshes_skipped': 0,
+            'lookups': 0, 'lookup_seconds': 0.0, 'loads': 0, 'load_seconds': 0.0, 'max_load_seconds': 0.0
+        }
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            pass  # Read-only filesystem: memory and shared tiers still work
+
     def _get_cache_key(self, data_type, months=None):
         """Generate cache key based on data type and parameters"""
         key_data = f"{data_type}_{months or 'all'}"
         return hashlib.md5(key_data.encode()).hexdigest()
-    
-    def _get_cache_path(self, cache_key):
+
+    def _get_cache_path(self, cache_key, format=None):
         """Get full path to cache file"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
-    
-    def _is_cache_valid(self, cache_path):
-        """Check if cache file exists and is within TTL"""
-        if not os.path.exists(cache_path):
-            return False
-        
-        file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
-        expire_time = datetime.now() - timedelta(days=self.ttl_days)
-        return file_time > expire_time
-    
-    def get(self, data_type, months=None):
-        """Get cached data if valid"""
-        cache_key = self._get_cache_key(data_type, months)
-        cache_path = self._get_cache_path(cache_key)
-        
-        if self._is_cache_valid(cache_path):
+        extension = 'bin' if (format or self.format) == 'binary' else 'json'
+        return os.path.join(self.cache_dir, f"{cache_key}.{extension}")
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    # --- Tiers ---
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_set(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key):
+        # The configured format first, so entries written before a switch are still found
+        formats = ('binary', 'json') if self.format == 'binary' else ('json', 'binary')
+        for format in formats:
+            entry = self._disk_read(self._get_cache_path(key, format), format)
+            if entry is not None:
+                return entry
+        return None
+
+    def _disk_read(self, path, format):
+        try:
+            if format == 'binary':
+                payload = cache_codec.load(path)
+            else:
+                with open(path, 'r') as f:
+                    payload = cache_codec.from_json(json.load(f))
+        except (OSError, ValueError, KeyError, zlib.error):
+            return None
+        if isinstance(payload, dict) and set(payload) == {'data', 'created_at'}:
+            return payload
+        # Files written before entries carried their own timestamp
+        return {'data': payload, 'created_at': os.path.getmtime(path)}
+
+    def _disk_set(self, key, entry):
+        try:
+            if self.format == 'binary':
+                payload = cache_codec.dumps(entry, compress=self.compress)
+                self._write_atomic(self._get_cache_path(key), lambda f: f.write(payload), 'wb')
+            else:
+                self._write_atomic(self._get_cache_path(key),
+                                   lambda f: json.dump(cache_codec.to_json(entry), f), 'w')
+        except (OSError, TypeError, ValueError):
+            pass  # Fail silently if cache write fails
+
+    def _write_atomic(self, path, write, mode):
+        """Write to a temporary file next to `path`, then rename it over `path`"""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, mode) as f:
+                write(f)
+            # Readers see the old file or the new one, never a partial write
+            os.replace(temp_path, path)
+        except BaseException:
             try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
+                os.remove(temp_path)
+            except OSError:
                 pass
-        
-        return None
-    
+            raise
+
+    def _shared_get(self, key):
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            print(f"Shared cache read failed: {str(e)}")
+            return None
+
+    def _shared_set(self, key, entry):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, entry)
+        except Exception as e:
+            print(f"Shared cache write failed: {str(e)}")
+
+    def _lookup(self, key):
+        """Entry from the first tier that has it, copied into the faster tiers"""
+        start = time.perf_counter()
+        entry = self._memory_get(key)
+        if entry is not None:
+            self._count('memory_hits')
+        else:
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._count('disk_hits')
+            else:
+                entry = self._shared_get(key)
+                if entry is not None:
+                    self._count('shared_hits')
+                    self._disk_set(key, entry)
+                else:
+                    self._count('misses')
+            if entry is not None:
+                self._memory_set(key, entry)
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['lookup_seconds'] += time.perf_counter() - start
+        return entry
+
+    def _store(self, key, data, created_at=None):
+        entry = {'data': data, 'created_at': created_at or time.time()}
+        self._memory_set(key, entry)
+        self._disk_set(key, entry)
+        self._shared_set(key, entry)
+        return entry
+
+    # --- Rebuild leases ---
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lease_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.lock")
+
+    def _acquire_file_lease(self, key):
+        """True if acquired, False if another process holds it, None if leases can't be written here"""
+        path = self._lease_path(key)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) <= self.lease_seconds:
+                        return False
+                    os.remove(path)  # Holder died or hung: take the lease over
+                except FileNotFoundError:
+                    pass  # Released meanwhile
+                continue
+            except OSError:
+                return None  # Read-only filesystem
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _acquire_lease(self, key):
+        """Whether this worker may rebuild `key` (no other process or instance is rebuilding it)"""
+        file_lease = self._acquire_file_lease(key)
+        if file_lease is False:
+            return False
+        if self.shared is not None and hasattr(self.shared, 'acquire'):
+            try:
+                if not self.shared.acquire(key, self.lease_seconds):
+                    if file_lease:
+                        self._release_file_lease(key)
+                    return False
+            except Exception as e:
+                print(f"Shared cache lease failed, rebuilding anyway: {str(e)}")
+        return True
+
+    def _release_file_lease(self, key):
+        try:
+            os.remove(self._lease_path(key))
+        except OSError:
+            pass
+
+    def _release_lease(self, key):
+        self._release_file_lease(key)
+        if self.shared is not None and hasattr(self.shared, 'release'):
+            try:
+                self.shared.release(key)
+            except Exception as e:
+                print(f"Shared cache lease release failed: {str(e)}")
+
+    def _load_once(self, key, loader, ttl=None):
+        """
+        Rebuild a missing or expired entry with a single worker
+
+        Threads of this process queue on a per-key lock; other processes and instances
+        wait for the lease holder's entry to appear instead of running `loader` too.
+        """
+        with self._key_lock(key):
+            previous = self._lookup(key)
+            if previous is not None and not self._is_stale(previous, ttl):
+                return previous['data']  # Built by the thread we were waiting on
+
+            waited = False
+            while not self._acquire_lease(key):
+                if not waited:
+                    waited = True
+                    self._count('lease_waits')
+                time.sleep(self.lease_poll)
+                entry = self._disk_get(key) or self._shared_get(key)
+                if entry is not None and (previous is None or entry['created_at'] > previous['created_at']):
+                    self._memory_set(key, entry)
+                    return entry['data']
+
+            try:
+                return self._load(key, loader)
+            finally:
+                self._release_lease(key)
+
+    # --- Invalidation ---
+
+    def _marker_path(self):
+        return os.path.join(self.cache_dir, INVALIDATION_KEY)
+
+    def invalidated_at(self):
+        """Latest invalidation seen by this process, other local processes or the shared backend"""
+        latest = self._invalidated_at
+        try:
+            latest = max(latest, os.path.getmtime(self._marker_path()))
+        except OSError:
+            pass
+
+        # Poll the shared marker at most every REPORT_CACHE_SHARED_POLL seconds
+        now = time.time()
+        if self.shared is not None and now - self._shared_checked_at >= Config.REPORT_CACHE_SHARED_POLL:
+            self._shared_checked_at = now
+            marker = self._shared_get(INVALIDATION_KEY)
+            if marker is not None:
+                self._shared_invalidated_at = float(marker['created_at'])
+        return max(latest, self._shared_invalidated_at)
+
+    def invalidate(self):
+        """Mark every entry stale, e.g. after new articles or sentiment scores are written"""
+        now = time.time()
+        self._invalidated_at = now
+        self._count('invalidations')
+        try:
+            with open(self._marker_path(), 'w') as f:
+                f.write(str(now))
+        except OSError:
+            pass
+
+        # Always write the newest time: a throttled marker would lose the last writes of a
+        # burst. Callers invalidate once per bulk write, so this is one upsert per batch
+        if self.shared is not None:
+            self._shared_set(INVALIDATION_KEY, {'data': None, 'created_at': now})
+
+    # --- Public API ---
+
+    def get(self, data_type, months=None, ttl=None):
+        """Get cached data if it is fresh"""
+        entry = self._lookup(self._get_cache_key(data_type, months))
+        if entry is None or self._is_stale(entry, ttl):
+            return None
+        return entry['data']
+
     def set(self, data_type, data, months=None):
-        """Cache data with timestamp"""
-        cache_key = self._get_cache_key(data_type, months)
-        cache_path = self._get_cache_path(cache_key)
-        
-        try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, default=str)
-        except IOError:
-            pass  # Fail silently if cache write fails
\ No newline at end of file
+        """Cache data in every tier"""
+        self._store(self._get_cache_key(data_type, months), data)
+
+    def _is_stale(self, entry, ttl=None):
+        age = time.time() - entry['created_at']
+        return age > (ttl if ttl is not None else self.ttl_seconds) or entry['created_at'] < self.invalidated_at()
+
+    def _load(self, key, loader):
+        # Stamped with the start time, so writes made while loading still leave it stale
+        started_at = time.time()
+        start = time.perf_counter()
+        data = loader()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats['loads'] += 1
+            self.stats['load_seconds'] += elapsed
+            self.stats['max_load_seconds'] = max(self.stats['max_load_seconds'], elapsed)
+        self._store(key, data, started_at)
+        return data
+
+    def _refresh(self, key, loader):
+        lock = self._key_lock(key)
+        try:
+            # Skip it if this process is already rebuilding the entry or another worker is
+            if not lock.acquire(blocking=False):
+                self._count('refreshes_skipped')
+                return
+            try:
+                if not self._acquire_lease(key):
+                    self._count('refreshes_skipped')
+                    return
+                try:
+                    self._load(key, loader)
+                finally:
+                    self._release_lease(key)
+            finally:
+                lock.release()
+            self._count('refreshes')
+        except Exception as e:
+            self._count('refresh_errors')
+            print(f"Background cache refresh failed: {str(e)}")
+            print(traceback.format_exc())
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_compute(self, data_type, loader, months=None, ttl=None):
+        """
+        Cached data, computing it with `loader()` when missing
+
+        A stale entry younger than max_stale_seconds is returned immediately and
+        refreshed in a background thread (one refresh per key at a time). Otherwise one
+        worker computes the entry while concurrent callers wait for it.
+        """
+        key = self._get_cache_key(data_type, months)
+        entry = self._lookup(key)
+
+        if entry is not None and not self._is_stale(entry, ttl):
+            return entry['data']
+
+        if entry is not None and time.time() - entry['created_at'] <= self.max_stale_seconds:
+            self._count('stale_served')
+            with self._lock:
+                start_refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+            return entry['data']
+
+        return self._load_once(key, loader, ttl)
+
+    def get_stats(self):
+        """Hit/miss counts per tier and lookup/load latency"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['refreshing'] = len(self._refreshing)
+        hits = stats['memory_hits'] + stats['disk_hits'] + stats['shared_hits']
+        lookup_seconds = stats.pop('lookup_seconds')
+        load_seconds = stats.pop('load_seconds')
+        stats['hit_rate'] = round(hits / stats['lookups'], 3) if stats['lookups'] else None
+        stats['avg_lookup_ms'] = round(lookup_seconds / stats['lookups'] * 1000, 3) if stats['lookups'] else None
+        stats['avg_load_ms'] = round(load_seconds / stats['loads'] * 1000, 1) if stats['loads'] else None
+        stats['max_load_ms'] = round(stats.pop('max_load_seconds') * 1000, 1)
+        stats['invalidated_at'] = self.invalidated_at() or None
+        return stats
+
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+def get_report_cache():
+    """Get the process-wide report cache, configured from Config"""
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                shared = SupabaseCacheBackend() if Config.REPORT_CACHE_SHARED else None
+                _report_cache = ChartDataCache(
+                    cache_dir=Config.REPORT_CACHE_DIR,
+                    ttl_days=Config.REPORT_CACHE_TTL / 86400,
+                    shared=shared,
+                    format=Config.REPORT_CACHE_FORMAT,
+                    compress=Config.REPORT_CACHE_COMPRESS,
+                    lease_seconds=Config.REPORT_CACHE_LEASE
+                )
+    return _report_cache
+
+def invalidate_report_cache():
+    """Mark cached reports stale after articles or scores change"""
+    try:
+        get_report_cache().invalidate()
+    except Exception as e:
+        print(f"Error invalidating report cache: {str(e)}")
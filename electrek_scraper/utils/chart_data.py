@@ -0,0 +1,229 @@
+# electrek_scraper/utils/chart_data.py
+"""
+Chart series served as JSON for the report and article pages
+
+Pages render without their chart data and fetch each series afterwards. Responses
+carry an ETag (304 on a match) and are gzip- or brotli-compressed when the client
+accepts it; the sentiment scatter can be downsampled on the server with max_points.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from flask import make_response, request
+from .cache_codec import ColumnarRecords
+
+# Set once brotli turns out not to be installed, so responses fall back to gzip
+_brotli_missing = False
+
+# Series the chart endpoints serve
+SERIES = ('sentiment', 'authors', 'companies', 'distribution')
+
+# Headline keywords the article pages use to split Tesla coverage from the rest
+TESLA_KEYWORDS = ('tesla', 'elon', 'musk')
+
+# Built once per cached report or data file; holding the object keeps its id from being reused
+_sources = OrderedDict()     # id(report) -> (report, chart source)
+_encoded = OrderedDict()     # (id(source), series, max_points) -> (source, etag, body, compressed bodies)
+_lock = threading.Lock()
+_MEMO_SIZE = 32
+
+def _remember(memo, key, value):
+    with _lock:
+        memo[key] = value
+        memo.move_to_end(key)
+        while len(memo) > _MEMO_SIZE:
+            memo.popitem(last=False)
+
+def _numeric_column(records, field):
+    """`field` of every record as a float array (None as NaN), without building row dicts"""
+    if isinstance(records, ColumnarRecords):
+        return np.asarray(records.column(field), dtype=np.float64)
+    return np.array([record.get(field) for record in records], dtype=np.float64)
+
+class ScatterPoints:
+    """
+    Scored articles with a comment count, for the scatter charts
+
+    The sentiment and comment columns are kept as NumPy arrays (read straight from the
+    cached ColumnarRecords when there is one); row dicts are only built for the points
+    that are serialized.
+    """
+
+    def __init__(self, records):
+        """
+        Parameters:
+        - records: all_sentiment_data of a report (list of dicts or ColumnarRecords)
+        """
+        self.records = records
+        sentiment_score = _numeric_column(records, 'sentiment_score')
+        comment_count = _numeric_column(records, 'comment_count')
+        self.index = np.flatnonzero(~np.isnan(sentiment_score) & ~np.isnan(comment_count))
+        self.sentiment_score = sentiment_score[self.index]
+        self.comment_count = comment_count[self.index]
+
+    def __len__(self):
+        return len(self.index)
+
+    def titles(self):
+        """Title of every point"""
+        if isinstance(self.records, ColumnarRecords):
+            titles = self.records.column('title')
+            return [titles[index] for index in self.index]
+        return [self.records[index].get('title') for index in self.index]
+
+    def rows(self, positions=None):
+        """Point dicts, with their sentiment category, for `positions` (default: every point)"""
+        from .sentiment_service import SentimentService
+        sentiment_service = SentimentService()
+
+        rows = []
+        for position in range(len(self)) if positions is None else positions:
+            article = self.records[int(self.index[position])]
+            rows.append({
+                'id': article.get('id'),
+                'title': article.get('title', 'Untitled'),
+                'sentiment_score': article.get('sentiment_score'),
+                'comment_count': article.get('comment_count'),
+                'published_at': article.get('published_at'),
+                'sentiment_category': sentiment_service.get_sentiment_category(article.get('sentiment_score'))
+            })
+        return rows
+
+def sentiment_correlation(points):
+    """Pearson correlation of sentiment and comment count for ScatterPoints (None below 5 points)"""
+    if len(points) < 5:
+        return None
+    try:
+        return np.corrcoef(points.sentiment_score, points.comment_count)[0, 1]
+    except Exception as e:
+        print(f"Error calculating correlation: {str(e)}")
+        return None
+
+def report_chart_source(report):
+    """Chart source (the keys the page templates use) from an Article.get_report() dict"""
+    with _lock:
+        cached = _sources.get(id(report))
+    if cached is not None and cached[0] is report:
+        return cached[1]
+
+    source = {
+        'sentiment_data': ScatterPoints(report['all_sentiment_data']),
+        'author_analysis': report['author_analysis'],
+        'company_comparison': report['company_comparison']
+    }
+    _remember(_sources, id(report), (report, source))
+    return source
+
+def downsample(points, max_points):
+    """
+    Positions of at most `max_points` ScatterPoints, keeping the shape of the cloud
+
+    The most commented tenth is always kept (it sets the y axis and the outliers readers
+    hover); the rest is an even sample across the sentiment range. Returns None when
+    every point is kept.
+    """
+    if not max_points or max_points < 1 or len(points) <= max_points:
+        return None
+    # Stable sorts, so ties keep their report order
+    by_comments = np.argsort(-points.comment_count, kind='stable')
+    top_count = max_points // 10
+    kept = by_comments[:top_count]
+
+    rest = by_comments[top_count:]
+    rest = rest[np.lexsort((points.comment_count[rest], points.sentiment_score[rest]))]
+    remaining = max_points - top_count
+    step = len(rest) / remaining
+    return np.concatenate([kept, rest[(np.arange(remaining) * step).astype(np.int64)]])
+
+def _distribution(points):
+    scores = points.sentiment_score
+    tesla = np.array([any(word in (title or '').lower() for word in TESLA_KEYWORDS)
+                      for title in points.titles()], dtype=bool)
+    counts = {}
+    for group, members in (('tesla', tesla), ('non_tesla', ~tesla)):
+        group_scores = scores[members]
+        negative = int(np.count_nonzero(group_scores <= -0.1))
+        positive = int(np.count_nonzero(group_scores >= 0.1))
+        counts[group] = {
+            'negative': negative,
+            'neutral': len(group_scores) - negative - positive,
+            'positive': positive,
+            'total': len(group_scores)
+        }
+    return counts
+
+def chart_series(source, series, max_points=None):
+    """
+    Payload for one chart series
+
+    Parameters:
+    - source: Dict with sentiment_data (ScatterPoints), author_analysis and company_comparison
+    - series: One of SERIES
+    - max_points: Downsample the sentiment scatter to this many points
+    """
+    if series == 'sentiment':
+        points = source['sentiment_data']
+        positions = downsample(points, max_points)
+        return {'series': series, 'data': points.rows(positions), 'total': len(points),
+                'sampled': positions is not None}
+    if series == 'distribution':
+        return {'series': series, 'data': _distribution(source['sentiment_data'])}
+    if series == 'authors':
+        return {'series': series, 'data': source['author_analysis']}
+    if series == 'companies':
+        return {'series': series, 'data': source['company_comparison']}
+    raise ValueError(f"Unknown chart series: {series}")
+
+def _compress(body, encoding):
+    global _brotli_missing
+    if encoding == 'br':
+        if _brotli_missing:
+            return None
+        try:
+            import brotli
+        except ImportError:
+            _brotli_missing = True
+            return None
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+def _encode(source, series, max_points):
+    """(etag, JSON body, compressed bodies) for a series, built once per source object"""
+    key = (id(source), series, max_points)
+    with _lock:
+        cached = _encoded.get(key)
+    if cached is not None and cached[0] is source:
+        return cached[1:]
+
+    from flask import current_app
+    body = current_app.json.dumps(chart_series(source, series, max_points), separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    compressed = {}
+    _remember(_encoded, key, (source, etag, body, compressed))
+    return etag, body, compressed
+
+def chart_response(source, series, max_points=None, cache_control='no-cache'):
+    """JSON response for a chart series with ETag revalidation and content encoding"""
+    etag, body, compressed = _encode(source, series, max_points)
+
+    encoding = None
+    accepted = request.accept_encodings
+    for candidate in ('br', 'gzip'):
+        if accepted[candidate]:
+            if candidate not in compressed:
+                compressed[candidate] = _compress(body, candidate)
+            if compressed[candidate] is not None:
+                encoding = candidate
+                break
+
+    response = make_response(compressed[encoding] if encoding else body)
+    response.mimetype = 'application/json'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    # Each encoding is a different representation, so it gets its own validator
+    response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    return response.make_conditional(request)
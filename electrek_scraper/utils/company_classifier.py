@@ -0,0 +1,80 @@
+# electrek_scraper/utils/company_classifier.py
+"""
+Company mention detection for article titles, shared by every report
+"""
+import re
+import threading
+
+COMPANY_KEYWORDS = {
+    'Tesla/Elon': ['tesla', 'elon', 'musk'],
+    'BYD': ['byd'],
+    'Ford': ['ford'],
+    'GM': ['gm', 'general motors'],
+    'Rivian': ['rivian'],
+    'Lucid': ['lucid'],
+    'Nio': ['nio'],
+    'Volkswagen': ['volkswagen', 'vw'],
+    'BMW': ['bmw'],
+    'Mercedes': ['mercedes', 'mercedes-benz']
+}
+
+# Bit i of a company mask is set when the title mentions COMPANIES[i]
+COMPANIES = list(COMPANY_KEYWORDS)
+COMPANY_BITS = {company: 1 << index for index, company in enumerate(COMPANIES)}
+TESLA_BIT = COMPANY_BITS['Tesla/Elon']
+
+class CompanyClassifier:
+    """
+    Matches every company keyword in one regex scan and returns a bitmask per title
+
+    Keywords only match as whole words (plus plural/possessive endings), so "gm" no
+    longer hits "paradigm", "ford" no longer hits "affordable" and "nio" no longer
+    hits "union". Masks are cached per article ID, so every report reuses them.
+    """
+
+    def __init__(self, company_keywords=None):
+        company_keywords = company_keywords or COMPANY_KEYWORDS
+        self.companies = list(company_keywords)
+        self.keyword_bits = {}
+        for index, keywords in enumerate(company_keywords.values()):
+            for keyword in keywords:
+                self.keyword_bits[keyword.lower()] = self.keyword_bits.get(keyword.lower(), 0) | (1 << index)
+
+        # Longest keywords first so "mercedes-benz" wins over "mercedes" at the same position.
+        # Titles are lowercased before matching, which is much faster than re.IGNORECASE
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(self.keyword_bits, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b({alternation})(?:'s|’s|s)?\b")
+
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def classify(self, title):
+        """Bitmask of the companies a title mentions"""
+        mask = 0
+        for keyword in self.pattern.findall((title or '').lower()):
+            mask |= self.keyword_bits[keyword]
+        return mask
+
+    def classify_article(self, article_id, title):
+        """Bitmask for an article, computed once per ID (and again only if its title changes)"""
+        cached = self._cache.get(article_id)
+        if cached is not None and cached[0] == title:
+            return cached[1]
+
+        mask = self.classify(title)
+        with self._lock:
+            self._cache[article_id] = (title, mask)
+        return mask
+
+    def mentions(self, mask, company):
+        """Whether a mask includes the given company"""
+        return bool(mask & (1 << self.companies.index(company)))
+
+    def cache_size(self):
+        return len(self._cache)
+
+_classifier = CompanyClassifier()
+
+def get_company_classifier():
+    """Get the process-wide classifier and its per-article cache"""
+    return _classifier
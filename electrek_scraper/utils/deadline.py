@@ -0,0 +1,55 @@
+# electrek_scraper/utils/deadline.py
+"""
+Time budgets for long-running jobs and resume tokens for partial results
+"""
+import base64
+import json
+import time
+
+class DeadlineExceeded(Exception):
+    """Raised when a job's time budget has been used up"""
+    pass
+
+class Deadline:
+    """Wall-clock time budget shared by every request a job makes"""
+
+    def __init__(self, budget_seconds):
+        self.budget = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+
+    def elapsed(self):
+        """Seconds since the job started"""
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """Seconds left before the deadline"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self, margin=0.0):
+        """Whether less than `margin` seconds are left"""
+        return self.remaining() <= margin
+
+    def clamp_timeout(self, timeout):
+        """Shrink a request timeout (seconds or a (connect, read) tuple) to fit the remaining budget"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Time budget of {self.budget:.0f}s exhausted")
+
+        if isinstance(timeout, tuple):
+            return tuple(min(part, remaining) if part is not None else remaining for part in timeout)
+        return min(timeout, remaining) if timeout is not None else remaining
+
+def encode_resume_token(state):
+    """Pack resume state into a URL-safe token"""
+    payload = json.dumps(state, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_resume_token(token):
+    """Unpack a token made by encode_resume_token; returns None if it is invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return state if isinstance(state, dict) else None
+    except (ValueError, TypeError):
+        return None
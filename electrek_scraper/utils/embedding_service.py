@@ -1,6 +1,5 @@
 # electrek_scraper/utils/embedding_service.py
 import numpy as np
-import requests
 from .proxy_manager import ProxyManager
 import os
 import json
@@ -8,7 +7,8 @@ import json
 class EmbeddingService:
     def __init__(self, use_proxy=False):
         """Initialize the embedding service with proxy support"""
-        self.proxy_manager = ProxyManager() if use_proxy else None
+        self.use_proxy = use_proxy
+        self.proxy_manager = ProxyManager()
         
         # Use OpenAI API for embeddings (requires API key)
         self.openai_api_key = os.environ.get('OPENAI_API_KEY')
@@ -43,7 +43,7 @@ class EmbeddingService:
         }
         
         try:
-            if self.proxy_manager:
+            if self.use_proxy:
                 response = self.proxy_manager.make_request(
                     "https://api.openai.com/v1/embeddings",
                     method="POST",
@@ -51,8 +51,9 @@ class EmbeddingService:
                     json=data
                 )
             else:
-                response = requests.post(
+                response = self.proxy_manager.direct_request(
                     "https://api.openai.com/v1/embeddings",
+                    method="POST",
                     headers=headers,
                     json=data
                 )
@@ -0,0 +1,160 @@
+# electrek_scraper/utils/job_queue.py
+"""
+SQLite-backed queue and checkpoints for long-running scrape and sentiment jobs
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from ..config import Config
+
+class JobQueue:
+    """Small durable job queue shared by the web app and the worker process"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.JOB_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_table()
+
+    @contextmanager
+    def _connect(self):
+        """Autocommit connection with rows addressable by column name"""
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _create_table(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    updated_at REAL,
+                    finished_at REAL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, id)")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def enqueue(self, kind, params=None):
+        """Add a job and return its ID"""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (kind, params, created_at) VALUES (?, ?, ?)",
+                (kind, json.dumps(params or {}), time.time())
+            )
+            return cursor.lastrowid
+
+    def claim_next(self):
+        """Atomically mark the oldest queued job as running and return it (or None)"""
+        with self._connect() as connection:
+            # IMMEDIATE takes the write lock up front so two workers can't claim the same job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    connection.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, updated_at = ? WHERE id = ?",
+                        (now, now, row['id'])
+                    )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        return self.get(row['id']) if row is not None else None
+
+    def update_progress(self, job_id, progress, total=None):
+        """Record how many items of the job are done"""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET progress = ?, total = COALESCE(?, total), updated_at = ? WHERE id = ?",
+                (progress, total, time.time(), job_id)
+            )
+
+    def complete(self, job_id, result):
+        """Mark a job as done and store its result"""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result, default=str), now, now, job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Mark a job as failed"""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (str(error), now, now, job_id)
+            )
+
+    def get(self, job_id):
+        """Get a job with its progress, throughput and ETA"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_status(row) if row else None
+
+    def save_checkpoint(self, name, state):
+        """Store resumable progress for a long-running task"""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, state, updated_at) VALUES (?, ?, ?)",
+                (name, json.dumps(state), time.time())
+            )
+
+    def load_checkpoint(self, name):
+        """Get the stored progress for a task, or None"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT state FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return json.loads(row['state']) if row else None
+
+    def clear_checkpoint(self, name):
+        """Forget a task's progress once it has finished"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+
+    @staticmethod
+    def _to_status(row):
+        """Convert a row to a JSON-friendly status dict"""
+        job = dict(row)
+        job['params'] = json.loads(job['params']) if job['params'] else {}
+        job['result'] = json.loads(job['result']) if job['result'] else None
+
+        # Throughput and ETA from progress so far
+        job['items_per_second'] = None
+        job['eta_seconds'] = None
+        if job['started_at']:
+            end = job['finished_at'] or time.time()
+            elapsed = max(end - job['started_at'], 0.001)
+            job['elapsed_seconds'] = round(elapsed, 1)
+            if job['progress']:
+                rate = job['progress'] / elapsed
+                job['items_per_second'] = round(rate, 2)
+                if job['status'] == 'running' and job['total']:
+                    job['eta_seconds'] = round(max(job['total'] - job['progress'], 0) / rate, 1)
+        return job
@@ -0,0 +1,112 @@
+# electrek_scraper/utils/paginated_reader.py
+"""
+Paginated reads from Supabase tables, with pages fetched concurrently
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+from ..config import Config
+
+class PaginatedReader:
+    """
+    Reads every row a query matches, past PostgREST's per-request row limit
+
+    read_all() counts the matching rows first, then fetches the offset pages in
+    parallel (bounded by max_workers) and returns them in order. iter_pages() and
+    iter_keyset() stream one page at a time instead; iter_keyset() walks the table
+    by `id > last_id`, which stays stable while rows are being inserted or updated.
+
+    Query builders are mutable (.range() appends parameters), so every request
+    gets a freshly built query.
+    """
+
+    def __init__(self, client, table, columns="*", filters=None, order=(("id", False),),
+                 page_size=1000, max_workers=None, count_column="id"):
+        """
+        Parameters:
+        - client: Supabase client
+        - table: Table to read
+        - columns: Column projection for the select
+        - filters: Optional function applying .eq()/.gte()/... to a select builder
+        - order: (column, descending) pairs; end with a unique column so offset pages don't overlap
+        - page_size: Rows per request (PostgREST returns at most 1000)
+        - max_workers: Pages fetched at once (default SUPABASE_READ_WORKERS)
+        - count_column: Column selected for the row count
+        """
+        self.client = client
+        self.table = table
+        self.columns = columns
+        self.filters = filters
+        self.order = order
+        self.page_size = page_size
+        self.max_workers = max_workers or Config.SUPABASE_READ_WORKERS
+        self.count_column = count_column
+
+    def _select(self, columns, **options):
+        query = self.client.table(self.table).select(columns, **options)
+        return self.filters(query) if self.filters else query
+
+    def count(self):
+        """Number of rows matching the filters"""
+        response = self._select(self.count_column, count="exact").limit(1).execute()
+        return response.count or 0
+
+    def page(self, index):
+        """Rows of the page at the given index"""
+        query = self._select(self.columns)
+        for column, descending in self.order:
+            query = query.order(column, desc=descending)
+        start = index * self.page_size
+        return query.range(start, start + self.page_size - 1).execute().data
+
+    def read_all(self, limit=None):
+        """Every matching row (or the first `limit`), in order"""
+        total = self.count()
+        if limit is not None:
+            total = min(total, limit)
+        page_count = math.ceil(total / self.page_size)
+
+        pages = []
+        if page_count == 1:
+            pages = [self.page(0)]
+        elif page_count > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, page_count)) as executor:
+                pages = list(executor.map(self.page, range(page_count)))
+
+        # Rows inserted after the count land in further pages
+        while (limit is None or page_count * self.page_size < limit) and \
+                (not pages or len(pages[-1]) == self.page_size):
+            pages.append(self.page(page_count))
+            page_count += 1
+
+        rows = [row for page in pages for row in page]
+        return rows if limit is None else rows[:limit]
+
+    def iter_pages(self, limit=None):
+        """Yield offset pages in order, fetching each one only when the previous has been consumed"""
+        index = 0
+        fetched = 0
+        while limit is None or fetched < limit:
+            page = self.page(index)
+            if limit is not None:
+                page = page[:limit - fetched]
+            if page:
+                yield page
+            fetched += len(page)
+            if len(page) < self.page_size:
+                return
+            index += 1
+
+    def iter_keyset(self, after_id=0):
+        """Yield pages of matching rows in ID order, each request starting after the last ID seen"""
+        while True:
+            page = self._select(self.columns) \
+                .gt("id", after_id) \
+                .order("id") \
+                .limit(self.page_size) \
+                .execute().data
+            if not page:
+                return
+            yield page
+            if len(page) < self.page_size:
+                return
+            after_id = page[-1]['id']
@@ -0,0 +1,174 @@
+# electrek_scraper/utils/prerender.py
+"""
+Build-time rendering of the public article pages
+
+`flask --app app prerender` runs the report analytics once and writes, for each public
+article, the final HTML (PRERENDER_DIR/<slug>.html, with its ETag in <slug>.meta.json)
+and the chart data as a static file (static/data/<slug>.json). The article routes serve
+the prebuilt page when it exists, and /api/charts serves the chart series from the data
+file, so cold starts and CDN misses cost a file read.
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+import click
+from flask import current_app, render_template, url_for
+from flask.cli import with_appcontext
+from ..config import Config
+
+# Context entries written to the static data file
+DATA_KEYS = ('stats', 'sentiment_data', 'correlation', 'top_articles',
+             'author_analysis', 'company_comparison', 'business_metrics')
+
+# slug -> (file mtime, page or chart data), so a new build is picked up without a restart
+_pages = {}
+_chart_data = {}
+_pages_lock = threading.Lock()
+
+def _paths(slug):
+    base = os.path.join(Config.PRERENDER_DIR, slug)
+    return f"{base}.html", f"{base}.meta.json"
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def get_prerendered_page(slug):
+    """{'html', 'etag', 'generated_at'} of the prebuilt page, or None to render it live"""
+    if not Config.PRERENDER:
+        return None
+    html_path, meta_path = _paths(slug)
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+
+    cached = _pages.get(slug)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(html_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+    except (OSError, ValueError) as e:
+        print(f"Error reading prerendered page {slug}: {str(e)}")
+        return None
+
+    page = {'html': html, 'etag': meta['etag'], 'generated_at': datetime.fromisoformat(meta['generated_at'])}
+    with _pages_lock:
+        _pages[slug] = (mtime, page)
+    return page
+
+def get_prerendered_chart_data(slug):
+    """Chart data written with the prebuilt page (static/data/<slug>.json), or None"""
+    if not Config.PRERENDER:
+        return None
+    data_path = os.path.join(current_app.static_folder, 'data', f"{slug}.json")
+    try:
+        mtime = os.path.getmtime(data_path)
+    except OSError:
+        return None
+
+    cached = _chart_data.get(slug)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(data_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading prerendered chart data {slug}: {str(e)}")
+        return None
+
+    from .chart_data import ScatterPoints
+    data['sentiment_data'] = ScatterPoints(data['sentiment_data'] or [])
+
+    with _pages_lock:
+        _chart_data[slug] = (mtime, data)
+    return data
+
+def _build_chart_data(slug, context, generated_at):
+    data = {key: context.get(key) for key in DATA_KEYS}
+    data['sentiment_data'] = data['sentiment_data'].rows()
+    # NaN isn't valid JSON for the browser
+    correlation = data['correlation']
+    data['correlation'] = float(correlation) if correlation is not None and math.isfinite(correlation) else None
+    data['slug'] = slug
+    data['generated_at'] = generated_at.isoformat()
+    return data
+
+def prerender_articles(slugs=None):
+    """
+    Render the public articles and write their HTML, metadata and chart data files
+
+    Parameters:
+    - slugs: Articles to build (default: every entry in PRERENDERED_ARTICLES)
+
+    Returns a list of {'slug', 'etag', 'bytes', 'data_path'} per article.
+    """
+    from ..models import Article
+    from ..public_views import PRERENDERED_ARTICLES
+
+    unknown = set(slugs or ()) - set(PRERENDERED_ARTICLES)
+    if unknown:
+        raise ValueError(f"Unknown article slugs: {', '.join(sorted(unknown))}")
+
+    # The public articles all chart the all-time report; compute it fresh, once
+    report = Article.get_report(None, top_limit=25)
+    data_dir = os.path.join(current_app.static_folder, 'data')
+
+    results = []
+    for slug in slugs or PRERENDERED_ARTICLES:
+        endpoint, template, build_context = PRERENDERED_ARTICLES[slug]
+        generated_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+        with current_app.test_request_context('/'):
+            path = url_for(endpoint)
+        with current_app.test_request_context(path):
+            context = build_context(report)
+            html = render_template(template, **context)
+            data = current_app.json.dumps(_build_chart_data(slug, context, generated_at))
+
+        etag = hashlib.sha256(html.encode('utf-8')).hexdigest()[:32]
+        html_path, meta_path = _paths(slug)
+        data_path = os.path.join(data_dir, f"{slug}.json")
+
+        _write_atomic(html_path, html)
+        _write_atomic(data_path, data)
+        # Written last: a page is only served once its metadata exists
+        _write_atomic(meta_path, json.dumps({
+            'slug': slug,
+            'path': path,
+            'etag': etag,
+            'generated_at': generated_at.isoformat(),
+            'data_url': f"/static/data/{slug}.json"
+        }, indent=2))
+
+        print(f"Prerendered {path}: {len(html):,} bytes of HTML, chart data in {data_path}")
+        results.append({'slug': slug, 'etag': etag, 'bytes': len(html), 'data_path': data_path})
+    return results
+
+@click.command('prerender')
+@click.option('--slug', 'slugs', multiple=True, help="Article slug to build (repeatable; default: all)")
+@with_appcontext
+def prerender_command(slugs):
+    """Render the public articles to static HTML and JSON chart data"""
+    try:
+        prerender_articles(slugs or None)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--slug')
@@ -0,0 +1,134 @@
+# electrek_scraper/utils/rate_limiter.py
+"""
+Rate limiting helpers for outbound HTTP requests
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from .deadline import DeadlineExceeded
+
+class HostRateLimiter:
+    """Spaces out requests to the same host, shared safely across worker threads"""
+
+    def __init__(self, requests_per_second=4.0, jitter=0.25):
+        """
+        Parameters:
+        - requests_per_second: Maximum sustained request rate per host
+        - jitter: Fraction of the interval added at random so requests look less mechanical
+        """
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        """Block until the host of the given URL may be hit again; returns seconds waited"""
+        host = urlparse(url).netloc
+
+        # Reserve the next free slot for this host under the lock, then sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            interval = self.min_interval * (1 + random.uniform(0, self.jitter))
+            self._next_slot[host] = slot + interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket shared by worker threads that backs off when the API says it is overloaded
+    
+    The refill rate is halved on every rate-limit response and then grows back slowly with
+    each success (AIMD), so a pool of workers settles just under the provider's real limit.
+    """
+
+    def __init__(self, rate=2.0, burst=None, min_rate=0.1, max_rate=None, increase=0.05, decrease=0.5):
+        """
+        Parameters:
+        - rate: Starting requests per second
+        - burst: Tokens that can be saved up (defaults to one second of requests)
+        - min_rate / max_rate: Bounds the adaptive rate stays within
+        - increase: Requests per second added after each success
+        - decrease: Factor the rate is multiplied by after a rate-limit response
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self.increase = increase
+        self.decrease = decrease
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, deadline=None):
+        """Block until a request may be sent; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+
+            if deadline and deadline.remaining() <= delay:
+                raise DeadlineExceeded("Time budget would run out while waiting for the rate limiter")
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        """Creep the rate back up after a successful request"""
+        with self._lock:
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def on_rate_limited(self, retry_after=None):
+        """Cut the rate and pause every worker until the server's retry-after has passed"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.rate * self.decrease, self.min_rate)
+            self.tokens = 0.0
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.paused_until = max(self.paused_until, now + pause)
+            self.rate_limited_count += 1
+            print(f"Rate limited: pausing {pause:.1f}s, rate now {self.rate:.2f} req/s")
+
+    def get_stats(self):
+        """Current rate and how often the limit was hit"""
+        with self._lock:
+            return {
+                'rate': round(self.rate, 2),
+                'tokens': round(self.tokens, 2),
+                'rate_limited': self.rate_limited_count
+            }
+
+def retry_after_seconds(response):
+    """Seconds to wait according to a 429/503 response's headers, or None if not given"""
+    headers = response.headers
+    try:
+        # OpenAI sends a millisecond variant alongside the standard header
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        if value.strip().replace('.', '', 1).isdigit():
+            return float(value)
+        # HTTP-date form
+        retry_at = parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,219 @@
+# electrek_scraper/utils/report_aggregates.py
+"""
+Monthly, author and company report sections read from pre-aggregated tables
+
+A trigger on articles (sql/report_aggregates.sql) keeps per-month totals current on
+every insert and sentiment write, so these sections read a few hundred summary rows
+instead of the whole corpus. A window that starts mid-month reads whole months from
+the tables and the partial first month from raw articles, so results match ReportEngine.
+
+Run this module to backfill company masks and rebuild the tables:
+    python -m electrek_scraper.utils.report_aggregates [--recompute]
+"""
+import sys
+import traceback
+from datetime import datetime, timedelta
+from ..config import Config
+from .article_frame import author_sort_key
+from .company_classifier import COMPANIES, TESLA_BIT, get_company_classifier
+from .report_engine import placeholder_monthly_stats
+
+MONTHLY_FIELDS = ('article_count', 'comment_sum')
+AUTHOR_FIELDS = ('total_articles', 'tesla_articles', 'tesla_sentiment_sum', 'tesla_comments_sum',
+                 'non_tesla_sentiment_sum', 'non_tesla_comments_sum')
+COMPANY_FIELDS = ('article_count', 'total_comments', 'sentiment_sum', 'negative_articles', 'positive_articles')
+
+# Set once the aggregate tables turn out to be missing, so later calls skip straight to raw rows
+_tables_missing = False
+
+def _accumulate(totals, key, row, fields):
+    entry = totals.setdefault(key, dict.fromkeys(fields, 0))
+    for field in fields:
+        entry[field] += row[field] or 0
+
+def _edge_contributions(rows):
+    """The aggregate rows the trigger would write for these articles, one per article and table"""
+    classifier = get_company_classifier()
+    monthly, authors, companies = [], [], []
+
+    for row in rows:
+        if not row.get('published_at'):
+            continue
+        month = row['published_at'][:7]
+        comments = row.get('comment_count') or 0
+        monthly.append({'month': month, 'article_count': 1, 'comment_sum': comments})
+
+        sentiment = row.get('sentiment_score')
+        if sentiment is None:
+            continue
+        mask = classifier.classify_article(row['id'], row.get('title'))
+        is_tesla = bool(mask & TESLA_BIT)
+
+        if row.get('author') is not None:
+            authors.append({
+                'month': month,
+                'author': row['author'],
+                'total_articles': 1,
+                'tesla_articles': 1 if is_tesla else 0,
+                'tesla_sentiment_sum': sentiment if is_tesla else 0,
+                'tesla_comments_sum': comments if is_tesla else 0,
+                'non_tesla_sentiment_sum': 0 if is_tesla else sentiment,
+                'non_tesla_comments_sum': 0 if is_tesla else comments
+            })
+
+        for bit_index in range(len(COMPANIES)):
+            if mask & (1 << bit_index):
+                companies.append({
+                    'month': month,
+                    'company_bit': bit_index,
+                    'article_count': 1,
+                    'total_comments': comments,
+                    'sentiment_sum': sentiment,
+                    'negative_articles': 1 if sentiment < -0.1 else 0,
+                    'positive_articles': 1 if sentiment > 0.1 else 0
+                })
+
+    return monthly, authors, companies
+
+def format_monthly_stats(totals, months=None):
+    """Monthly section from {"YYYY-MM": {article_count, comment_sum}}"""
+    data = [
+        {
+            "month": datetime.strptime(month, "%Y-%m").strftime("%b %Y"),
+            "avg_comments": round(stats['comment_sum'] / stats['article_count']),
+            "article_count": stats['article_count']
+        }
+        for month, stats in sorted(totals.items())
+        if stats['article_count'] > 0
+    ]
+    return data or placeholder_monthly_stats(months)
+
+def format_author_tesla_bias(totals, min_articles=5):
+    """Author section from {author: AUTHOR_FIELDS sums}, most Tesla articles first (ties by name)"""
+    author_analysis = []
+    for author, stats in sorted(totals.items()):
+        total = stats['total_articles']
+        if total < min_articles:
+            continue
+        tesla = stats['tesla_articles']
+        non_tesla = total - tesla
+        author_analysis.append({
+            'author': author,
+            'total_articles': total,
+            'tesla_articles': tesla,
+            'tesla_percentage': round((tesla / total) * 100, 1),
+            'avg_tesla_sentiment': round(stats['tesla_sentiment_sum'] / max(tesla, 1), 3),
+            'avg_tesla_comments': round(stats['tesla_comments_sum'] / max(tesla, 1), 1),
+            'avg_non_tesla_sentiment': round(stats['non_tesla_sentiment_sum'] / max(non_tesla, 1), 3),
+            'avg_non_tesla_comments': round(stats['non_tesla_comments_sum'] / max(non_tesla, 1), 1)
+        })
+
+    author_analysis.sort(key=author_sort_key)
+    return author_analysis
+
+def format_company_comparison(totals):
+    """Company section from {company bit index: COMPANY_FIELDS sums}"""
+    comparison_data = []
+    for bit_index, company in enumerate(COMPANIES):
+        stats = totals.get(bit_index)
+        if not stats or stats['article_count'] <= 0:
+            continue
+        article_count = stats['article_count']
+        comparison_data.append({
+            'company': company,
+            'article_count': article_count,
+            'total_comments': stats['total_comments'],
+            'avg_comments': round(stats['total_comments'] / article_count, 1),
+            'avg_sentiment': round(stats['sentiment_sum'] / article_count, 3),
+            'negative_articles': stats['negative_articles'],
+            'positive_articles': stats['positive_articles'],
+            'negative_percentage': round((stats['negative_articles'] / article_count) * 100, 1)
+        })
+
+    comparison_data.sort(key=lambda x: x['avg_comments'], reverse=True)
+    return comparison_data
+
+class ReportAggregates:
+    """Report sections from the aggregate tables; each returns None when they can't be used"""
+
+    def __init__(self, months=None, rows=None):
+        """
+        Parameters:
+        - months: Reporting window in months (None = all time)
+        - rows: Article rows of the window already loaded (e.g. by ReportEngine); the
+          partial first month is taken from them instead of a second query
+        """
+        self.months = months
+        self.rows = rows
+        self.full_months_from = None
+        if months is not None:
+            start = datetime.now() - timedelta(days=30 * months)
+            self.full_months_from = (start.replace(day=1) + timedelta(days=32)).replace(day=1).date()
+        self._edge = None
+
+    def _edge_contributions(self):
+        """Contributions of the raw articles between the window start and the first whole month"""
+        if self._edge is None:
+            from ..models import Article
+            rows = []
+            if self.full_months_from is not None and self.rows is not None:
+                # The window rows before the first whole month ("YYYY-MM" compares as text)
+                first_month = self.full_months_from.strftime("%Y-%m")
+                rows = [row for row in self.rows
+                        if row.get('published_at') and row['published_at'][:7] < first_month]
+            elif self.full_months_from is not None:
+                until = datetime.combine(self.full_months_from, datetime.min.time())
+                rows = Article.get_report_rows(self.months, until=until)
+            self._edge = _edge_contributions(rows)
+        return self._edge
+
+    def _totals(self, table, edge_index, key_field, fields):
+        """Aggregate rows for the window summed by key, or None if the tables are unavailable"""
+        global _tables_missing
+        if not Config.REPORT_AGGREGATES or _tables_missing:
+            return None
+
+        from ..models import Article, MISSING_TABLE_CODES, is_missing_from_schema
+        try:
+            rows = Article.get_aggregate_rows(table, self.full_months_from)
+            edge_rows = self._edge_contributions()[edge_index]
+        except Exception as e:
+            print(f"Report aggregates unavailable, computing from articles instead: {str(e)}")
+            print(traceback.format_exc())
+            # Only a missing table is permanent; anything else just falls back for this call
+            if is_missing_from_schema(e, MISSING_TABLE_CODES):
+                _tables_missing = True
+            return None
+
+        totals = {}
+        for row in edge_rows + rows:
+            # Table months are dates ("2024-05-01"), edge months are already "2024-05"
+            key = str(row['month'])[:7] if key_field == 'month' else row[key_field]
+            _accumulate(totals, key, row, fields)
+        return totals
+
+    def monthly_stats(self):
+        """Average comments and article count per calendar month, oldest first"""
+        totals = self._totals('report_monthly_stats', 0, 'month', MONTHLY_FIELDS)
+        return None if totals is None else format_monthly_stats(totals, self.months)
+
+    def author_tesla_bias(self, min_articles=5):
+        """Per-author Tesla coverage share and sentiment, most Tesla articles first"""
+        totals = self._totals('report_author_stats', 1, 'author', AUTHOR_FIELDS)
+        return None if totals is None else format_author_tesla_bias(totals, min_articles)
+
+    def company_comparison(self):
+        """Engagement and sentiment per EV company mentioned in titles, most commented first"""
+        totals = self._totals('report_company_stats', 2, 'company_bit', COMPANY_FIELDS)
+        return None if totals is None else format_company_comparison(totals)
+
+def rebuild(recompute=False):
+    """Store missing company masks, then recompute every aggregate table"""
+    from ..models import Article
+    updated = Article.backfill_company_masks(recompute=recompute)
+    print(f"Stored company masks for {updated} articles")
+    Article.refresh_report_aggregates()
+    print("Rebuilt report aggregate tables")
+
+if __name__ == "__main__":
+    rebuild(recompute='--recompute' in sys.argv[1:])
@@ -0,0 +1,267 @@
+# electrek_scraper/utils/report_engine.py
+"""
+Single-pass analytics for the reports dashboard and blog pages
+
+The articles in the reporting window are fetched once. Sections that need whole rows
+(statistics, scatter data, top articles) are fed row by row in one pass; the grouped
+aggregates are vectorized over a columnar ArticleFrame built from the same rows.
+"""
+import copy
+import random
+import traceback
+from datetime import datetime, timedelta
+from .article_frame import ArticleFrame
+from .company_classifier import COMPANY_BITS, TESLA_BIT, get_company_classifier
+
+def _project(row, columns):
+    """Copy of a frame row with only the columns a section used to select"""
+    return {column: row.get(column) for column in columns}
+
+def placeholder_monthly_stats(months):
+    """Dummy monthly data so the charts still render when no articles are found"""
+    months = months or 6
+    today = datetime.now()
+    data = []
+    for i in range(months):
+        month_date = today - timedelta(days=30 * (months - i - 1))
+        data.append({
+            "month": month_date.strftime("%b %Y"),
+            "avg_comments": random.randint(60, 120),
+            "article_count": random.randint(15, 35)
+        })
+    return data
+
+def decorate_top_articles(rows):
+    """Top article rows with company flags and sentiment category/color added"""
+    from .sentiment_service import SentimentService
+    sentiment_service = SentimentService()
+    classifier = get_company_classifier()
+
+    articles = []
+    for row in rows:
+        article = _project(row, ('id', 'title', 'author', 'comment_count', 'sentiment_score', 'published_at'))
+        mask = classifier.classify_article(article['id'], article['title'])
+        article['is_tesla'] = bool(mask & TESLA_BIT)
+        article['is_byd'] = bool(mask & COMPANY_BITS['BYD'])
+        article['is_ford'] = bool(mask & COMPANY_BITS['Ford'])
+        article['is_rivian'] = bool(mask & COMPANY_BITS['Rivian'])
+        article['sentiment_category'] = sentiment_service.get_sentiment_category(article['sentiment_score'])
+        article['sentiment_color'] = sentiment_service.get_sentiment_color(article['sentiment_score'])
+        articles.append(article)
+    return articles
+
+class _Statistics:
+    """Article and comment totals for the whole window"""
+    default = {
+        "total_articles": 0,
+        "total_comments": 0,
+        "avg_comments": 0,
+        "max_comments": 0,
+        "most_commented_article": None
+    }
+
+    def __init__(self):
+        self.total_articles = 0
+        self.total_comments = 0
+        self.counted = 0
+        self.max_comments = 0
+        self.most_commented_article = None
+
+    def add(self, row):
+        self.total_articles += 1
+        count = row.get('comment_count')
+        if count is None:
+            return
+        try:
+            count_value = int(count)
+        except (ValueError, TypeError):
+            return
+        self.total_comments += count_value
+        self.counted += 1
+        if count_value > self.max_comments:
+            self.max_comments = count_value
+            self.most_commented_article = _project(row, ('id', 'title', 'comment_count', 'published_at'))
+
+    def result(self):
+        return {
+            "total_articles": self.total_articles,
+            "total_comments": self.total_comments,
+            "avg_comments": round(self.total_comments / self.counted) if self.counted else 0,
+            "max_comments": self.max_comments,
+            "most_commented_article": self.most_commented_article
+        }
+
+class _SentimentData:
+    """Scored articles for the sentiment/engagement scatter plot"""
+    default = []
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row):
+        if row.get('sentiment_score') is not None:
+            self.rows.append(_project(row, ('id', 'title', 'sentiment_score', 'comment_count', 'published_at')))
+
+    def result(self):
+        return self.rows
+
+class _TopArticles:
+    """Most commented scored articles with company flags and sentiment category"""
+    default = []
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.candidates = []
+
+    def add(self, row):
+        if row.get('sentiment_score') is not None:
+            self.candidates.append(row)
+
+    def result(self):
+        # Same order as ORDER BY comment_count DESC in Postgres, which puts NULLs first
+        ranked = sorted(
+            self.candidates,
+            key=lambda row: float('inf') if row.get('comment_count') is None else row['comment_count'],
+            reverse=True
+        )
+        return decorate_top_articles(ranked[:self.limit])
+
+class ReportEngine:
+    """Computes the report sections from a single fetch of the articles in a date window"""
+
+    def __init__(self, months=None, rows=None):
+        """
+        Parameters:
+        - months: Reporting window in months (None = all time)
+        - rows: Pre-loaded article rows; fetched from the database when omitted
+        """
+        self.months = months
+        self._rows = rows
+        self._frame = None
+
+    @property
+    def rows(self):
+        """Every article row in the window, fetched on first use"""
+        if self._rows is None:
+            self._rows = self._load(self.months)
+        return self._rows
+
+    @property
+    def frame(self):
+        """Columnar copy of the rows, built on first use"""
+        if self._frame is None:
+            self._frame = ArticleFrame.from_rows(self.rows)
+        return self._frame
+
+    def _stream(self):
+        """Rows one at a time, without holding the window in memory unless it is already loaded"""
+        if self._rows is not None:
+            return self._rows
+        from ..models import Article
+        return Article.iter_report_rows(self.months)
+
+    @staticmethod
+    def _load(months):
+        from ..models import Article
+        try:
+            return Article.get_report_rows(months)
+        except Exception as e:
+            print(f"Error loading report data: {str(e)}")
+            print(traceback.format_exc())
+            return []
+
+    def _run(self, sections, vectorized=None):
+        """
+        Feed every row to each row section once, then compute the vectorized sections
+        
+        A section that errors falls back to its default (an empty result). Runs without
+        vectorized sections stream the rows instead of loading the whole window.
+        """
+        failed = set()
+        rows = self.rows if vectorized else self._stream()
+        try:
+            for row in rows:
+                for name, section in sections.items():
+                    if name in failed:
+                        continue
+                    try:
+                        section.add(row)
+                    except Exception as e:
+                        print(f"Error computing {name}: {str(e)}")
+                        print(traceback.format_exc())
+                        failed.add(name)
+        except Exception as e:
+            # A page request failed part way through the stream
+            print(f"Error loading report data: {str(e)}")
+            print(traceback.format_exc())
+            failed.update(sections)
+
+        results = {}
+        for name, section in sections.items():
+            try:
+                results[name] = copy.deepcopy(section.default) if name in failed else section.result()
+            except Exception as e:
+                print(f"Error computing {name}: {str(e)}")
+                print(traceback.format_exc())
+                results[name] = copy.deepcopy(section.default)
+
+        for name, (compute, default) in (vectorized or {}).items():
+            try:
+                results[name] = compute()
+            except Exception as e:
+                print(f"Error computing {name}: {str(e)}")
+                print(traceback.format_exc())
+                results[name] = default
+        return results
+
+    def _monthly_stats(self):
+        return self.frame.monthly_stats() or placeholder_monthly_stats(self.months)
+
+    def _grouped(self, name, compute):
+        """A grouped section from the aggregate tables or SQL report functions when they can be used, else from the frame"""
+        from .report_queries import precomputed_section
+        data = precomputed_section(name, self.months, rows=self._rows)
+        return data if data is not None else compute()
+
+    def report(self, top_limit=25):
+        """
+        Every section, computed in one pass over the frame
+        
+        The monthly, author and company sections come from the aggregate tables or the
+        SQL report functions when they are enabled and installed; the frame is only used
+        for them as a fallback.
+        """
+        results = self._run({
+            'filtered_stats': _Statistics(),
+            'all_sentiment_data': _SentimentData(),
+            'top_articles': _TopArticles(top_limit)
+        }, vectorized={
+            'monthly_data': (lambda: self._grouped('monthly_stats', self._monthly_stats), []),
+            'author_analysis': (lambda: self._grouped('author_tesla_bias', self.frame.author_tesla_bias), []),
+            'company_comparison': (lambda: self._grouped('company_comparison', self.frame.company_comparison), []),
+            'business_metrics': (lambda: self.frame.business_impact_metrics(), {})
+        })
+        period_msg = f"for the last {self.months} months" if self.months is not None else "for all time"
+        print(f"Computed report {period_msg} from {len(self.rows)} articles in one pass")
+        return results
+
+    def statistics(self):
+        return self._run({'filtered_stats': _Statistics()})['filtered_stats']
+
+    def sentiment_data(self):
+        return self._run({'all_sentiment_data': _SentimentData()})['all_sentiment_data']
+
+    def monthly_stats(self):
+        return self._run({}, {'monthly_data': (self._monthly_stats, [])})['monthly_data']
+
+    def top_articles(self, limit=20):
+        return self._run({'top_articles': _TopArticles(limit)})['top_articles']
+
+    def author_tesla_bias(self):
+        return self._run({}, {'author_analysis': (lambda: self.frame.author_tesla_bias(), [])})['author_analysis']
+
+    def company_comparison(self):
+        return self._run({}, {'company_comparison': (lambda: self.frame.company_comparison(), [])})['company_comparison']
+
+    def business_impact_metrics(self):
+        return self._run({}, {'business_metrics': (lambda: self.frame.business_impact_metrics(), {})})['business_metrics']
@@ -0,0 +1,291 @@
+# electrek_scraper/utils/report_queries.py
+"""
+Report sections computed by server-side SQL functions (sql/report_functions.sql)
+
+The database groups and sums the window and returns only aggregate rows, so no
+section depends on paging through the articles table. SQLiteReportBackend runs the
+same queries against a local SQLite copy of articles, for testing without Supabase.
+"""
+import os
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from ..config import Config
+from .company_classifier import get_company_classifier
+from .report_aggregates import (ReportAggregates, format_author_tesla_bias,
+                                format_company_comparison, format_monthly_stats)
+from .report_engine import ReportEngine, decorate_top_articles
+
+# Set once the report functions turn out to be missing, so later calls skip straight to raw rows
+_functions_missing = False
+
+class SupabaseReportBackend:
+    """Calls the report_* SQL functions through PostgREST"""
+
+    def _call(self, function, **params):
+        from ..models import Article
+        return Article.call_report_function(function, params)
+
+    def totals(self, since):
+        rows = self._call('report_totals', since=since)
+        return rows[0] if rows else None
+
+    def monthly(self, since):
+        return self._call('report_monthly', since=since)
+
+    def top_articles(self, since, limit):
+        return self._call('report_top_articles', since=since, top_n=limit)
+
+    def author_sums(self, since):
+        return self._call('report_author_sums', since=since)
+
+    def company_sums(self, since):
+        return self._call('report_company_sums', since=since)
+
+class SQLiteReportBackend:
+    """The report functions over a local SQLite articles table (published_at as ISO text)"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.REPORT_SQLITE_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_table()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _create_table(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT,
+                    author TEXT,
+                    comment_count INTEGER,
+                    sentiment_score REAL,
+                    published_at TEXT,
+                    company_mask INTEGER
+                )
+            """)
+
+    def load_articles(self, rows):
+        """Insert or replace article rows, classifying titles that have no company mask"""
+        classifier = get_company_classifier()
+        with self._connect() as connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row['id'], row.get('title'), row.get('author'), row.get('comment_count'),
+                     row.get('sentiment_score'), row.get('published_at'),
+                     row['company_mask'] if row.get('company_mask') is not None
+                     else classifier.classify(row.get('title')))
+                    for row in rows
+                ]
+            )
+            connection.execute("COMMIT")
+
+    def _query(self, sql, *params):
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(sql, params).fetchall()]
+
+    def totals(self, since):
+        rows = self._query("""
+            SELECT COUNT(*) AS total_articles,
+                   COALESCE(SUM(comment_count), 0) AS total_comments,
+                   COUNT(comment_count) AS counted_articles
+              FROM articles
+             WHERE ? IS NULL OR published_at >= ?
+        """, since, since)
+        top = self._query("""
+            SELECT id, title, comment_count, published_at
+              FROM articles
+             WHERE (? IS NULL OR published_at >= ?) AND comment_count > 0
+             ORDER BY comment_count DESC, id
+             LIMIT 1
+        """, since, since)
+        totals = rows[0]
+        totals['max_comments'] = top[0]['comment_count'] if top else 0
+        totals['most_commented_id'] = top[0]['id'] if top else None
+        totals['most_commented_title'] = top[0]['title'] if top else None
+        totals['most_commented_published_at'] = top[0]['published_at'] if top else None
+        return totals
+
+    def monthly(self, since):
+        return self._query("""
+            SELECT substr(published_at, 1, 7) || '-01' AS month,
+                   COUNT(*) AS article_count,
+                   COALESCE(SUM(comment_count), 0) AS comment_sum
+              FROM articles
+             WHERE published_at IS NOT NULL AND (? IS NULL OR published_at >= ?)
+             GROUP BY 1
+             ORDER BY 1
+        """, since, since)
+
+    def top_articles(self, since, limit):
+        return self._query("""
+            SELECT id, title, author, comment_count, sentiment_score, published_at
+              FROM articles
+             WHERE sentiment_score IS NOT NULL AND (? IS NULL OR published_at >= ?)
+             ORDER BY comment_count IS NULL DESC, comment_count DESC, id
+             LIMIT ?
+        """, since, since, limit)
+
+    def author_sums(self, since):
+        return self._query("""
+            SELECT author,
+                   COUNT(*) AS total_articles,
+                   SUM(tesla) AS tesla_articles,
+                   COALESCE(SUM(CASE WHEN tesla THEN sentiment_score END), 0) AS tesla_sentiment_sum,
+                   COALESCE(SUM(CASE WHEN tesla THEN COALESCE(comment_count, 0) END), 0) AS tesla_comments_sum,
+                   COALESCE(SUM(CASE WHEN tesla THEN NULL ELSE sentiment_score END), 0) AS non_tesla_sentiment_sum,
+                   COALESCE(SUM(CASE WHEN tesla THEN NULL ELSE COALESCE(comment_count, 0) END), 0) AS non_tesla_comments_sum
+              FROM (
+                SELECT *, (COALESCE(company_mask, 0) & 1) <> 0 AS tesla
+                  FROM articles
+                 WHERE sentiment_score IS NOT NULL AND author IS NOT NULL
+                   AND (? IS NULL OR published_at >= ?)
+              )
+             GROUP BY author
+        """, since, since)
+
+    def company_sums(self, since):
+        return self._query("""
+            WITH RECURSIVE bits(company) AS (SELECT 0 UNION ALL SELECT company + 1 FROM bits WHERE company < 15)
+            SELECT bits.company AS company_bit,
+                   COUNT(*) AS article_count,
+                   SUM(COALESCE(a.comment_count, 0)) AS total_comments,
+                   SUM(a.sentiment_score) AS sentiment_sum,
+                   SUM(a.sentiment_score < -0.1) AS negative_articles,
+                   SUM(a.sentiment_score > 0.1) AS positive_articles
+              FROM articles a
+              JOIN bits ON (COALESCE(a.company_mask, 0) & (1 << bits.company)) <> 0
+             WHERE a.sentiment_score IS NOT NULL AND (? IS NULL OR a.published_at >= ?)
+             GROUP BY bits.company
+        """, since, since)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_report_backend():
+    """SQLite stand-in when REPORT_SQLITE_PATH is set, the Supabase functions when REPORT_RPC is on, else None"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if Config.REPORT_SQLITE_PATH:
+                    _backend = SQLiteReportBackend()
+                elif Config.REPORT_RPC:
+                    _backend = SupabaseReportBackend()
+                else:
+                    _backend = False
+    return _backend or None
+
+class ReportQueries:
+    """Report sections from the SQL functions; each returns None when they can't be used"""
+
+    def __init__(self, months=None, backend=None):
+        """
+        Parameters:
+        - months: Reporting window in months (None = all time)
+        - backend: SupabaseReportBackend or SQLiteReportBackend (default from Config)
+        """
+        self.months = months
+        self.backend = backend or get_report_backend()
+        self.since = None
+        if months is not None:
+            self.since = (datetime.now() - timedelta(days=30 * months)).isoformat()
+
+    def _fetch(self, query, *args):
+        global _functions_missing
+        if self.backend is None or (_functions_missing and isinstance(self.backend, SupabaseReportBackend)):
+            return None
+        try:
+            return getattr(self.backend, query)(self.since, *args)
+        except Exception as e:
+            from ..models import is_missing_from_schema
+            print(f"Report function {query} unavailable, computing from articles instead: {str(e)}")
+            print(traceback.format_exc())
+            # Only a missing function is permanent; anything else just falls back for this call
+            if is_missing_from_schema(e):
+                _functions_missing = True
+            return None
+
+    def statistics(self):
+        """Article and comment totals for the window"""
+        totals = self._fetch('totals')
+        if totals is None:
+            return None
+
+        most_commented_article = None
+        if totals['most_commented_id'] is not None:
+            most_commented_article = {
+                'id': totals['most_commented_id'],
+                'title': totals['most_commented_title'],
+                'comment_count': totals['max_comments'],
+                'published_at': totals['most_commented_published_at']
+            }
+        counted = totals['counted_articles']
+        return {
+            "total_articles": totals['total_articles'],
+            "total_comments": totals['total_comments'],
+            "avg_comments": round(totals['total_comments'] / counted) if counted else 0,
+            "max_comments": totals['max_comments'],
+            "most_commented_article": most_commented_article
+        }
+
+    def monthly_stats(self):
+        """Average comments and article count per calendar month, oldest first"""
+        rows = self._fetch('monthly')
+        if rows is None:
+            return None
+        return format_monthly_stats({str(row['month'])[:7]: row for row in rows}, self.months)
+
+    def top_articles(self, limit=20):
+        """Most commented scored articles with company flags and sentiment category"""
+        rows = self._fetch('top_articles', limit)
+        return None if rows is None else decorate_top_articles(rows)
+
+    def author_tesla_bias(self, min_articles=5):
+        """Per-author Tesla coverage share and sentiment, most Tesla articles first"""
+        rows = self._fetch('author_sums')
+        if rows is None:
+            return None
+        return format_author_tesla_bias({row['author']: row for row in rows}, min_articles)
+
+    def company_comparison(self):
+        """Engagement and sentiment per EV company mentioned in titles, most commented first"""
+        rows = self._fetch('company_sums')
+        return None if rows is None else format_company_comparison({row['company_bit']: row for row in rows})
+
+def precomputed_section(name, months, *args, rows=None):
+    """
+    One report section from the aggregate tables or else the SQL report functions; None
+    if neither can be used. `rows` are the window's article rows when already loaded.
+    """
+    for source in (ReportAggregates(months, rows=rows), ReportQueries(months)):
+        section = getattr(source, name, None)
+        if section is not None:
+            data = section(*args)
+            if data is not None:
+                return data
+    return None
+
+def report_section(name, months, *args):
+    """
+    Compute one report section from the cheapest source available
+
+    Tries the trigger-maintained aggregate tables, then the SQL report functions, and
+    finally computes the section from raw article rows.
+    """
+    data = precomputed_section(name, months, *args)
+    return data if data is not None else getattr(ReportEngine(months), name)(*args)
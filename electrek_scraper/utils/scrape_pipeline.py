@@ -0,0 +1,242 @@
+# electrek_scraper/utils/scrape_pipeline.py
+"""
+Concurrent fetch/parse/store pipeline for scrape jobs
+"""
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .deadline import DeadlineExceeded, encode_resume_token, decode_resume_token
+from ..config import Config
+from ..models import Article
+from .scraper_service import ElectrekScraper
+
+class ScrapePipeline:
+    """Fetches, parses and stores articles with bounded concurrency"""
+
+    def __init__(self, scraper=None, max_workers=None, write_batch_size=None):
+        """
+        Parameters:
+        - scraper: ElectrekScraper to use (its rate limiter is shared by all workers)
+        - max_workers: Number of articles processed in parallel
+        - write_batch_size: Number of parsed articles buffered per bulk insert
+        """
+        self.scraper = scraper or ElectrekScraper()
+        self.max_workers = max(1, max_workers or Config.SCRAPE_MAX_WORKERS)
+        self.write_batch_size = max(1, write_batch_size or Config.SCRAPE_WRITE_BATCH_SIZE)
+
+    def run(self, article_urls, known_urls=None, deadline=None, progress_callback=None):
+        """
+        Process every URL and return success/skipped/failed results with throughput stats
+        
+        Parameters:
+        - article_urls: Candidate article URLs
+        - known_urls: Optional local set of already stored URLs; when omitted the
+          candidates are checked against the database in bulk
+        - deadline: Optional Deadline. Close to it no new articles are started; work
+          already done is still written, and the untouched URLs plus any article the
+          deadline cut off mid-fetch are returned in "pending" (in listing order)
+        - progress_callback: Optional callable(done, total) called as articles complete
+        """
+        results = {
+            "total": len(article_urls),
+            "success": [],
+            "skipped": [],
+            "failed": [],
+            "pending": []
+        }
+
+        start_time = time.time()
+
+        # Resolve already stored URLs up front so only new articles are fetched
+        new_urls = self.filter_new_urls(article_urls, known_urls)
+        pending = set(new_urls)
+        for url in article_urls:
+            if url in pending:
+                pending.discard(url)  # Repeat listings of the same URL count as skipped
+            else:
+                results["skipped"].append(url)
+        print(f"Dedup: {len(new_urls)} new, {len(results['skipped'])} already stored")
+
+        print(f"Processing {len(new_urls)} articles with {self.max_workers} workers")
+
+        # Workers only fetch and parse; parsed rows are buffered and written in chunks
+        buffer = []
+        in_flight = set()
+        next_index = 0
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while next_index < len(new_urls) or in_flight:
+                # Submit in listing order, keeping just enough work queued to keep workers busy
+                while next_index < len(new_urls) and len(in_flight) < self.max_workers * 2:
+                    if deadline and deadline.expired(Config.JOB_DEADLINE_MARGIN):
+                        break
+                    in_flight.add(executor.submit(self._parse_url, new_urls[next_index], deadline))
+                    next_index += 1
+
+                if not in_flight:
+                    print(f"Deadline approaching: leaving {len(new_urls) - next_index} articles for a later run")
+                    results["pending"].extend(new_urls[next_index:])
+                    break
+
+                completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    done += 1
+                    status, detail = future.result()
+                    if status == "parsed":
+                        buffer.append(detail)
+                    else:
+                        results[status].append(detail)
+
+                    if done % 25 == 0 or done == len(new_urls):
+                        elapsed = time.time() - start_time
+                        print(f"Progress: {done}/{len(new_urls)} articles ({done / max(elapsed, 0.001):.2f} articles/sec)")
+
+                if len(buffer) >= self.write_batch_size:
+                    self._flush(buffer, results)
+                    buffer = []
+
+                if progress_callback:
+                    progress_callback(done, len(new_urls))
+
+        # Always commit what was parsed, even when stopping early
+        self._flush(buffer, results)
+
+        # Cut-off articles finish out of order; the resume token relies on listing order
+        listing_order = {url: index for index, url in enumerate(new_urls)}
+        results["pending"].sort(key=listing_order.get)
+
+        elapsed_time = time.time() - start_time
+        results["elapsed_seconds"] = round(elapsed_time, 2)
+        results["articles_per_second"] = round(done / max(elapsed_time, 0.001), 2)
+
+        return results
+
+    @staticmethod
+    def filter_new_urls(article_urls, known_urls=None):
+        """Drop duplicates and URLs that are already stored, preserving order"""
+        unique_urls = list(dict.fromkeys(article_urls))
+
+        if known_urls is None:
+            try:
+                known_urls = Article.existing_urls(unique_urls)
+            except Exception as e:
+                # Fall through and let the insert's unique constraint catch duplicates
+                print(f"Warning: Error checking which articles exist: {str(e)}")
+                known_urls = set()
+
+        return [url for url in unique_urls if url not in known_urls]
+
+    def _parse_url(self, url, deadline=None):
+        """Fetch and parse a single article; returns (status, detail)"""
+        try:
+            return "parsed", self.scraper.parse_article(url, deadline=deadline)
+        except DeadlineExceeded:
+            print(f"  - PENDING: Time budget ran out while fetching {url}")
+            return "pending", url
+        except Exception as e:
+            print(f"  - FAILED: Error processing article {url}: {str(e)}")
+            print(traceback.format_exc())
+            return "failed", {"url": url, "error": str(e)}
+
+    def _flush(self, buffer, results):
+        """Write buffered articles in one bulk upsert and record per-row outcomes"""
+        if not buffer:
+            return
+
+        try:
+            outcomes = Article.create_many(buffer, chunk_size=self.write_batch_size)
+        except Exception as e:
+            print(f"  - FAILED: Error storing {len(buffer)} articles: {str(e)}")
+            outcomes = [{"url": article["url"], "status": "failed", "error": str(e)} for article in buffer]
+
+        for outcome in outcomes:
+            if outcome["status"] == "created":
+                results["success"].append(outcome["url"])
+            elif outcome["status"] == "skipped":
+                results["skipped"].append(outcome["url"])
+            else:
+                results["failed"].append({"url": outcome["url"], "error": outcome["error"]})
+
+def run_scrape(article_limit=25, page_count=1, incremental=False, resume_token=None,
+               deadline=None, progress_callback=None):
+    """
+    Run a complete scrape job: collect listing URLs, then fetch and store new articles
+    
+    Returns the pipeline results plus "incremental" and "resume_token" (None unless the
+    deadline cut the job short). "total" is 0 when the listing turned up no articles.
+    """
+    scraper = ElectrekScraper()
+    
+    # Continue a job that previously ran out of time from where it stopped
+    start_page = 1
+    resume_state = decode_resume_token(resume_token) if resume_token else None
+    if resume_state:
+        try:
+            resume_page = int(resume_state['start_page'])
+            resume_pages = int(resume_state['pages'])
+            resume_limit = int(resume_state['limit'])
+        except (KeyError, TypeError, ValueError):
+            resume_page = resume_pages = resume_limit = 0
+        
+        if min(resume_page, resume_pages, resume_limit) < 1:
+            print(f"Ignoring invalid resume token: {resume_token}")
+        else:
+            start_page, page_count, article_limit = resume_page, resume_pages, resume_limit
+            incremental = False
+            print(f"Resuming scrape from page {start_page}")
+    elif resume_token:
+        print(f"Ignoring invalid resume token: {resume_token}")
+    
+    # Get recent article URLs from multiple pages
+    print(f"Fetching up to {article_limit} articles across {page_count} pages...")
+    if incremental:
+        high_water_mark = Article.get_high_water_mark()
+        article_urls = scraper.get_article_urls(
+            limit=article_limit,
+            pages=page_count,
+            known_url_filter=Article.existing_urls,
+            high_water_url=high_water_mark['url'] if high_water_mark else None,
+            deadline=deadline
+        )
+    else:
+        article_urls = scraper.get_article_urls(
+            limit=article_limit,
+            pages=page_count,
+            start_page=start_page,
+            deadline=deadline
+        )
+    
+    print(f"Found {len(article_urls)} article URLs")
+    
+    # Fetch, parse and store the articles concurrently
+    pipeline = ScrapePipeline(scraper)
+    results = pipeline.run(article_urls, deadline=deadline, progress_callback=progress_callback)
+    results["incremental"] = incremental
+    results["resume_token"] = make_resume_token(scraper, results, start_page, page_count, article_limit)
+    
+    print(f"Throughput: {results['articles_per_second']} articles/sec over {results['elapsed_seconds']} seconds")
+    print(f"Connections: {scraper.proxy_manager.get_connection_stats()}")
+    return results
+
+def make_resume_token(scraper, results, start_page, pages, limit):
+    """
+    Build a resume token for a scrape cut short by its deadline, or None if it finished
+    
+    Articles are started in listing order, so everything listed before the first pending
+    URL is done and the job can resume from that URL's listing page.
+    """
+    if results["pending"]:
+        resume_page = scraper.url_pages.get(results["pending"][0], scraper.next_page)
+    elif not scraper.listing_complete:
+        resume_page = scraper.next_page
+    else:
+        return None
+
+    end_page = start_page + pages - 1
+    processed = results["total"] - len(results["pending"])
+    return encode_resume_token({
+        "start_page": resume_page,
+        "pages": max(end_page - resume_page + 1, 1),
+        "limit": max(limit - processed, 1)
+    })
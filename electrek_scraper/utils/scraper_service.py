@@ -5,10 +5,16 @@ import re
 import os
 import time
 import random
+from .deadline import DeadlineExceeded
 from .proxy_manager import ProxyManager
+from .rate_limiter import HostRateLimiter
+from ..config import Config
 
 class ElectrekScraper:
-    def __init__(self, use_proxy=None):
+    # Share of a job's time budget the listing crawl may use before handing over to article fetches
+    LISTING_BUDGET_SHARE = 0.5
+    
+    def __init__(self, use_proxy=None, requests_per_second=None):
         self.base_url = "https://electrek.co"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -29,8 +35,25 @@ class ElectrekScraper:
                 os.environ.pop('USE_PROXY', None)
         else:
             self.proxy_manager = ProxyManager()
+        
+        # Shared per-host limiter so concurrent article fetches stay polite
+        if requests_per_second is None:
+            requests_per_second = Config.SCRAPE_REQUESTS_PER_SECOND
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+    
+    def _listing_time_left(self, deadline):
+        """Seconds the listing crawl may still use of the deadline's budget"""
+        return deadline.remaining() - deadline.budget * (1 - self.LISTING_BUDGET_SHARE)
     
-    def get_article_urls(self, limit=25, pages=1, page_delay=2.0):
+    def _sleep_within(self, delay, deadline=None):
+        """Sleep `delay` seconds unless that would run past the listing budget; False if it would"""
+        if deadline and self._listing_time_left(deadline) <= delay:
+            return False
+        time.sleep(delay)
+        return True
+    
+    def get_article_urls(self, limit=25, pages=1, page_delay=2.0, known_url_filter=None, high_water_url=None,
+                         start_page=1, deadline=None):
         """
         Get article URLs from multiple pages
         
@@ -38,39 +61,70 @@ class ElectrekScraper:
         - limit: Maximum number of articles to collect (up to 2000)
         - pages: Maximum number of pages to visit (up to 80)
         - page_delay: Base delay between page requests in seconds
+        - known_url_filter: Optional callable returning the subset of a page's URLs that are
+          already stored. Enables incremental mode: known URLs are dropped and pagination
+          stops at the first page holding only known articles
+        - high_water_url: Optional newest stored article URL; pagination stops once it is seen
+        - start_page: Listing page to start from (used when resuming a partial job)
+        - deadline: Optional Deadline; listing stops once it has used its share of the budget
+        
+        After the call, `url_pages` maps each URL to its listing page, `next_page` is the first
+        page not fetched and `listing_complete` tells whether the crawl was cut short by the deadline.
         """
         all_article_urls = []
+        self.url_pages = {}
+        self.listing_complete = True
+        incremental = known_url_filter is not None or high_water_url is not None
         
-        print(f"Starting article collection: targeting {limit} articles across up to {pages} pages")
+        print(f"Starting article collection: targeting {limit} articles across up to {pages} pages"
+              f"{' (incremental)' if incremental else ''}")
         start_time = time.time()
         
         # Scrape multiple pages if needed
-        for page_num in range(1, pages + 1):
+        end_page = start_page + pages - 1
+        self.next_page = start_page
+        for page_num in range(start_page, end_page + 1):
+            # Leave the rest of the time budget for fetching the articles themselves
+            if deadline and self._listing_time_left(deadline) < 0:
+                print(f"Listing time budget used. Stopping before page {page_num}.")
+                self.listing_complete = False
+                break
+            
             if page_num == 1:
                 page_url = self.base_url
             else:
                 page_url = f"{self.base_url}/page/{page_num}/"
                 
-            print(f"Fetching page {page_num}/{pages}: {page_url}")
+            print(f"Fetching page {page_num}/{end_page}: {page_url}")
             
             # Add progressive delay for higher page numbers to avoid rate limiting
-            if page_num > 1:
+            if page_num > start_page:
                 # Scale delay slightly with page number for very large scrapes
                 actual_delay = page_delay * (1 + (page_num / 100))
                 # Add randomness to appear more human-like
                 delay = random.uniform(actual_delay, actual_delay * 1.5)
                 print(f"Waiting {delay:.2f} seconds before fetching page {page_num}...")
-                time.sleep(delay)
+                if not self._sleep_within(delay, deadline):
+                    print(f"Listing time budget used. Stopping before page {page_num}.")
+                    self.listing_complete = False
+                    break
                 
-            response = self.proxy_manager.make_request(
-                page_url,
-                headers=self.headers
-            )
+            try:
+                response = self.proxy_manager.make_request(
+                    page_url,
+                    deadline=deadline,
+                    headers=self.headers
+                )
+            except DeadlineExceeded:
+                print(f"Time budget ran out while fetching page {page_num}. Stopping page fetching.")
+                self.listing_complete = False
+                break
+            self.next_page = page_num + 1
             
             if not response:
                 print(f"Failed to retrieve page {page_num}")
                 # Add longer delay after failure to reduce pressure
-                time.sleep(page_delay * 2)
+                self._sleep_within(page_delay * 2, deadline)
                 continue
                     
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -82,19 +136,46 @@ class ElectrekScraper:
             previous_count = len(all_article_urls)
             
             # Process links
+            page_urls = []
             for link in article_links:
                 if 'href' in link.attrs:
                     url = link['href']
                     # Make sure we have absolute URLs
                     if not url.startswith('http'):
                         url = f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
-                    all_article_urls.append(url)
+                    page_urls.append(url)
+            
+            # In incremental mode keep only unseen articles and note when we've caught up
+            reached_known = False
+            if incremental and page_urls:
+                known_urls = set()
+                if known_url_filter is not None:
+                    try:
+                        known_urls = set(known_url_filter(page_urls))
+                    except Exception as e:
+                        print(f"Warning: Error checking known articles on page {page_num}: {str(e)}")
+                
+                if high_water_url in page_urls:
+                    # Listing is newest first, so everything from the mark onward is already stored
+                    known_urls.update(page_urls[page_urls.index(high_water_url):])
+                
+                page_urls = [url for url in page_urls if url not in known_urls]
+                reached_known = len(known_urls) > 0 and (not page_urls or high_water_url in known_urls)
+            
+            all_article_urls.extend(page_urls)
+            for url in page_urls:
+                self.url_pages.setdefault(url, page_num)
                     
             # Report progress
             new_count = len(all_article_urls) - previous_count
             total_count = len(all_article_urls)
             print(f"Found {new_count} new article links on page {page_num} (Total: {total_count}/{limit})")
             
+            # Stop once we've caught up with what's already stored
+            if reached_known:
+                print(f"Page {page_num} reached already known articles. Stopping page fetching.")
+                break
+            
             # Stop if we've reached our limit
             if len(all_article_urls) >= limit:
                 print(f"Reached article limit ({limit}). Stopping page fetching.")
@@ -103,7 +184,7 @@ class ElectrekScraper:
         # Calculate and report stats
         elapsed_time = time.time() - start_time
         collected_count = min(len(all_article_urls), limit)
-        pages_visited = page_num
+        pages_visited = self.next_page - start_page
         
         print(f"Article collection complete:")
         print(f"- Collected {collected_count} article URLs")
@@ -113,20 +194,28 @@ class ElectrekScraper:
         # Return only up to the requested limit
         return all_article_urls[:limit]
     
-    def parse_article(self, url):
-        """Parse an article page - simplified to only get metadata with better error handling"""
+    def parse_article(self, url, deadline=None):
+        """
+        Parse an article page - simplified to only get metadata with better error handling
+        
+        Raises DeadlineExceeded when the job's time budget ran out before the page was
+        fetched, so the URL is left for a later run instead of stored as an error row.
+        """
         print(f"Parsing article metadata: {url}")
         
-        # Add a short random delay
-        time.sleep(random.uniform(0.5, 1.5))
+        # Wait for this host's next request slot (replaces the fixed random sleep)
+        self.rate_limiter.wait(url)
         
         try:
             response = self.proxy_manager.make_request(
                 url, 
+                deadline=deadline,
                 headers=self.headers
             )
             
             if not response:
+                if deadline and deadline.expired():
+                    raise DeadlineExceeded(f"Time budget ran out before {url} was fetched")
                 print(f"Failed to retrieve article at {url}")
                 raise Exception(f"Could not retrieve article at {url}")
                     
@@ -176,6 +265,8 @@ class ElectrekScraper:
             print(f"Extracted metadata: {result}")
             return result
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error parsing article: {e}")
             # Return basic data even on error
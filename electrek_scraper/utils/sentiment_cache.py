@@ -0,0 +1,126 @@
+# electrek_scraper/utils/sentiment_cache.py
+"""
+Persistent cache of sentiment scores keyed by headline text and prompt version
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from ..config import Config
+
+def normalize_headline(text):
+    """Normalize a headline so trivially different copies share a cache entry"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+class SentimentCache:
+    """SQLite-backed headline -> score cache shared by threads and processes"""
+
+    def __init__(self, version, db_path=None):
+        """
+        Parameters:
+        - version: Prompt/model fingerprint; changing it invalidates every cached score
+        - db_path: SQLite file to store scores in
+        """
+        self.version = version
+        self.db_path = db_path or Config.SENTIMENT_CACHE_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._create_table()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _create_table(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sentiment_cache (
+                    key TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def key(self, headline):
+        """Content address of a headline under the current prompt version"""
+        payload = f"{self.version}\0{normalize_headline(headline)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, headlines):
+        """Look up several headlines at once; returns {headline: score} for the hits"""
+        keys = {}
+        for headline in headlines:
+            keys.setdefault(self.key(headline), []).append(headline)
+
+        found = {}
+        key_list = list(keys)
+        with self._connect() as connection:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, score FROM sentiment_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, score in rows:
+                    for headline in keys[key]:
+                        found[headline] = score
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(headlines) - len(found)
+        return found
+
+    def get(self, headline):
+        """Cached score for a headline, or None"""
+        return self.get_many([headline]).get(headline)
+
+    def put_many(self, scores):
+        """Store {headline: score} pairs"""
+        if not scores:
+            return
+        now = time.time()
+        rows = [(self.key(headline), float(score), now) for headline, score in scores.items()]
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (key, score, created_at) VALUES (?, ?, ?)", rows
+            )
+        with self._lock:
+            self.writes += len(rows)
+
+    def put(self, headline, score):
+        """Store one headline's score"""
+        self.put_many({headline: score})
+
+    def get_stats(self):
+        """Hit/miss counters for this process plus the number of stored scores"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+        try:
+            with self._connect() as connection:
+                stats['entries'] = connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        except sqlite3.Error as e:
+            stats['entries'] = None
+            print(f"Error counting sentiment cache entries: {str(e)}")
+        return stats
@@ -0,0 +1,223 @@
+# electrek_scraper/utils/sentiment_runner.py
+"""
+Concurrent runner that drains the whole backlog of articles without sentiment scores
+"""
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ..config import Config
+from ..models import Article
+from .job_queue import JobQueue
+from .sentiment_service import SentimentService
+
+CHECKPOINT_NAME = 'sentiment_backlog'
+
+class SentimentRunner:
+    """Scores unscored articles in parallel chunks, checkpointing so an interrupted run can resume"""
+
+    def __init__(self, sentiment_service=None, max_workers=None, batch_size=None, page_size=200, checkpoints=None):
+        """
+        Parameters:
+        - sentiment_service: SentimentService to use (its rate limiter is shared by all workers)
+        - max_workers: Number of scoring requests in flight at once
+        - batch_size: Headlines scored per request
+        - page_size: Unscored articles fetched per database query
+        - checkpoints: Optional JobQueue used to store progress between runs
+        """
+        self.sentiment_service = sentiment_service or SentimentService()
+        self.max_workers = max(1, max_workers or Config.SENTIMENT_MAX_WORKERS)
+        self.batch_size = max(1, batch_size or Config.SENTIMENT_BATCH_SIZE)
+        self.page_size = max(self.batch_size, page_size)
+        self.checkpoints = checkpoints
+
+    def run(self, deadline=None, progress_callback=None, resume=True):
+        """
+        Score every unscored article and return counts with throughput stats
+
+        Parameters:
+        - deadline: Optional Deadline. Close to it no new chunks are started; the
+          checkpoint records how far the run got
+        - progress_callback: Optional callable(done, total) called as chunks complete
+        - resume: Continue after the stored checkpoint instead of from the start
+
+        Raises RuntimeError without an OpenAI API key: nothing could be scored.
+        """
+        if not self.sentiment_service.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set; not starting the sentiment backlog run")
+
+        checkpoint = self._load_checkpoint() if resume else None
+        after_id = checkpoint['after_id'] if checkpoint else 0
+        if after_id:
+            print(f"Resuming sentiment backlog after article {after_id}")
+
+        try:
+            total = Article.count_unscored(after_id)
+        except Exception as e:
+            print(f"Warning: Could not count unscored articles: {str(e)}")
+            total = None
+        print(f"Scoring {total if total is not None else 'all'} unscored articles with {self.max_workers} workers")
+
+        results = {
+            "total": total,
+            "scored": 0,
+            "failed": 0,
+            "complete": False
+        }
+        start_time = time.time()
+
+        # Chunks finish out of order; the checkpoint only moves past chunks with nothing earlier still running
+        chunks = self._iter_chunks(after_id)
+        chunk_last_ids = {}
+        finished = set()
+        watermark_seq = 0
+        in_flight = {}
+        next_seq = 0
+        exhausted = False
+        stopped = False
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                while not exhausted and len(in_flight) < self.max_workers * 2:
+                    if deadline and deadline.expired(Config.JOB_DEADLINE_MARGIN):
+                        stopped = True
+                        break
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    chunk_last_ids[next_seq] = chunk[-1]["id"]
+                    in_flight[executor.submit(self._score_chunk, chunk, deadline)] = next_seq
+                    next_seq += 1
+
+                if not in_flight:
+                    break
+
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    seq = in_flight.pop(future)
+                    scored, failed, attempted_all = future.result()
+                    results["scored"] += scored
+                    results["failed"] += failed
+                    done += scored + failed
+                    if attempted_all:
+                        finished.add(seq)
+                    else:
+                        stopped = True
+
+                # Advance and persist the checkpoint past every contiguous finished chunk
+                moved = False
+                while watermark_seq in finished:
+                    after_id = chunk_last_ids.pop(watermark_seq)
+                    finished.discard(watermark_seq)
+                    watermark_seq += 1
+                    moved = True
+                if moved:
+                    self._save_checkpoint(after_id, results)
+
+                if progress_callback:
+                    progress_callback(done, total if total is not None else done)
+
+                if stopped:
+                    exhausted = True
+
+        elapsed_time = time.time() - start_time
+        results["elapsed_seconds"] = round(elapsed_time, 2)
+        results["articles_per_second"] = round(done / max(elapsed_time, 0.001), 2)
+        results["rate_limiter"] = self.sentiment_service.rate_limiter.get_stats()
+        results["cache"] = self.sentiment_service.cache.get_stats() if self.sentiment_service.cache else None
+
+        if stopped:
+            results["remaining"] = max(total - done, 0) if total is not None else None
+            print(f"Time budget reached, checkpoint saved after article {after_id}")
+        else:
+            # Backlog drained: failed articles are still unscored, so starting from the
+            # beginning next time retries them
+            results["complete"] = True
+            results["remaining"] = 0
+            self._clear_checkpoint()
+
+        print(f"Sentiment backlog: {results['scored']} scored, {results['failed']} failed "
+              f"({results['articles_per_second']} articles/sec over {results['elapsed_seconds']} seconds)")
+        print(f"OpenAI rate limiter: {results['rate_limiter']}")
+        print(f"Sentiment cache: {results['cache']}")
+        return results
+
+    def _iter_chunks(self, after_id):
+        """Yield batches of unscored articles in ID order, paging through the table by key"""
+        cursor = after_id
+        while True:
+            page = Article.get_unscored(after_id=cursor, limit=self.page_size)
+            if not page:
+                return
+            cursor = page[-1]["id"]
+            for start in range(0, len(page), self.batch_size):
+                yield page[start:start + self.batch_size]
+
+    def _score_chunk(self, chunk, deadline=None):
+        """Score and store one chunk; returns (scored, failed, attempted_all)"""
+        try:
+            scores = self.sentiment_service.calculate_sentiments(chunk, batch_size=self.batch_size, deadline=deadline)
+        except Exception as e:
+            print(f"  - FAILED: Error scoring articles {chunk[0]['id']}-{chunk[-1]['id']}: {str(e)}")
+            print(traceback.format_exc())
+            return 0, len(chunk), True
+
+        # Articles missing from `scores` failed and stay NULL, unless the deadline cut the
+        # chunk short; then it is retried from the checkpoint next run
+        titled = sum(1 for article in chunk if article.get("title"))
+        attempted_all = len(scores) >= titled or not (deadline and deadline.expired())
+
+        # One bulk write per chunk instead of one request per article
+        try:
+            scored = Article.update_sentiment_scores(scores)['updated'] if scores else 0
+        except Exception as e:
+            print(f"  - FAILED: Error storing {len(scores)} sentiment scores: {str(e)}")
+            scored = 0
+
+        failed = (len(chunk) if attempted_all else len(scores)) - scored
+        return scored, failed, attempted_all
+
+    def _load_checkpoint(self):
+        if not self.checkpoints:
+            return None
+        try:
+            return self.checkpoints.load_checkpoint(CHECKPOINT_NAME)
+        except Exception as e:
+            print(f"Warning: Could not load sentiment checkpoint: {str(e)}")
+            return None
+
+    def _save_checkpoint(self, after_id, results):
+        if not self.checkpoints:
+            return
+        try:
+            self.checkpoints.save_checkpoint(CHECKPOINT_NAME, {
+                "after_id": after_id,
+                "scored": results["scored"],
+                "failed": results["failed"]
+            })
+        except Exception as e:
+            print(f"Warning: Could not save sentiment checkpoint: {str(e)}")
+
+    def _clear_checkpoint(self):
+        if not self.checkpoints:
+            return
+        try:
+            self.checkpoints.clear_checkpoint(CHECKPOINT_NAME)
+        except Exception as e:
+            print(f"Warning: Could not clear sentiment checkpoint: {str(e)}")
+
+def analyze_backlog(deadline=None, progress_callback=None, resume=True, max_workers=None, batch_size=None):
+    """Drain the unscored-article backlog, resuming from the last checkpoint when there is one"""
+    try:
+        checkpoints = JobQueue()
+    except Exception as e:
+        # e.g. a read-only filesystem on serverless hosts; run without resume support
+        print(f"Warning: Checkpoints unavailable, running without resume: {str(e)}")
+        checkpoints = None
+
+    runner = SentimentRunner(max_workers=max_workers, batch_size=batch_size, checkpoints=checkpoints)
+    return runner.run(deadline=deadline, progress_callback=progress_callback, resume=resume)
+
+if __name__ == "__main__":
+    analyze_backlog()
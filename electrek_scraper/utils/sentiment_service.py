@@ -1,50 +1,33 @@
 # electrek_scraper/utils/sentiment_service.py
 import os
-import requests
+import re
 import json
 import random
+import hashlib
+import threading
 from datetime import datetime
+from requests.exceptions import RequestException
+from .proxy_manager import ProxyManager
+from .rate_limiter import AdaptiveTokenBucket, retry_after_seconds
+from .deadline import DeadlineExceeded
+from .sentiment_cache import SentimentCache
+from ..config import Config
 
-class SentimentService:
-    def __init__(self):
-        """Initialize the sentiment service using GPT-4o"""
-        self.openai_api_key = os.environ.get('OPENAI_API_KEY')
-        
-        # Ensure we have an API key
-        if not self.openai_api_key:
-            print("WARNING: No OpenAI API key found. Sentiment analysis will not work.")
-    
-    def calculate_sentiment(self, text):
-        """Calculate sentiment score between -1 and 1 using GPT-4o"""
-        if not text or not self.openai_api_key:
-            return 0.0
-            
-        try:
-            # Prepare the API request
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.openai_api_key}"
-            }
-            
-            # Example headlines with scores to provide context for the model
-            examples = [
-                {"headline": "Tesla breaks another delivery record", "score": 0.8},
-                {"headline": "New promising battery startup emerges", "score": 0.6},
-                {"headline": "Ford launches new electric vehicle", "score": 0.5},
-                {"headline": "EV sales continue to grow", "score": 0.4},
-                {"headline": "Legacy automaker announces tentative EV plans", "score": 0.0},
-                {"headline": "Oil company reveals 'commitment' to green energy", "score": -0.3},
-                {"headline": "Another EV startup promises 'revolutionary' technology", "score": -0.5},
-                {"headline": "Traditional automaker continues to delay EV plans", "score": -0.7},
-                {"headline": "This company is killing the EV revolution", "score": -0.9}
-            ]
-            
-            # Randomly select 5 examples to include in each request for variety
-            selected_examples = random.sample(examples, 5)
-            examples_text = "\n".join([f"Headline: {e['headline']}\nScore: {e['score']}" for e in selected_examples])
-            
-            # Create a detailed prompt that encourages more variance
-            system_message = """You are analyzing headlines from electrek.co, a website covering electric vehicles and green energy.
+# Example headlines with scores to provide context for the model
+EXAMPLES = [
+    {"headline": "Tesla breaks another delivery record", "score": 0.8},
+    {"headline": "New promising battery startup emerges", "score": 0.6},
+    {"headline": "Ford launches new electric vehicle", "score": 0.5},
+    {"headline": "EV sales continue to grow", "score": 0.4},
+    {"headline": "Legacy automaker announces tentative EV plans", "score": 0.0},
+    {"headline": "Oil company reveals 'commitment' to green energy", "score": -0.3},
+    {"headline": "Another EV startup promises 'revolutionary' technology", "score": -0.5},
+    {"headline": "Traditional automaker continues to delay EV plans", "score": -0.7},
+    {"headline": "This company is killing the EV revolution", "score": -0.9}
+]
+
+# Create a detailed prompt that encourages more variance
+SCORING_GUIDELINES = """You are analyzing headlines from electrek.co, a website covering electric vehicles and green energy.
 
 Your task is to rate the true sentiment of headlines on a scale from -1.0 (extremely negative) to 1.0 (extremely positive). 
 
@@ -57,68 +40,300 @@ IMPORTANT GUIDELINES:
 6. Neutral headlines about factual events should be near zero
 
 DO NOT play it safe by rating everything between -0.3 and 0.3.
-DO provide varied scores that reflect the true sentiment intensity.
+DO provide varied scores that reflect the true sentiment intensity."""
+
+SYSTEM_MESSAGE = SCORING_GUIDELINES + """
 
 ONLY respond with a single decimal number between -1.0 and 1.0.
 Do not include any explanation or text."""
 
+BATCH_SYSTEM_MESSAGE = SCORING_GUIDELINES + """
+
+Score every headline independently. Respond ONLY with a JSON object of the form
+{"scores": [{"id": <headline id>, "score": <number between -1.0 and 1.0>}, ...]}
+with exactly one entry per headline and no other text."""
+
+# One limiter per process so every worker thread shares the same OpenAI budget
+_openai_rate_limiter = AdaptiveTokenBucket(
+    rate=Config.SENTIMENT_REQUESTS_PER_SECOND,
+    max_rate=Config.SENTIMENT_REQUESTS_PER_SECOND * 2
+)
+
+def get_openai_rate_limiter():
+    """Get the process-wide OpenAI rate limiter"""
+    return _openai_rate_limiter
+
+_sentiment_cache = None
+_sentiment_cache_lock = threading.Lock()
+
+def get_sentiment_cache():
+    """Get the process-wide sentiment cache, or None if it can't be opened"""
+    global _sentiment_cache
+    with _sentiment_cache_lock:
+        if _sentiment_cache is None:
+            try:
+                _sentiment_cache = SentimentCache(SentimentService.prompt_version())
+            except Exception as e:
+                # e.g. a read-only filesystem on serverless hosts; score without caching
+                print(f"Warning: Sentiment cache unavailable: {str(e)}")
+                _sentiment_cache = False
+        return _sentiment_cache or None
+
+class SentimentService:
+    OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+    MODEL = "gpt-4o"
+    MAX_RATE_LIMIT_RETRIES = 5
+    
+    def __init__(self, rate_limiter=None, cache=None):
+        """Initialize the sentiment service using GPT-4o"""
+        self.openai_api_key = os.environ.get('OPENAI_API_KEY')
+        
+        # OpenAI calls go direct, but over the shared keep-alive session
+        self.proxy_manager = ProxyManager()
+        self.rate_limiter = rate_limiter or get_openai_rate_limiter()
+        
+        # Headlines that were already scored with the same prompt skip the API
+        self.cache = cache or get_sentiment_cache()
+        
+        # Ensure we have an API key
+        if not self.openai_api_key:
+            print("WARNING: No OpenAI API key found. Sentiment analysis will not work.")
+    
+    @classmethod
+    def prompt_version(cls):
+        """Fingerprint of the model and prompts; cached scores are only reused while it is unchanged"""
+        prompt = json.dumps([cls.MODEL, SYSTEM_MESSAGE, BATCH_SYSTEM_MESSAGE, EXAMPLES], sort_keys=True)
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+    
+    def _cached_scores(self, headlines):
+        """Cached scores for the given headlines; cache errors count as misses"""
+        if not self.cache:
+            return {}
+        try:
+            return self.cache.get_many(headlines)
+        except Exception as e:
+            print(f"Error reading sentiment cache: {str(e)}")
+            return {}
+    
+    def _cache_scores(self, scores):
+        """Write {headline: score} back to the cache"""
+        if not self.cache or not scores:
+            return
+        try:
+            self.cache.put_many(scores)
+        except Exception as e:
+            print(f"Error writing sentiment cache: {str(e)}")
+    
+    def _chat(self, system_message, user_message, max_tokens, deadline=None, response_format=None):
+        """Send one chat completion request; returns the reply text or None on error"""
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.openai_api_key}"
+        }
+        
+        data = {
+            "model": self.MODEL,
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_message}
+            ],
+            "temperature": 0.7,  # Increased temperature for more variability
+            "max_tokens": max_tokens
+        }
+        if response_format:
+            data["response_format"] = response_format
+        
+        # Wait for a token before every attempt; 429s slow down every thread sharing the limiter
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            self.rate_limiter.acquire(deadline)
+            try:
+                response = self.proxy_manager.direct_request(
+                    self.OPENAI_CHAT_URL,
+                    method="POST",
+                    deadline=deadline,
+                    headers=headers,
+                    json=data
+                )
+            except RequestException as e:
+                # A timeout clamped to the budget means the job ran out of time, not that the
+                # request failed; callers must leave the article unscored rather than guess
+                if deadline and deadline.expired():
+                    raise DeadlineExceeded(f"Time budget ran out during a sentiment request: {str(e)}") from e
+                raise
+            if response.status_code != 429 or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                break
+            self.rate_limiter.on_rate_limited(retry_after_seconds(response))
+        
+        if response.status_code == 200:
+            self.rate_limiter.on_success()
+            result = response.json()
+            return result["choices"][0]["message"]["content"].strip()
+        
+        error_msg = f"Error in GPT sentiment analysis: {response.status_code}"
+        if response.text:
+            try:
+                error_json = response.json()
+                if 'error' in error_json:
+                    error_msg += f" - {error_json['error']['message']}"
+            except:
+                error_msg += f" - {response.text[:100]}..."
+                
+        print(error_msg)
+        return None
+    
+    def calculate_sentiment(self, text, deadline=None):
+        """
+        Calculate sentiment score between -1 and 1 using GPT-4o
+        
+        Returns None when the headline couldn't be scored (no API key, a failed request or
+        an unparseable reply), and raises DeadlineExceeded if the time budget runs out
+        before the model answers; either way the article's sentiment_score stays NULL and
+        is picked up by the next run.
+        """
+        if not text or not self.openai_api_key:
+            return None
+        
+        cached = self._cached_scores([text])
+        if text in cached:
+            return cached[text]
+            
+        try:
+            # Randomly select 5 examples to include in each request for variety
+            selected_examples = random.sample(EXAMPLES, 5)
+            examples_text = "\n".join([f"Headline: {e['headline']}\nScore: {e['score']}" for e in selected_examples])
+            
             # Use the few-shot learning with examples
             user_message = f"Here are some examples of correctly scored headlines:\n\n{examples_text}\n\nNow score this headline:\n\nHeadline: {text}\n\nScore (ONLY a number between -1.0 and 1.0):"
             
-            # Prepare the API call
-            data = {
-                "model": "gpt-4o",  # Use the latest GPT-4o model
-                "messages": [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.7,  # Increased temperature for more variability
-                "max_tokens": 10     # We only need a number
-            }
+            # We only need a number
+            content = self._chat(SYSTEM_MESSAGE, user_message, max_tokens=10, deadline=deadline)
+            if content is None:
+                return None
             
-            # Make the API call
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data
-            )
-            
-            # Process the response
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"].strip()
-                
-                # Extract the numeric score
-                try:
-                    # Find the first numeric value in the response
-                    import re
-                    number_matches = re.findall(r'-?\d+\.?\d*', content)
-                    if number_matches:
-                        score = float(number_matches[0])
-                        # Ensure it's in the -1 to 1 range
-                        return max(min(score, 1.0), -1.0)
-                    else:
-                        print(f"Could not extract a numeric score from: '{content}'")
-                        return 0.0
-                except ValueError:
-                    print(f"Could not parse GPT response as a float: '{content}'")
-                    return 0.0
+            # Extract the numeric score
+            try:
+                # Find the first numeric value in the response
+                number_matches = re.findall(r'-?\d+\.?\d*', content)
+                if number_matches:
+                    score = float(number_matches[0])
+                    # Ensure it's in the -1 to 1 range
+                    score = max(min(score, 1.0), -1.0)
+                    self._cache_scores({text: score})
+                    return score
+                else:
+                    print(f"Could not extract a numeric score from: '{content}'")
+                    return None
+            except ValueError:
+                print(f"Could not parse GPT response as a float: '{content}'")
+                return None
+        
+        except DeadlineExceeded:
+            # Leave the article unscored rather than storing a neutral placeholder
+            raise
+        except Exception as e:
+            print(f"Exception in GPT sentiment analysis: {str(e)}")
+            return None
+    
+    def calculate_sentiments(self, articles, batch_size=20, deadline=None):
+        """
+        Score many headlines with one request per batch
+        
+        Parameters:
+        - articles: List of dicts with 'id' and 'title'
+        - batch_size: Headlines sent per request
+        
+        Returns {article_id: score}. Cached headlines are answered without a request;
+        headlines missing from or unparseable in a batch reply that did parse are scored
+        individually with calculate_sentiment. Articles that couldn't be scored (no API
+        key, a failed batch request, a failed individual request, or the deadline running
+        out) are left out, so their sentiment_score stays NULL and a later run retries them.
+        """
+        scores = {}
+        articles = [article for article in articles if article.get('title')]
+        if not articles:
+            return scores
+        if not self.openai_api_key:
+            print(f"No OpenAI API key, leaving {len(articles)} articles unscored")
+            return scores
+        
+        # Only headlines the cache hasn't seen are sent to the model
+        cached = self._cached_scores([article['title'] for article in articles])
+        misses = []
+        for article in articles:
+            if article['title'] in cached:
+                scores[article['id']] = cached[article['title']]
             else:
-                error_msg = f"Error in GPT sentiment analysis: {response.status_code}"
-                if response.text:
-                    try:
-                        error_json = response.json()
-                        if 'error' in error_json:
-                            error_msg += f" - {error_json['error']['message']}"
-                    except:
-                        error_msg += f" - {response.text[:100]}..."
-                        
-                print(error_msg)
-                return 0.0
+                misses.append(article)
+        if cached:
+            print(f"Sentiment cache: {len(articles) - len(misses)}/{len(articles)} headlines already scored")
+        
+        examples_text = "\n".join([f"Headline: {e['headline']}\nScore: {e['score']}" for e in EXAMPLES])
+        
+        try:
+            for start in range(0, len(misses), batch_size):
+                batch = misses[start:start + batch_size]
+                batch_scores = self._score_batch(batch, examples_text, deadline)
+                if batch_scores is None:
+                    # The request itself failed (e.g. still rate limited or out of quota); one
+                    # request per headline would only add load, so leave the batch for later
+                    print(f"Batch request failed, leaving {len(batch)} articles unscored")
+                    continue
+                self._cache_scores({article['title']: batch_scores[article['id']]
+                                    for article in batch if article['id'] in batch_scores})
                 
+                # Fall back to one request per headline for anything the batch reply missed
+                for article in batch:
+                    if article['id'] in batch_scores:
+                        scores[article['id']] = batch_scores[article['id']]
+                    else:
+                        print(f"No batch score for article {article['id']}, scoring individually")
+                        score = self.calculate_sentiment(article['title'], deadline=deadline)
+                        if score is not None:
+                            scores[article['id']] = score
+        except DeadlineExceeded:
+            print(f"Time budget reached, returning {len(scores)}/{len(articles)} scores")
+        
+        return scores
+    
+    def _score_batch(self, batch, examples_text, deadline=None):
+        """Score one batch of headlines; returns {article_id: score} for the entries that parsed, or None if the request failed"""
+        headlines = [{"id": article['id'], "headline": article['title']} for article in batch]
+        user_message = (
+            f"Here are some examples of correctly scored headlines:\n\n{examples_text}\n\n"
+            f"Now score each of these {len(headlines)} headlines:\n\n{json.dumps(headlines)}"
+        )
+        
+        try:
+            content = self._chat(
+                BATCH_SYSTEM_MESSAGE,
+                user_message,
+                max_tokens=30 + 20 * len(batch),
+                deadline=deadline,
+                response_format={"type": "json_object"}
+            )
+            if content is None:
+                return None
+            
+            entries = json.loads(content).get("scores", [])
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            print(f"Exception in GPT sentiment analysis: {str(e)}")
-            return 0.0
+            print(f"Could not parse batch sentiment response: {str(e)}")
+            return None
+        
+        # Map reply entries back to the IDs we sent, compared as strings so int/str mismatches still match
+        ids = {str(article['id']): article['id'] for article in batch}
+        batch_scores = {}
+        for entry in entries:
+            try:
+                article_id = ids.get(str(entry["id"]))
+                if article_id is not None:
+                    batch_scores[article_id] = max(min(float(entry["score"]), 1.0), -1.0)
+            except (KeyError, TypeError, ValueError):
+                continue
+        
+        print(f"Batch scored {len(batch_scores)}/{len(batch)} headlines in one request")
+        return batch_scores
     
     def get_sentiment_category(self, score):
         """Convert numerical score to category with more granular categories"""
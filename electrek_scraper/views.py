@@ -2,7 +2,9 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
 from datetime import datetime, timedelta
 from .models import Article
-from .utils.scraper_service import ElectrekScraper
+from .utils.scrape_pipeline import run_scrape
+from .utils.deadline import Deadline
+from .config import Config
 
 bp = Blueprint('main', __name__)
 
@@ -68,72 +70,38 @@ def scrape():
         page_count = int(request.form.get('page_count', 1))
         page_count = min(max(1, page_count), 80)  # Increased max to 80 pages
         
-        print(f"Article limit set to: {article_limit}, Pages: {page_count}")
+        # Incremental mode stops paginating once it reaches already stored articles
+        incremental = request.form.get('incremental') == 'on'
+        
+        # Set when continuing a job that previously ran out of time
+        resume_token = request.form.get('resume_token') or None
+        
+        print(f"Article limit set to: {article_limit}, Pages: {page_count}, Incremental: {incremental}")
         
         # Add the warning message right here
         if page_count > 10 or article_limit > 250:
             print("⚠️ WARNING: Large scraping job requested. This may take a while and put significant load on the target site.")
             flash('Large scraping job started. This may take a while to complete.', 'warning')
         
-        scraper = ElectrekScraper()
+        # Stop taking new work before the platform kills the request
+        results = run_scrape(
+            article_limit=article_limit,
+            page_count=page_count,
+            incremental=incremental,
+            resume_token=resume_token,
+            deadline=Deadline(Config.JOB_TIME_BUDGET)
+        )
         
-        # Get recent article URLs from multiple pages
-        print(f"Fetching up to {article_limit} articles across {page_count} pages...")
-        article_urls = scraper.get_article_urls(limit=article_limit, pages=page_count)
-        
-        if not article_urls:
-            print("No articles found on the homepage.")
-            flash('No articles found on the homepage.', 'warning')
+        if results["total"] == 0:
+            if results["incremental"]:
+                print("No new articles since the last scrape.")
+                flash('No new articles since the last scrape.', 'info')
+            else:
+                print("No articles found on the homepage.")
+                flash('No articles found on the homepage.', 'warning')
             return redirect(url_for('main.index'))
         
-        print(f"Found {len(article_urls)} article URLs")
-        
-        # Track results
-        results = {
-            "total": len(article_urls),
-            "success": [],
-            "skipped": [],
-            "failed": []
-        }
-        
-        # Process each URL
-        for i, url in enumerate(article_urls):
-            print(f"\nProcessing article {i+1}/{len(article_urls)}: {url}")
-            
-            # Skip if article already exists
-            try:
-                if Article.url_exists(url):
-                    print(f"  - Skipping (already exists in database)")
-                    results["skipped"].append(url)
-                    continue
-            except Exception as e:
-                print(f"  - Warning: Error checking if article exists: {str(e)}")
-            
-            try:
-                # Parse the article
-                print(f"  - Parsing article metadata...")
-                article_data = scraper.parse_article(url)
-                
-                # Store in database
-                print(f"  - Storing article in database...")
-                creation_result = Article.create(article_data)
-                print(f"  - Database insert result: {creation_result}")
-                
-                results["success"].append(url)
-                print(f"  - SUCCESS: Article stored")
-            except Exception as e:
-                print(f"  - FAILED: Error processing article: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                results["failed"].append({"url": url, "error": str(e)})
-                
-                # If this was a duplicate URL error, categorize it as skipped instead of failed
-                error_str = str(e).lower()
-                if "duplicate" in error_str or "unique constraint" in error_str or "already exists" in error_str:
-                    print(f"  - Reclassifying as skipped (duplicate URL)")
-                    # Move from failed to skipped
-                    results["failed"].pop()
-                    results["skipped"].append(url)
+        resume_token = results["resume_token"]
         
         # Create success message with stats
         success_count = len(results["success"])
@@ -145,18 +113,24 @@ def scrape():
         print("=" * 50)
         
         if success_count > 0:
-            flash(f'Successfully scraped {success_count} articles. Skipped {skipped_count}. Failed {failed_count}.', 'success')
+            flash(f'Successfully scraped {success_count} articles in {results["elapsed_seconds"]:.0f}s '
+                  f'({results["articles_per_second"]} articles/sec). Skipped {skipped_count}. Failed {failed_count}.', 'success')
         elif skipped_count > 0 and failed_count == 0:
             flash(f'All {skipped_count} articles already existed in the database.', 'info')
         elif failed_count > 0 and success_count == 0:
             flash(f'Failed to scrape any articles. {failed_count} errors occurred.', 'danger')
         else:
             flash('No new articles were processed.', 'info')
+        
+        if resume_token:
+            print(f"Time budget reached with {len(results['pending'])} articles pending. Resume token: {resume_token}")
+            flash('The time budget ran out before the scrape finished. Everything processed so far was saved; '
+                  'use "Resume Scrape" to continue.', 'warning')
             
         # Pass the current time for display
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        return redirect(url_for('main.index', last_scraped=current_time))
+        return redirect(url_for('main.index', last_scraped=current_time, resume_token=resume_token))
         
     except Exception as e:
         print(f"CRITICAL ERROR IN SCRAPE OPERATION: {str(e)}")
@@ -186,20 +160,23 @@ def reports():
     # Get the date range parameter, default to 6 months
     months = request.args.get('months', 6, type=int)
     
-    # Get all sentiment data for filtering in javascript - date filtering happens in the backend
-    all_sentiment_data = Article.get_sentiment_data(months)
+    # Every report section, from the report cache or one fetch of the articles table
+    report = Article.get_cached_report(months, top_limit=25)
+    
+    # Sentiment data for filtering in javascript - date filtering happens in the backend
+    all_sentiment_data = report['all_sentiment_data']
     
-    # Get statistics for the selected time period
-    filtered_stats = Article.get_statistics(months)
+    # Statistics for the selected time period
+    filtered_stats = report['filtered_stats']
     
-    # Get monthly data for the trends chart
-    monthly_data = Article.get_monthly_stats(months)
+    # Monthly data for the trends chart
+    monthly_data = report['monthly_data']
     
-    # Get additional data for enhanced business analysis
-    top_articles = Article.get_top_articles_analysis(25, months)
-    author_analysis = Article.get_author_tesla_bias(months)
-    company_comparison = Article.get_company_comparison(months)
-    business_metrics = Article.get_business_impact_metrics(months)
+    # Additional data for enhanced business analysis
+    top_articles = report['top_articles']
+    author_analysis = report['author_analysis']
+    company_comparison = report['company_comparison']
+    business_metrics = report['business_metrics']
     
     # Format the data for the chart
     chart_labels = []
@@ -270,12 +247,11 @@ def analyze_sentiments():
     from .utils.analyze_sentiments import analyze_all_articles
     
     try:
-        # Start the analysis
-        success = analyze_all_articles()
+        # Start the analysis, stopping early if the time budget runs out
+        success = analyze_all_articles(deadline=Deadline(Config.JOB_TIME_BUDGET))
         
         if success:
             # Double-check if updates actually happened
-            from .config import Config
             from supabase import create_client
             supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
             
@@ -305,12 +281,13 @@ def business_of_hate_blog():
     months = None  # None = all time data
     
     # Get all the data needed for the blog post
-    filtered_stats = Article.get_statistics(months)
-    all_sentiment_data = Article.get_sentiment_data(months)
-    top_articles = Article.get_top_articles_analysis(25, months)
-    author_analysis = Article.get_author_tesla_bias(months)
-    company_comparison = Article.get_company_comparison(months)
-    business_metrics = Article.get_business_impact_metrics(months)
+    report = Article.get_cached_report(months, top_limit=25)
+    filtered_stats = report['filtered_stats']
+    all_sentiment_data = report['all_sentiment_data']
+    top_articles = report['top_articles']
+    author_analysis = report['author_analysis']
+    company_comparison = report['company_comparison']
+    business_metrics = report['business_metrics']
     
     # Get sentiment service for categorization
     from .utils.sentiment_service import SentimentService
@@ -358,12 +335,13 @@ def business_of_hate_electrek():
     months = None  # None = all time data
     
     # Get all the data needed for the article
-    filtered_stats = Article.get_statistics(months)
-    all_sentiment_data = Article.get_sentiment_data(months)
-    top_articles = Article.get_top_articles_analysis(25, months)
-    author_analysis = Article.get_author_tesla_bias(months)
-    company_comparison = Article.get_company_comparison(months)
-    business_metrics = Article.get_business_impact_metrics(months)
+    report = Article.get_cached_report(months, top_limit=25)
+    filtered_stats = report['filtered_stats']
+    all_sentiment_data = report['all_sentiment_data']
+    top_articles = report['top_articles']
+    author_analysis = report['author_analysis']
+    company_comparison = report['company_comparison']
+    business_metrics = report['business_metrics']
     
     # Get sentiment service for categorization
     from .utils.sentiment_service import SentimentService
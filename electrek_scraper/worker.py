@@ -0,0 +1,76 @@
+# electrek_scraper/worker.py
+"""
+Background worker that runs queued scrape and sentiment jobs
+
+Run alongside the web app with: python -m electrek_scraper.worker
+"""
+import time
+import traceback
+from .utils.job_queue import JobQueue
+
+def run_job(queue, job):
+    """Run a single job, reporting progress to the queue; returns the job result"""
+    params = job['params']
+
+    def report_progress(done, total):
+        queue.update_progress(job['id'], done, total)
+
+    if job['kind'] == 'scrape':
+        from .utils.scrape_pipeline import run_scrape
+        results = run_scrape(
+            article_limit=params.get('article_limit', 25),
+            page_count=params.get('page_count', 1),
+            incremental=params.get('incremental', False),
+            resume_token=params.get('resume_token'),
+            progress_callback=report_progress
+        )
+        return {
+            'success': len(results['success']),
+            'skipped': len(results['skipped']),
+            'failed': results['failed'],
+            'elapsed_seconds': results['elapsed_seconds'],
+            'articles_per_second': results['articles_per_second'],
+            'resume_token': results['resume_token']
+        }
+
+    if job['kind'] == 'sentiment':
+        from .utils.analyze_sentiments import analyze_all_articles
+        success = analyze_all_articles(progress_callback=report_progress, **params)
+        return {'success': success}
+
+    if job['kind'] == 'sentiment_backlog':
+        from .utils.sentiment_runner import analyze_backlog
+        results = analyze_backlog(progress_callback=report_progress, **params)
+        return {
+            'scored': results['scored'],
+            'failed': results['failed'],
+            'complete': results['complete'],
+            'elapsed_seconds': results['elapsed_seconds'],
+            'articles_per_second': results['articles_per_second']
+        }
+
+    raise ValueError(f"Unknown job kind: {job['kind']}")
+
+def main(poll_interval=2.0):
+    """Poll the queue forever, running one job at a time"""
+    queue = JobQueue()
+    print(f"Worker started, polling {queue.db_path}")
+
+    while True:
+        job = queue.claim_next()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        print(f"Running {job['kind']} job {job['id']}")
+        try:
+            result = run_job(queue, job)
+            queue.complete(job['id'], result)
+            print(f"Job {job['id']} done")
+        except Exception as e:
+            print(f"Job {job['id']} failed: {str(e)}")
+            print(traceback.format_exc())
+            queue.fail(job['id'], e)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+-- Indexes behind the admin listing's keyset pagination (Article.get_page).
+-- Run once in the Supabase SQL editor. Each matches one sort order, so every
+-- page is a short index range scan starting at the cursor.
+
+-- Newest first / oldest first
+create index if not exists articles_published_at_desc_idx on articles (published_at desc nulls last, id);
+create index if not exists articles_published_at_asc_idx on articles (published_at asc nulls last, id);
+
+-- Most comments
+create index if not exists articles_comment_count_desc_idx on articles (comment_count desc nulls last, id);
+
+-- Most negative
+create index if not exists articles_sentiment_score_asc_idx on articles (sentiment_score asc nulls last, id);
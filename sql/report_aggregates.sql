@@ -0,0 +1,190 @@
+-- Pre-aggregated report totals, kept up to date by a trigger on articles.
+-- Run once in the Supabase SQL editor, then backfill and rebuild with:
+--     python -m electrek_scraper.utils.report_aggregates
+-- and set REPORT_AGGREGATES=true. Without it the reports are computed from raw rows.
+--
+-- Every insert, sentiment write and delete on articles adds or subtracts the row's
+-- contribution, so Article.create, create_many, update_sentiment_score(s) and the
+-- update_sentiment_scores RPC all keep the totals current.
+
+-- Bitmask of the companies a title mentions, written by the app on insert.
+-- Bit i is COMPANIES[i] in electrek_scraper/utils/company_classifier.py (bit 0 = Tesla/Elon)
+alter table articles add column if not exists company_mask integer;
+
+-- Article count and comment total per calendar month (all articles)
+create table if not exists report_monthly_stats (
+  month date primary key,
+  article_count integer not null default 0,
+  comment_sum bigint not null default 0
+);
+
+-- Per-author Tesla vs non-Tesla totals per month (scored articles with an author)
+create table if not exists report_author_stats (
+  month date not null,
+  author text not null,
+  total_articles integer not null default 0,
+  tesla_articles integer not null default 0,
+  tesla_sentiment_sum double precision not null default 0,
+  tesla_comments_sum bigint not null default 0,
+  non_tesla_sentiment_sum double precision not null default 0,
+  non_tesla_comments_sum bigint not null default 0,
+  primary key (month, author)
+);
+
+-- Per-company totals per month (scored articles), keyed by company bit index
+create table if not exists report_company_stats (
+  month date not null,
+  company_bit smallint not null,
+  article_count integer not null default 0,
+  total_comments bigint not null default 0,
+  sentiment_sum double precision not null default 0,
+  negative_articles integer not null default 0,
+  positive_articles integer not null default 0,
+  primary key (month, company_bit)
+);
+
+-- Add (sign = 1) or remove (sign = -1) one article's contribution
+create or replace function report_aggregates_apply(r articles, sign integer)
+returns void
+language plpgsql
+as $$
+declare
+  bucket date;
+  mask integer := coalesce(r.company_mask, 0);
+  comments bigint := coalesce(r.comment_count, 0);
+  is_tesla boolean := (coalesce(r.company_mask, 0) & 1) <> 0;
+  company integer;
+begin
+  if r.published_at is null then
+    return;
+  end if;
+  bucket := date_trunc('month', r.published_at)::date;
+
+  insert into report_monthly_stats as m (month, article_count, comment_sum)
+  values (bucket, sign, sign * comments)
+  on conflict (month) do update
+    set article_count = m.article_count + excluded.article_count,
+        comment_sum = m.comment_sum + excluded.comment_sum;
+
+  if r.sentiment_score is null then
+    return;
+  end if;
+
+  if r.author is not null then
+    insert into report_author_stats as a (
+      month, author, total_articles, tesla_articles, tesla_sentiment_sum,
+      tesla_comments_sum, non_tesla_sentiment_sum, non_tesla_comments_sum
+    )
+    values (
+      bucket, r.author, sign,
+      case when is_tesla then sign else 0 end,
+      case when is_tesla then sign * r.sentiment_score else 0 end,
+      case when is_tesla then sign * comments else 0 end,
+      case when is_tesla then 0 else sign * r.sentiment_score end,
+      case when is_tesla then 0 else sign * comments end
+    )
+    on conflict (month, author) do update
+      set total_articles = a.total_articles + excluded.total_articles,
+          tesla_articles = a.tesla_articles + excluded.tesla_articles,
+          tesla_sentiment_sum = a.tesla_sentiment_sum + excluded.tesla_sentiment_sum,
+          tesla_comments_sum = a.tesla_comments_sum + excluded.tesla_comments_sum,
+          non_tesla_sentiment_sum = a.non_tesla_sentiment_sum + excluded.non_tesla_sentiment_sum,
+          non_tesla_comments_sum = a.non_tesla_comments_sum + excluded.non_tesla_comments_sum;
+  end if;
+
+  for company in 0..15 loop
+    if (mask & (1 << company)) <> 0 then
+      insert into report_company_stats as c (
+        month, company_bit, article_count, total_comments, sentiment_sum,
+        negative_articles, positive_articles
+      )
+      values (
+        bucket, company, sign, sign * comments, sign * r.sentiment_score,
+        case when r.sentiment_score < -0.1 then sign else 0 end,
+        case when r.sentiment_score > 0.1 then sign else 0 end
+      )
+      on conflict (month, company_bit) do update
+        set article_count = c.article_count + excluded.article_count,
+            total_comments = c.total_comments + excluded.total_comments,
+            sentiment_sum = c.sentiment_sum + excluded.sentiment_sum,
+            negative_articles = c.negative_articles + excluded.negative_articles,
+            positive_articles = c.positive_articles + excluded.positive_articles;
+    end if;
+  end loop;
+end;
+$$;
+
+create or replace function report_aggregates_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform report_aggregates_apply(old, -1);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform report_aggregates_apply(new, 1);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists articles_report_aggregates on articles;
+create trigger articles_report_aggregates
+after insert or delete
+   or update of published_at, author, comment_count, sentiment_score, company_mask
+on articles
+for each row execute function report_aggregates_trigger();
+
+-- Recompute every total from the articles table (after a backfill or keyword change)
+create or replace function refresh_report_aggregates()
+returns void
+language sql
+as $$
+  truncate report_monthly_stats, report_author_stats, report_company_stats;
+
+  insert into report_monthly_stats (month, article_count, comment_sum)
+  select date_trunc('month', published_at)::date, count(*), sum(coalesce(comment_count, 0))
+    from articles
+   where published_at is not null
+   group by 1;
+
+  insert into report_author_stats (
+    month, author, total_articles, tesla_articles, tesla_sentiment_sum,
+    tesla_comments_sum, non_tesla_sentiment_sum, non_tesla_comments_sum
+  )
+  select date_trunc('month', published_at)::date,
+         author,
+         count(*),
+         count(*) filter (where tesla),
+         coalesce(sum(sentiment_score) filter (where tesla), 0),
+         coalesce(sum(coalesce(comment_count, 0)) filter (where tesla), 0),
+         coalesce(sum(sentiment_score) filter (where not tesla), 0),
+         coalesce(sum(coalesce(comment_count, 0)) filter (where not tesla), 0)
+    from (
+      select *, (coalesce(company_mask, 0) & 1) <> 0 as tesla
+        from articles
+       where published_at is not null
+         and sentiment_score is not null
+         and author is not null
+    ) scored
+   group by 1, 2;
+
+  insert into report_company_stats (
+    month, company_bit, article_count, total_comments, sentiment_sum,
+    negative_articles, positive_articles
+  )
+  select date_trunc('month', a.published_at)::date,
+         b.company,
+         count(*),
+         sum(coalesce(a.comment_count, 0)),
+         sum(a.sentiment_score),
+         count(*) filter (where a.sentiment_score < -0.1),
+         count(*) filter (where a.sentiment_score > 0.1)
+    from articles a
+    cross join generate_series(0, 15) as b(company)
+   where a.published_at is not null
+     and a.sentiment_score is not null
+     and (coalesce(a.company_mask, 0) & (1 << b.company)) <> 0
+   group by 1, 2;
+$$;
@@ -0,0 +1,11 @@
+-- Shared tier of the report cache (utils/cache_service.py), so every serverless
+-- instance reuses the same computed reports. Run once in the Supabase SQL editor
+-- and set REPORT_CACHE_SHARED=true.
+--
+-- The row keyed '__invalidated_at__' records when articles or scores last changed.
+-- Rows keyed '__lease__:<key>' mark an instance rebuilding that entry.
+create table if not exists report_cache (
+  key text primary key,
+  value jsonb,
+  created_at double precision not null
+);
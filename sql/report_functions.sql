@@ -0,0 +1,136 @@
+-- Server-side report aggregates, called with supabase.rpc from utils/report_queries.py.
+-- Run once in the Supabase SQL editor after sql/report_aggregates.sql (the author and
+-- company sums read the company_mask column it adds), then set REPORT_RPC=true.
+--
+-- Each function takes the window start (null = all time) and returns only aggregate
+-- rows, so no report has to page through the articles table.
+
+-- Totals for the statistics cards, plus the most commented article
+create or replace function report_totals(since timestamptz default null)
+returns table (
+  total_articles bigint,
+  total_comments bigint,
+  counted_articles bigint,
+  max_comments bigint,
+  most_commented_id bigint,
+  most_commented_title text,
+  most_commented_published_at timestamptz
+)
+language sql
+stable
+as $$
+  with w as (
+    select * from articles where since is null or published_at >= since
+  )
+  select (select count(*) from w),
+         (select coalesce(sum(comment_count), 0) from w)::bigint,
+         (select count(comment_count) from w),
+         coalesce(top.comment_count, 0)::bigint,
+         top.id::bigint,
+         top.title::text,
+         top.published_at::timestamptz
+    from (select 1) one
+    left join lateral (
+      select id, title, comment_count, published_at
+        from w
+       where comment_count > 0
+       order by comment_count desc, id
+       limit 1
+    ) top on true;
+$$;
+
+-- Article count and comment total per calendar month
+create or replace function report_monthly(since timestamptz default null)
+returns table (month date, article_count bigint, comment_sum bigint)
+language sql
+stable
+as $$
+  select date_trunc('month', published_at)::date,
+         count(*),
+         coalesce(sum(comment_count), 0)::bigint
+    from articles
+   where published_at is not null
+     and (since is null or published_at >= since)
+   group by 1
+   order by 1;
+$$;
+
+-- Most commented scored articles (NULL comment counts first, as ORDER BY ... DESC does)
+create or replace function report_top_articles(since timestamptz default null, top_n integer default 20)
+returns table (
+  id bigint,
+  title text,
+  author text,
+  comment_count bigint,
+  sentiment_score double precision,
+  published_at timestamptz
+)
+language sql
+stable
+as $$
+  select a.id::bigint, a.title::text, a.author::text, a.comment_count::bigint,
+         a.sentiment_score::double precision, a.published_at::timestamptz
+    from articles a
+   where a.sentiment_score is not null
+     and (since is null or a.published_at >= since)
+   order by a.comment_count desc nulls first, a.id
+   limit top_n;
+$$;
+
+-- Tesla vs non-Tesla sums per author (scored articles with an author)
+create or replace function report_author_sums(since timestamptz default null)
+returns table (
+  author text,
+  total_articles bigint,
+  tesla_articles bigint,
+  tesla_sentiment_sum double precision,
+  tesla_comments_sum bigint,
+  non_tesla_sentiment_sum double precision,
+  non_tesla_comments_sum bigint
+)
+language sql
+stable
+as $$
+  select author::text,
+         count(*),
+         count(*) filter (where tesla),
+         coalesce(sum(sentiment_score) filter (where tesla), 0),
+         coalesce(sum(coalesce(comment_count, 0)) filter (where tesla), 0)::bigint,
+         coalesce(sum(sentiment_score) filter (where not tesla), 0),
+         coalesce(sum(coalesce(comment_count, 0)) filter (where not tesla), 0)::bigint
+    from (
+      select *, (coalesce(company_mask, 0) & 1) <> 0 as tesla
+        from articles
+       where sentiment_score is not null
+         and author is not null
+         and (since is null or published_at >= since)
+    ) scored
+   group by 1;
+$$;
+
+-- Sums per company bit (COMPANIES order in utils/company_classifier.py)
+create or replace function report_company_sums(since timestamptz default null)
+returns table (
+  company_bit integer,
+  article_count bigint,
+  total_comments bigint,
+  sentiment_sum double precision,
+  negative_articles bigint,
+  positive_articles bigint
+)
+language sql
+stable
+as $$
+  select b.company,
+         count(*),
+         sum(coalesce(a.comment_count, 0))::bigint,
+         sum(a.sentiment_score),
+         count(*) filter (where a.sentiment_score < -0.1),
+         count(*) filter (where a.sentiment_score > 0.1)
+    from articles a
+    cross join generate_series(0, 15) as b(company)
+   where a.sentiment_score is not null
+     and (since is null or a.published_at >= since)
+     and (coalesce(a.company_mask, 0) & (1 << b.company)) <> 0
+   group by 1;
+$$;
@@ -0,0 +1,19 @@
+-- Bulk sentiment write-back used by Article.update_sentiment_scores.
+-- Run once in the Supabase SQL editor. Without it the app falls back to
+-- one UPDATE per distinct score value.
+--
+-- scores: JSON array of {"id": <article id>, "score": <float>}
+-- returns: number of articles updated
+create or replace function update_sentiment_scores(scores jsonb)
+returns integer
+language sql
+as $$
+  with updated as (
+    update articles a
+       set sentiment_score = s.score
+      from jsonb_to_recordset(scores) as s(id bigint, score double precision)
+     where a.id = s.id
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;